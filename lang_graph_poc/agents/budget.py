@@ -0,0 +1,55 @@
+"""Per-question and per-session spend limits for SQLAgent.
+
+One SQLAgent serves one chat session (the Streamlit app keeps an agent per
+browser session), so the session limit lives on the agent's CostBudget and
+the question limit is checked against the request's RequestTrace cost.
+"""
+
+import threading
+from typing import Optional, Tuple
+
+from lang_graph_poc.config import Config
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised before a model call that could exceed a spend limit."""
+
+    def __init__(self, scope: str, limit: float, spent: float, estimate: float):
+        self.scope = scope
+        self.limit = limit
+        self.spent = spent
+        self.estimate = estimate
+        super().__init__(
+            f"The {scope} budget of ${limit:.4f} would be exceeded "
+            f"(spent ${spent:.4f}, next model call estimated at ${estimate:.4f}).")
+
+
+class CostBudget:
+    """Spend limits in USD; 0 (or None) means unlimited."""
+
+    def __init__(self, question_usd: Optional[float] = None,
+                 session_usd: Optional[float] = None):
+        config = Config.BUDGET
+        self.question_usd = (config["question_usd"] if question_usd is None
+                             else question_usd)
+        self.session_usd = (config["session_usd"] if session_usd is None
+                            else session_usd)
+        self.session_spent = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, cost: float) -> None:
+        with self._lock:
+            self.session_spent += cost
+
+    def remaining(self, question_spent: float) -> Optional[Tuple[float, str, float, float]]:
+        """Tightest (remaining, scope, limit, spent), or None when unlimited."""
+        with self._lock:
+            session_spent = self.session_spent
+        limits = []
+        if self.question_usd:
+            limits.append((self.question_usd - question_spent, "question",
+                           self.question_usd, question_spent))
+        if self.session_usd:
+            limits.append((self.session_usd - session_spent, "session",
+                           self.session_usd, session_spent))
+        return min(limits) if limits else None
@@ -0,0 +1,91 @@
+"""Pre-execution cost gate: EXPLAIN the generated SQL and act on the plan.
+
+Redshift (and Postgres) plans carry ``(cost=start..total rows=N width=W)``
+on every step; the first step is the root, so its total cost and row count
+are the query's estimates. Nested loops (Redshift's answer to cross joins
+and non-equi joins) and broadcast/redistribute-both steps are flagged as
+well. Plans of the embedded DuckDB stand-in only have row estimates
+(``~N rows``) and are parsed for those.
+
+A plan over the thresholds of Config.COST_GATE gets one of these actions:
+
+- "limit": a large result is capped with an outer LIMIT so the cluster can
+  stop early;
+- "confirm": the query only runs once the user confirms it;
+- "block": the query never runs.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple, TypedDict
+
+from lang_graph_poc.config import Config
+
+_COST = re.compile(r"cost=([\d.]+)\.\.([\d.]+)\s+rows=(\d+)")
+_DUCKDB_ROWS = re.compile(r"~([\d,]+) rows?")
+_NESTED_LOOP = re.compile(r"Nested Loop|NESTED_LOOP_JOIN|BLOCKWISE_NL_JOIN|"
+                          r"CROSS_PRODUCT")
+# Redshift join distribution styles that move whole tables between nodes
+_BROADCAST = re.compile(r"DS_BCAST_INNER|DS_DIST_BOTH|DS_DIST_ALL_INNER")
+
+
+class PlanEstimate(TypedDict):
+    """Planner estimates of one query; ``cost``/``rows`` are None when the
+    plan does not report them."""
+    cost: Optional[float]
+    rows: Optional[int]
+    max_step_rows: Optional[int]
+    nested_loop: bool
+    broadcast: List[str]
+
+
+class CostGateDecision(TypedDict):
+    action: str  # "allow", "limit", "confirm" or "block"
+    reasons: List[str]
+    plan: PlanEstimate
+
+
+def plan_text(data) -> str:
+    """The text of an EXPLAIN result (one plan line per row in Redshift,
+    one cell with the whole plan in DuckDB)."""
+    return "\n".join(str(value) for record in data.to_records()
+                     for value in record.values() if isinstance(value, str))
+
+
+def parse_explain(text: str) -> PlanEstimate:
+    steps = [(float(total), int(rows)) for _, total, rows in _COST.findall(text)]
+    if steps:
+        cost, rows = steps[0]
+        step_rows = [r for _, r in steps]
+    else:
+        cost = None
+        step_rows = [int(r.replace(",", "")) for r in _DUCKDB_ROWS.findall(text)]
+        rows = step_rows[0] if step_rows else None
+    return PlanEstimate(
+        cost=cost, rows=rows,
+        max_step_rows=max(step_rows) if step_rows else None,
+        nested_loop=bool(_NESTED_LOOP.search(text)),
+        broadcast=sorted(set(_BROADCAST.findall(text))))
+
+
+def evaluate_plan(plan: PlanEstimate,
+                  thresholds: Optional[Dict[str, Any]] = None) -> Tuple[str, List[str]]:
+    """(action, reasons) for ``plan`` under ``thresholds`` (default
+    Config.COST_GATE). Expensive plans get ``on_expensive``; plans that are
+    only over the row threshold get ``on_large_result``."""
+    config = thresholds or Config.COST_GATE
+    expensive = []
+    if plan["cost"] is not None and config["max_cost"] and plan["cost"] > config["max_cost"]:
+        expensive.append(f"estimated cost {plan['cost']:,.0f} is over "
+                         f"{config['max_cost']:,.0f}")
+    if plan["nested_loop"] and config["reject_nested_loop"]:
+        expensive.append("the plan has a nested loop join (cross join or "
+                         "non-equality join condition)")
+    if plan["broadcast"] and config["reject_broadcast"]:
+        expensive.append(f"the plan moves whole tables between nodes "
+                         f"({', '.join(plan['broadcast'])})")
+    if expensive:
+        return config["on_expensive"], expensive
+    if plan["rows"] is not None and config["max_rows"] and plan["rows"] > config["max_rows"]:
+        return config["on_large_result"], [
+            f"estimated {plan['rows']:,} result rows is over {config['max_rows']:,}"]
+    return "allow", []
@@ -0,0 +1,240 @@
+"""Per-request latency and token accounting for SQLAgent runs.
+
+Every graph node is wrapped in :func:`node_span`; model and tool (database)
+calls made while a node runs are recorded against that node through a
+context variable, so the same code works for the blocking graph, the async
+graph and concurrent requests. At the end of a request the trace is turned
+into a plain dict, returned in the result and handed to a metrics sink.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Protocol
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.llm.pricing import usage_cost
+
+_COUNTERS = ("calls", "retries", "errors", "llm_calls", "db_calls",
+             "prompt_tokens", "cached_prompt_tokens", "completion_tokens",
+             "total_tokens")
+_TIMERS = ("wall_time_s", "llm_time_s", "db_time_s")
+_AMOUNTS = ("cost_usd",)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "sql_agent_span", default=None)
+
+
+def response_token_usage(response) -> Dict[str, int]:
+    """Prompt/completion/cached token counts of a chat model response.
+
+    Prefers LangChain's provider-neutral ``usage_metadata`` and falls back
+    to OpenAI's ``response_metadata['token_usage']``.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        details = usage.get("input_token_details") or {}
+        return {
+            "prompt_tokens": usage.get("input_tokens", 0) or 0,
+            "cached_prompt_tokens": details.get("cache_read", 0) or 0,
+            "completion_tokens": usage.get("output_tokens", 0) or 0,
+            "total_tokens": usage.get("total_tokens", 0) or 0,
+        }
+    usage = (getattr(response, "response_metadata", None) or {}).get(
+        "token_usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    return {
+        "prompt_tokens": usage.get("prompt_tokens", 0) or 0,
+        "cached_prompt_tokens": details.get("cached_tokens", 0) or 0,
+        "completion_tokens": usage.get("completion_tokens", 0) or 0,
+        "total_tokens": usage.get("total_tokens", 0) or 0,
+    }
+
+
+def _rounded(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: (round(v, 6 if k in _AMOUNTS else 4) if isinstance(v, float)
+                else v)
+            for k, v in values.items()}
+
+
+class RequestTrace:
+    """Metrics of one question, broken down by graph node."""
+
+    def __init__(self, question: str = "", request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.question = question
+        self.started_at = datetime.now(timezone.utc)
+        self._started = time.perf_counter()
+        self.wall_time_s: Optional[float] = None
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.model_calls: list = []
+        self.prompts: list = []
+        self._lock = threading.Lock()
+
+    def _node(self, name: str) -> Dict[str, Any]:
+        node = self.nodes.get(name)
+        if node is None:
+            node = dict.fromkeys(_COUNTERS, 0)
+            node.update(dict.fromkeys(_TIMERS + _AMOUNTS, 0.0))
+            self.nodes[name] = node
+        return node
+
+    def record_node(self, name: str, seconds: float, failed: bool) -> None:
+        with self._lock:
+            node = self._node(name)
+            node["calls"] += 1
+            # A node entered again within one request is a retry loop
+            node["retries"] = node["calls"] - 1
+            node["errors"] += int(failed)
+            node["wall_time_s"] += seconds
+
+    def record_model_call(self, node: str, seconds: float, response=None,
+                          failed: bool = False, model: Optional[str] = None) -> float:
+        """Record one model call; returns its dollar cost."""
+        usage = response_token_usage(response) if response is not None else {}
+        cost = usage_cost(usage, model)
+        with self._lock:
+            entry = self._node(node)
+            entry["llm_calls"] += 1
+            entry["llm_time_s"] += seconds
+            entry["errors"] += int(failed)
+            entry["cost_usd"] += cost
+            for key, value in usage.items():
+                entry[key] += value
+            self.model_calls.append({"node": node, "model": model,
+                                     "seconds": round(seconds, 4),
+                                     "cost_usd": round(cost, 6), **usage})
+        return cost
+
+    def record_db_call(self, node: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            entry = self._node(node)
+            entry["db_calls"] += 1
+            entry["db_time_s"] += seconds
+            entry["errors"] += int(failed)
+
+    def record_prompt(self, node: str, report: Dict[str, Any]) -> None:
+        """Token count per prompt segment (see prompt_budget.PromptBuild)."""
+        with self._lock:
+            self.prompts.append({"node": node, **report})
+
+    def usage(self) -> Dict[str, int]:
+        """Token usage summed over every model call of the request."""
+        totals = dict.fromkeys(("prompt_tokens", "cached_prompt_tokens",
+                                "completion_tokens", "total_tokens"), 0)
+        with self._lock:
+            for node in self.nodes.values():
+                for key in totals:
+                    totals[key] += node[key]
+        return totals
+
+    def cost(self) -> float:
+        """Dollar cost of every model call of the request so far."""
+        with self._lock:
+            return sum(node["cost_usd"] for node in self.nodes.values())
+
+    def finish(self) -> None:
+        if self.wall_time_s is None:
+            self.wall_time_s = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            nodes = {name: _rounded(node) for name, node in self.nodes.items()}
+            model_calls = list(self.model_calls)
+            prompts = list(self.prompts)
+        totals = dict.fromkeys(_COUNTERS, 0)
+        totals.update(dict.fromkeys(_TIMERS + _AMOUNTS, 0.0))
+        for node in nodes.values():
+            for key in totals:
+                totals[key] += node[key]
+        totals = _rounded(totals)
+        wall_time = (self.wall_time_s if self.wall_time_s is not None
+                     else time.perf_counter() - self._started)
+        return {
+            "request_id": self.request_id,
+            "question": self.question,
+            "started_at": self.started_at.isoformat(),
+            "wall_time_s": round(wall_time, 4),
+            "nodes": nodes,
+            "totals": totals,
+            "model_calls": model_calls,
+            "prompts": prompts,
+        }
+
+
+@contextmanager
+def node_span(trace: Optional[RequestTrace], node: str):
+    """Time a graph node and attribute calls made inside it to ``node``."""
+    if trace is None:
+        yield
+        return
+    token = _current_span.set((trace, node))
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        trace.record_node(node, time.perf_counter() - started, failed)
+        _current_span.reset(token)
+
+
+def current_span():
+    """(trace, node) of the node running in this context, or None."""
+    return _current_span.get()
+
+
+class MetricsSink(Protocol):
+    def emit(self, record: Dict[str, Any]) -> None:
+        ...
+
+
+class LoggingMetricsSink:
+    """Logs one JSON line per request."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None,
+                 level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("lang_graph_poc.metrics")
+        self.level = level
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        self.logger.log(self.level, json.dumps(record, default=str))
+
+
+class JsonlMetricsSink:
+    """Appends one JSON line per request to ``path``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+class NullMetricsSink:
+    def emit(self, record: Dict[str, Any]) -> None:
+        pass
+
+
+def get_metrics_sink(kind: Optional[str] = None) -> MetricsSink:
+    """Sink named by ``kind`` (default Config.METRICS["sink"]):
+    "logging", "jsonl" (to Config.METRICS["jsonl_path"]) or "none"."""
+    kind = (kind or Config.METRICS["sink"]).lower()
+    if kind == "jsonl":
+        return JsonlMetricsSink(Config.METRICS["jsonl_path"])
+    if kind == "none":
+        return NullMetricsSink()
+    if kind != "logging":
+        logging.warning(f"Unknown metrics sink {kind!r}; using logging.")
+    return LoggingMetricsSink()
@@ -0,0 +1,186 @@
+"""Question-relevant column selection for SQLAgent prompts.
+
+Columns are scored against the question by three signals:
+
+1. name similarity between question words and the parts of a column name
+   (``refund_amount_sgd`` -> refund, amount, sgd), with a prefix match for
+   inflections such as "cancelled" / "cancellation";
+2. the "Critical Column Mappings" of the system prompt, read as a synonym
+   map from concept words ("revenue", "geographic", ...) to columns;
+3. columns used by the retrieved few-shot examples.
+
+The best-scoring columns plus a few mandatory keys are kept; everything
+else is left out of the prompt.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from lang_graph_poc.llm.examples import NLQExample
+
+SYSTEM_PROMPT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "llm", "system_prompt.txt")
+
+# Always sent when the table has them: join/lookup key and default filters
+MANDATORY_COLUMNS = ("booking_id", "booking_date", "booking_state")
+
+# Business shorthand the prompt mappings do not spell out
+EXTRA_SYNONYMS = {
+    "gmv": {"gross_total_sgd", "booking_gross_total_sgd"},
+    "spend": {"gross_total_sgd"},
+}
+
+# Words too common in our questions (or mapping labels) to carry signal
+_GENERIC_WORDS = frozenset("""
+    analysis filtering queries query booking bookings data number total
+    show what how many much the for by of in on and or last this per all
+""".split())
+
+_MAPPING_LINE = re.compile(
+    r"^\s*[-*]\s*\**(?P<label>[^:→*`]+?)\**\s*(?::\**|→)\s*(?P<rest>.*)$")
+_BACKTICKED = re.compile(r"`([a-z][a-z0-9_]*)`")
+_IDENTIFIER = re.compile(r"[a-z][a-z0-9_]*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+_EXAMPLE_SCORE = 1.5
+_SYNONYM_SCORE = 2.0
+_NAME_PART_SCORE = 1.0
+_PREFIX_SCORE = 0.5
+
+
+def _stem(word: str) -> str:
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def _words(text: str) -> Set[str]:
+    return {_stem(w) for w in _WORD.findall(text.lower().replace("’", "'"))
+            if w not in _GENERIC_WORDS}
+
+
+def parse_column_mappings(prompt_text: str) -> Dict[str, Set[str]]:
+    """Read the "Critical Column Mappings" section as word -> columns.
+
+    Understands both the markdown bullet form of ``system_prompt.txt``
+    (``* **Sales/Revenue:** `gross_total_sgd`, ...``) and the arrow form
+    used in ``get_system_prompt`` (``- Sales/Revenue queries → ...``).
+    """
+    synonyms: Dict[str, Set[str]] = {}
+    in_section = False
+    for line in (prompt_text or "").splitlines():
+        if "Critical Column Mappings" in line:
+            in_section = True
+            continue
+        if not in_section:
+            continue
+        match = _MAPPING_LINE.match(line)
+        if not match or not match.group("rest").strip():
+            if line.strip():
+                break  # next section heading
+            continue
+        rest = match.group("rest")
+        columns = _BACKTICKED.findall(rest) or _IDENTIFIER.findall(rest)
+        for word in _words(match.group("label")):
+            synonyms.setdefault(word, set()).update(columns)
+    return synonyms
+
+
+def load_default_column_mappings() -> Dict[str, Set[str]]:
+    """Mappings from the packaged ``system_prompt.txt`` plus our own
+    business shorthand."""
+    synonyms = {word: set(columns) for word, columns in EXTRA_SYNONYMS.items()}
+    try:
+        with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
+            prompt_text = f.read()
+    except OSError:
+        return synonyms
+    for word, columns in parse_column_mappings(prompt_text).items():
+        synonyms.setdefault(word, set()).update(columns)
+    return synonyms
+
+
+def score_columns(
+    question: str,
+    schema: Dict[str, List[str]],
+    synonyms: Optional[Dict[str, Set[str]]] = None,
+    examples: Iterable[NLQExample] = (),
+) -> Dict[str, float]:
+    """Relevance score per column name (column names are shared across
+    tables, so scores are per name)."""
+    question_words = _words(question)
+    synonym_columns: Set[str] = set()
+    for word in question_words:
+        synonym_columns |= (synonyms or {}).get(word, set())
+    example_columns: Set[str] = set()
+    for example in examples:
+        example_columns |= set(_IDENTIFIER.findall(example["sql"].lower()))
+
+    scores: Dict[str, float] = {}
+    for columns in schema.values():
+        for column in columns:
+            if column in scores:
+                continue
+            score = 0.0
+            for part in {_stem(p) for p in column.lower().split("_") if p}:
+                if part in question_words:
+                    score += _NAME_PART_SCORE
+                elif len(part) >= 5 and any(
+                        w[:5] == part[:5] for w in question_words):
+                    score += _PREFIX_SCORE
+            if column in synonym_columns:
+                score += _SYNONYM_SCORE
+            if column.lower() in example_columns:
+                score += _EXAMPLE_SCORE
+            scores[column] = score
+    return scores
+
+
+def select_relevant_schema(
+    question: str,
+    schema: Dict[str, List[str]],
+    synonyms: Optional[Dict[str, Set[str]]] = None,
+    examples: Iterable[NLQExample] = (),
+    max_columns: int = 30,
+    mandatory: Sequence[str] = MANDATORY_COLUMNS,
+) -> Dict[str, List[str]]:
+    """Subset of ``schema`` relevant to ``question``, in original order.
+
+    Each table keeps its mandatory columns plus up to ``max_columns`` of
+    its best-scoring ones. Tables are always kept so that table names stay
+    visible to the model.
+    """
+    scores = score_columns(question, schema, synonyms, examples)
+    pruned: Dict[str, List[str]] = {}
+    for table, columns in schema.items():
+        ranked = sorted((c for c in columns if scores.get(c, 0) > 0),
+                        key=lambda c: -scores[c])
+        keep = set(ranked[:max_columns]) | (set(mandatory) & set(columns))
+        pruned[table] = [c for c in columns if c in keep]
+    return pruned
+
+
+def rank_columns(
+    question: str,
+    schema: Dict[str, List[str]],
+    synonyms: Optional[Dict[str, Set[str]]] = None,
+    examples: Iterable[NLQExample] = (),
+    mandatory: Sequence[str] = MANDATORY_COLUMNS,
+) -> List[Tuple[str, str]]:
+    """(table, column) pairs, most relevant first: mandatory columns, then
+    by score, ties in schema order. Used to drop columns from the end when
+    a prompt is over its token budget."""
+    scores = score_columns(question, schema, synonyms, examples)
+    pairs = [(table, column) for table, columns in schema.items()
+             for column in columns]
+    order = {pair: i for i, pair in enumerate(pairs)}
+    return sorted(pairs, key=lambda p: (p[1] not in mandatory,
+                                        -scores.get(p[1], 0), order[p]))
+
+
+def schema_subset(schema: Dict[str, List[str]],
+                  kept: Iterable[Tuple[str, str]]) -> Dict[str, List[str]]:
+    """``schema`` restricted to the ``kept`` (table, column) pairs, in the
+    original column order."""
+    kept = set(kept)
+    return {table: [c for c in columns if (table, c) in kept]
+            for table, columns in schema.items()}
@@ -1,13 +1,47 @@
-from typing import Dict, Any, Optional, TypedDict
+from typing import (Any, AsyncIterator, Dict, Generator, Iterator, List,
+                    NamedTuple, Optional, TypedDict)
 from datetime import datetime
-import pandas as pd
 from langchain_core.messages import (
     HumanMessage, SystemMessage, ToolMessage, AIMessage
 )
+from langgraph.config import get_config, get_stream_writer
 from langgraph.graph import StateGraph, END
+import inspect
 import logging
 import json
-from lang_graph_poc.llm.openai import calculate_cost
+import time
+from lang_graph_poc.agents.budget import BudgetExceeded, CostBudget
+from lang_graph_poc.agents.cost_gate import (
+    CostGateDecision, evaluate_plan, parse_explain, plan_text
+)
+from lang_graph_poc.agents.instrumentation import (
+    RequestTrace, current_span, get_metrics_sink, node_span
+)
+from lang_graph_poc.agents.schema_pruning import (
+    MANDATORY_COLUMNS, load_default_column_mappings, parse_column_mappings,
+    rank_columns, schema_subset, select_relevant_schema
+)
+from lang_graph_poc.agents.sql_validation import validate_sql
+from lang_graph_poc.agents.sql_cache import (
+    context_fingerprint, get_sql_generation_cache
+)
+from lang_graph_poc.config import Config
+from lang_graph_poc.llm.examples import NLQExample, format_examples
+from lang_graph_poc.llm.pricing import estimate_call_cost
+from lang_graph_poc.llm.prompt_budget import PromptBuilder, TokenCounter
+from lang_graph_poc.tools.cache import normalize_sql
+from lang_graph_poc.tools.digest import (
+    digest_result, format_digest, sample_rows, with_sample_rows
+)
+from lang_graph_poc.tools.cancellation import (
+    CANCELLED_ERROR, cancel_request, get_query_registry, request_scope
+)
+from lang_graph_poc.tools.execution_policy import TIMEOUT_ERROR, add_limit
+from lang_graph_poc.tools.jobs import JobQueueFull, JobStatus
+from lang_graph_poc.tools.redshift import (
+    ALLOWED_TABLES, QUEUE_FULL_ERROR, get_job_executor
+)
+from lang_graph_poc.tools.result import ColumnarResult
 import re
 
 
@@ -30,7 +64,8 @@ def safe_json_loads(content):
 class QueryResult(TypedDict):
     """Type definition for query results."""
     success: bool
-    data: Optional[pd.DataFrame]
+    data: Optional[ColumnarResult]
+    digest: Optional[Dict[str, Any]]
     error: Optional[str]
     raw_result: Optional[str]
     sql_query: Optional[str]
@@ -41,6 +76,9 @@ class QueryResult(TypedDict):
     usage: Optional[str]
     missing_tables: Optional[list[str]]
     missing_columns: Optional[list[str]]
+    metrics: Optional[Dict[str, Any]]
+    cost: Optional[float]
+    session_cost: Optional[float]
 
 
 class AgentState(TypedDict):
@@ -50,6 +88,35 @@ class AgentState(TypedDict):
     query_result: Optional[Dict[str, Any]]
     attempt_count: int
     current_step: str
+    trace: Optional[RequestTrace]
+    # normalize_sql of the SQL the user accepted running after the cost
+    # gate held it for confirmation; other SQL is still gated
+    confirmed_sql: Optional[str]
+    # ask()/stream() with a job executor: execute_sql submits a query job
+    background_sql: bool
+    # Set by resume(): the query job whose output execute_sql collects
+    job_id: Optional[str]
+
+
+class _ModelCall(NamedTuple):
+    """Yielded by a node's step generator to have the chat model invoked.
+
+    ``stream`` marks user-facing output whose tokens are forwarded to
+    :meth:`SQLAgent.stream` consumers as they arrive.
+    """
+    messages: List[Any]
+    stream: bool = False
+
+
+class _ToolCall(NamedTuple):
+    """Yielded by a node's step generator to have a tool invoked."""
+    tool: Any
+    args: Dict[str, Any]
+
+
+# Node bodies are generators that yield their model/tool calls and receive
+# the replies, so one body serves both the blocking and the async graph
+NodeSteps = Generator[Any, Any, Dict[str, Any]]
 
 
 def extract_token_usage(response):
@@ -58,41 +125,157 @@ def extract_token_usage(response):
 
 
 class SQLAgent:
+    # Tools that run SQL: the apps register execute_sql as "redshift_query";
+    # its own name works too
+    QUERY_TOOL_NAMES = ("redshift_query", "execute_sql")
+
+    def __init__(self, model, tools, system_prompt="", schema=None,
+                 sql_cache=None, example_index=None, num_examples=None,
+                 prune_schema=None, fast_path=None, allowed_tables=None,
+                 verify_policy=None, metrics_sink=None, budget=None,
+                 fallback_model=None, cost_gate=None, job_executor=None):
+        """Initialize the SQL agent with model and tools.
 
-    def __init__(self, model, tools, system_prompt="", schema=None):
-        """Initialize the SQL agent with model and tools."""
+        ``sql_cache`` defaults to the process-wide SQLGenerationCache when
+        Config.SQL_CACHE is enabled; pass ``False`` to disable it.
+        ``example_index`` (an ExampleIndex) supplies the ``num_examples``
+        most similar NLQ -> SQL pairs to the SQL generation prompt.
+        ``prune_schema`` (default Config.SCHEMA_PRUNING) sends prompts only
+        the columns relevant to the question.
+        ``fast_path`` (default Config.FAST_PATH) first tries a single fused
+        understand/generate/self-check call and only walks the multi-node
+        path when its output fails local validation or needs clarification.
+        Generated SQL may only read ``allowed_tables`` (default
+        ALLOWED_TABLES); ``verify_policy`` (default Config.SQL_VERIFY_POLICY)
+        is "semantic" or "skip" for the LLM intent check in verify_sql.
+        Per-request metrics go to ``metrics_sink`` (default from
+        Config.METRICS) as well as to the result's ``metrics``.
+        ``budget`` (a CostBudget, default from Config.BUDGET) caps the
+        spend per question and for this agent's session; a model call that
+        would not fit goes to ``fallback_model`` when that one fits, else
+        the request stops with action "budget_exceeded".
+        ``cost_gate`` (thresholds like Config.COST_GATE, the default when
+        enabled; ``False`` disables it) EXPLAINs the SQL before it runs and
+        limits, holds for confirmation or blocks expensive queries.
+        ``job_executor`` (a QueryJobExecutor, default the shared one when
+        Config.JOB_QUEUE is enabled; ``False`` disables it) makes ask() and
+        stream() submit the SQL as a background job and return with action
+        "job_submitted" and its ``job_id`` in the metadata instead of
+        waiting for Redshift: poll :meth:`job_status`, then finish with
+        :meth:`resume` or :meth:`stream_resume`. aask()/astream() always
+        await the async pool.
+        """
         self.system_prompt = system_prompt
         self.schema = schema
+        self.example_index = example_index
+        self.num_examples = (Config.FEW_SHOT_EXAMPLES if num_examples is None
+                             else num_examples)
+        self.prune_schema = (Config.SCHEMA_PRUNING["enabled"]
+                             if prune_schema is None else prune_schema)
+        self.fast_path = Config.FAST_PATH if fast_path is None else fast_path
+        self.allowed_tables = (ALLOWED_TABLES if allowed_tables is None
+                               else allowed_tables)
+        self.verify_policy = (Config.SQL_VERIFY_POLICY if verify_policy is None
+                              else verify_policy)
+        if cost_gate is None:
+            cost_gate = Config.COST_GATE if Config.COST_GATE["enabled"] else False
+        self.cost_gate = cost_gate or None
+        if job_executor is None and Config.JOB_QUEUE["enabled"]:
+            job_executor = get_job_executor()
+        self.job_executor = job_executor or None
+        # Prompt-specific mappings override the packaged defaults
+        self.column_synonyms = load_default_column_mappings()
+        self.column_synonyms.update(parse_column_mappings(system_prompt))
+        if sql_cache is None and Config.SQL_CACHE["enabled"]:
+            sql_cache = get_sql_generation_cache()
+        self.sql_cache = sql_cache or None
 
         print("\n\n===> system_prompt for chosen model is : ", system_prompt)
         print("<<<<<<====================>>>>")
 
+        self.metrics_sink = metrics_sink or get_metrics_sink()
+        self.model_name = (getattr(model, "model_name", None) or
+                           getattr(model, "model", None))
+        self.budget = budget or CostBudget()
+        self.token_counter = TokenCounter(self.model_name)
         self.tools = {t.name: t for t in tools}
+        if self.cost_gate is not None and self._query_tool() is None:
+            logging.warning(
+                f"Cost gate enabled but no SQL tool named one of "
+                f"{self.QUERY_TOOL_NAMES} is registered; queries are not gated.")
         self.model = model.bind_tools(
             tools,
             tool_choice="auto"
         )
+        self.fallback_model_name = (
+            getattr(fallback_model, "model_name", None) or
+            getattr(fallback_model, "model", None))
+        self.fallback_model = (fallback_model.bind_tools(tools, tool_choice="auto")
+                               if fallback_model is not None else None)
         self.max_attempts = 3
 
-        # Build graph with distinct steps
+        # Same workflow twice: blocking nodes for ask(), coroutines for aask()
+        self.graph = self._build_graph()
+        self.agraph = self._build_graph(use_async=True)
+
+    def _build_graph(self, use_async: bool = False):
+        """Compile the workflow; LLM/database nodes are the async variants
+        when ``use_async`` is set."""
+        def node(name):
+            return getattr(self, f"a{name}" if use_async else name)
+
         graph = StateGraph(AgentState)
 
+        def add_node(name, fn):
+            graph.add_node(name, self._instrumented(name, fn))
+
         # Add nodes for each step
-        graph.add_node("understand_and_expand_user_query",
-                       self.understand_and_expand_user_query)
-        graph.add_node("generate_sql", self.generate_sql)
-        graph.add_node("verify_sql", self.verify_sql)
-        graph.add_node("execute_sql", self.execute_function)
-        graph.add_node("process_results", self.process_results)
-        graph.add_node("summarize", self.summarize_results)
-        graph.add_node("seek_clarification_on_draft_sql",
-                       self.seek_clarification_on_draft_sql)
-        graph.add_node("handle_sql_error", self.handle_sql_error)
-        graph.add_node("display_generated_sql",
-                       self.display_generated_sql)  # New node
-
-        # Define the workflow
-        graph.set_entry_point("understand_and_expand_user_query")
+        add_node("lookup_cached_sql", self.lookup_cached_sql)
+        add_node("fast_path_generate", node("fast_path_generate"))
+        add_node("understand_and_expand_user_query",
+                 node("understand_and_expand_user_query"))
+        add_node("generate_sql", node("generate_sql"))
+        add_node("verify_sql", node("verify_sql"))
+        add_node("check_query_cost", node("check_query_cost"))
+        add_node("execute_sql", node("execute_function"))
+        add_node("process_results", self.process_results)
+        add_node("summarize", node("summarize_results"))
+        add_node("seek_clarification_on_draft_sql",
+                 self.seek_clarification_on_draft_sql)
+        add_node("handle_sql_error", node("handle_sql_error"))
+        add_node("display_generated_sql",
+                 self.display_generated_sql)  # New node
+
+        # Define the workflow; resume() re-enters at execute_sql to collect
+        # the output of its query job
+        graph.set_conditional_entry_point(
+            self.check_entry,
+            {
+                "new": "lookup_cached_sql",
+                "job": "execute_sql"
+            }
+        )
+
+        # Previously verified SQL skips the understand/generate/verify calls
+        graph.add_conditional_edges(
+            "lookup_cached_sql",
+            self.check_sql_cache_status,
+            {
+                "hit": "display_generated_sql",
+                "fast_path": "fast_path_generate",
+                "miss": "understand_and_expand_user_query"
+            }
+        )
+
+        # Fused single-call path; falls back to the full multi-node path
+        graph.add_conditional_edges(
+            "fast_path_generate",
+            self.check_fast_path_status,
+            {
+                "proceed": "display_generated_sql",
+                "fallback": "understand_and_expand_user_query"
+            }
+        )
 
         graph.add_conditional_edges(
             "understand_and_expand_user_query",
@@ -110,7 +293,9 @@ class SQLAgent:
             self.check_sql_verification_status,
             {
                 "proceed": "display_generated_sql",  # Show SQL to User
-                "clarify": "seek_clarification_on_draft_sql"
+                "clarify": "seek_clarification_on_draft_sql",
+                # Pruned schema hid something; regenerate with all columns
+                "widen_schema": "generate_sql"
             }
         )
 
@@ -119,19 +304,32 @@ class SQLAgent:
             "display_generated_sql",
             self.check_user_feedback,
             {
-                "execute": "execute_sql",  # User wants to execute
+                "execute": "check_query_cost",  # User wants to execute
                 "modify": "generate_sql",  # User wants to modify
                 # User needs clarification
                 "clarify": "seek_clarification_on_draft_sql"
             }
         )
 
+        # EXPLAIN first: over-budget queries are limited, held or blocked
+        graph.add_conditional_edges(
+            "check_query_cost",
+            self.check_cost_gate_status,
+            {
+                "execute": "execute_sql",
+                "stop": END
+            }
+        )
+
         graph.add_conditional_edges(
             "execute_sql",
             self.check_execution_status,
             {
                 "success": "process_results",
-                "error": "handle_sql_error"
+                "error": "handle_sql_error",
+                # Cancelled by the user, no room in the query job queue, or
+                # submitted as a job for resume() to collect
+                "stop": END
             }
         )
 
@@ -158,9 +356,455 @@ class SQLAgent:
             }
         )
         
-        self.graph = graph.compile()
+        return graph.compile()
+
+    @staticmethod
+    def _instrumented(name: str, fn):
+        """Wrap a node so its wall time (and the calls it makes) are
+        recorded on the request's trace."""
+        if inspect.iscoroutinefunction(fn):
+            async def async_node(state: AgentState) -> Dict[str, Any]:
+                with node_span(state.get('trace'), name):
+                    return await fn(state)
+            return async_node
+
+        def node(state: AgentState) -> Dict[str, Any]:
+            with node_span(state.get('trace'), name):
+                return fn(state)
+        return node
+
+    def _record_call(self, call, started: float, reply, failed: bool,
+                     model_name: Optional[str] = None) -> None:
+        span = current_span()
+        if span is None:
+            return
+        trace, node = span
+        seconds = time.perf_counter() - started
+        if isinstance(call, _ToolCall):
+            trace.record_db_call(node, seconds, failed)
+        else:
+            self.budget.add(trace.record_model_call(
+                node, seconds, reply, failed, model=model_name))
+
+    def _model_for(self, call, steps: NodeSteps):
+        """(model, model name) for a call: the agent's model, or the
+        fallback model when only that fits the remaining budget. Raises
+        BudgetExceeded (closing the node's steps) when neither fits."""
+        if isinstance(call, _ToolCall):
+            return None, None
+        span = current_span()
+        remaining = self.budget.remaining(span[0].cost() if span else 0.0)
+        if remaining is None:
+            return self.model, self.model_name
+        left, scope, limit, spent = remaining
+        output_tokens = Config.BUDGET["expected_output_tokens"]
+        estimate = estimate_call_cost(call.messages, self.model_name, output_tokens)
+        if estimate <= left:
+            return self.model, self.model_name
+        if self.fallback_model is not None:
+            fallback_estimate = estimate_call_cost(
+                call.messages, self.fallback_model_name, output_tokens)
+            if fallback_estimate <= left:
+                logging.warning(f"Downgrading to {self.fallback_model_name} "
+                                f"to stay within the {scope} budget.")
+                return self.fallback_model, self.fallback_model_name
+        steps.close()
+        raise BudgetExceeded(scope, limit, spent, estimate)
+
+    def _run_steps(self, steps: NodeSteps) -> Dict[str, Any]:
+        """Drive a node's step generator, making its model and tool calls
+        synchronously. Call errors are raised inside the node; a
+        BudgetExceeded stops the graph."""
+        reply, error = None, None
+        while True:
+            try:
+                call = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            model, model_name = self._model_for(call, steps)
+            started = time.perf_counter()
+            try:
+                if isinstance(call, _ToolCall):
+                    with request_scope(self._request_id()):
+                        reply = call.tool.invoke(call.args)
+                elif (writer := self._token_writer(call)) is not None:
+                    for chunk in model.stream(call.messages):
+                        if chunk.content:
+                            writer({"type": "token", "content": chunk.content})
+                        reply = chunk if reply is None else reply + chunk
+                else:
+                    reply = model.invoke(call.messages)
+            except Exception as e:
+                error = e
+            self._record_call(call, started, reply, error is not None, model_name)
+
+    async def _arun_steps(self, steps: NodeSteps) -> Dict[str, Any]:
+        """Async twin of :meth:`_run_steps` using ``ainvoke``."""
+        reply, error = None, None
+        while True:
+            try:
+                call = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            reply, error = None, None
+            model, model_name = self._model_for(call, steps)
+            started = time.perf_counter()
+            try:
+                if isinstance(call, _ToolCall):
+                    with request_scope(self._request_id()):
+                        reply = await call.tool.ainvoke(call.args)
+                elif (writer := self._token_writer(call)) is not None:
+                    async for chunk in model.astream(call.messages):
+                        if chunk.content:
+                            writer({"type": "token", "content": chunk.content})
+                        reply = chunk if reply is None else reply + chunk
+                else:
+                    reply = await model.ainvoke(call.messages)
+            except Exception as e:
+                error = e
+            self._record_call(call, started, reply, error is not None, model_name)
+
+    @staticmethod
+    def _request_id() -> Optional[str]:
+        """Id of the request whose node is running, for cancellation."""
+        span = current_span()
+        return span[0].request_id if span is not None else None
+
+    @staticmethod
+    def _token_writer(call: _ModelCall):
+        """Stream writer for the tokens of ``call`` when the graph run was
+        started by stream()/astream(), else None."""
+        if not call.stream:
+            return None
+        try:
+            config = get_config()
+        except RuntimeError:  # node called directly, outside a graph run
+            return None
+        if not config.get("configurable", {}).get("stream_tokens"):
+            return None
+        return get_stream_writer()
+
+    # LLM and database nodes, blocking (ask) and async (aask) variants
+
+    def fast_path_generate(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._fast_path_generate_steps(state))
+
+    async def afast_path_generate(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._fast_path_generate_steps(state))
 
     def understand_and_expand_user_query(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._understand_and_expand_user_query_steps(state))
+
+    async def aunderstand_and_expand_user_query(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._understand_and_expand_user_query_steps(state))
+
+    def generate_sql(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._generate_sql_steps(state))
+
+    async def agenerate_sql(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._generate_sql_steps(state))
+
+    def verify_sql(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._verify_sql_steps(state))
+
+    async def averify_sql(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._verify_sql_steps(state))
+
+    def handle_sql_error(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._handle_sql_error_steps(state))
+
+    async def ahandle_sql_error(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._handle_sql_error_steps(state))
+
+    def check_query_cost(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._check_query_cost_steps(state))
+
+    async def acheck_query_cost(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._check_query_cost_steps(state))
+
+    def execute_function(self, state: AgentState) -> Dict[str, Any]:
+        # A collected job is done with; a retry submits a new one
+        return {**self._run_steps(self._execute_function_steps(state)),
+                "job_id": None}
+
+    async def aexecute_function(self, state: AgentState) -> Dict[str, Any]:
+        return {**await self._arun_steps(self._execute_function_steps(state)),
+                "job_id": None}
+
+    def summarize_results(self, state: AgentState) -> Dict[str, Any]:
+        return self._run_steps(self._summarize_results_steps(state))
+
+    async def asummarize_results(self, state: AgentState) -> Dict[str, Any]:
+        return await self._arun_steps(self._summarize_results_steps(state))
+
+    def _context_fingerprint(self) -> str:
+        return context_fingerprint(self.schema, self.system_prompt)
+
+    def _query_tool(self):
+        """The tool that runs SQL (and EXPLAIN), None if none is registered."""
+        return next((self.tools[name] for name in self.QUERY_TOOL_NAMES
+                     if name in self.tools), None)
+
+    def _relevant_examples(self, question: str) -> List[NLQExample]:
+        """Top-k similar examples, most similar first; constant in size
+        however large the example bank grows."""
+        if self.example_index is None or not self.num_examples:
+            return []
+        return self.example_index.top_examples(question, self.num_examples)
+
+    def _is_schema_pruned(self, query_result: Dict[str, Any]) -> bool:
+        return bool(self.prune_schema and self.schema and
+                    query_result.get('metadata', {}).get('schema_scope') != 'full')
+
+    def _prompt_builder(self, node: str) -> PromptBuilder:
+        budget = Config.PROMPT_BUDGET
+        return PromptBuilder(self.token_counter,
+                             budget["nodes"].get(node, budget["max_tokens"]))
+
+    def _prompt_text(self, node: str, prompt: PromptBuilder) -> str:
+        """Fit ``prompt`` to its budget and record its per-segment tokens."""
+        build = prompt.build()
+        logging.info(f"{node} prompt tokens: {build.segments} "
+                     f"(total {build.total_tokens}/{build.max_tokens}, "
+                     f"trimmed {build.trimmed})")
+        span = current_span()
+        if span is not None:
+            span[0].record_prompt(node, build.report())
+        return build.text
+
+    @staticmethod
+    def _add_examples(prompt: PromptBuilder, examples: List[NLQExample]) -> None:
+        prompt.add_items(
+            "examples", examples,
+            lambda kept: ("\n        Similar Example Questions and SQL:\n        "
+                          f"{format_examples(kept) or 'None available.'}"),
+            trim_as="examples")
+
+    def _add_schema(self, prompt: PromptBuilder, query_result: Dict[str, Any],
+                    question: Optional[str] = None, label: str = "Database Schema",
+                    indent: str = "        ",
+                    examples: Optional[List[NLQExample]] = None) -> None:
+        """Schema segment: the question-relevant subset, or the full schema
+        once verification has asked for it. Over budget, the least relevant
+        columns are dropped first. ``examples`` are the prompt's retrieved
+        examples, looked up here when not given."""
+        if not self.schema:
+            prompt.add("schema", f"{indent}{label}: {self.schema}")
+            return
+        metadata = query_result.get('metadata', {})
+        question = question or metadata.get('expanded_query') or \
+            metadata.get('user_query', '')
+        if examples is None:
+            examples = self._relevant_examples(question)
+        pruned = self._is_schema_pruned(query_result)
+        schema = (select_relevant_schema(
+            question, self.schema, self.column_synonyms, examples,
+            max_columns=Config.SCHEMA_PRUNING["max_columns"])
+            if pruned else self.schema)
+        ranked = rank_columns(question, schema, self.column_synonyms, examples)
+
+        def render(kept):
+            text = f"{indent}{label}: {schema_subset(schema, kept)}"
+            if pruned or len(kept) < len(ranked):
+                text += (f"\n{indent}(Only the columns most relevant to this "
+                         "question are listed; the tables have more.)")
+            return text
+
+        prompt.add_items("schema", ranked, render, trim_as="columns",
+                         min_items=sum(c in MANDATORY_COLUMNS for _, c in ranked))
+
+    def lookup_cached_sql(self, state: AgentState) -> Dict[str, Any]:
+        """Serve previously verified SQL for the same question, if cached."""
+        messages = state.get('messages', [])
+        user_query = messages[-1].content if isinstance(messages[-1], HumanMessage) else ''
+
+        cached = None
+        if self.sql_cache is not None and user_query:
+            cached = self.sql_cache.lookup(user_query, self._context_fingerprint())
+        if not cached:
+            logging.info("SQL generation cache miss.")
+            return {"current_step": "lookup_cached_sql"}
+
+        logging.info(f"SQL generation cache hit: {cached['sql_query']}")
+        return {
+            "messages": messages + [AIMessage(content="Reusing previously verified SQL.")],
+            "query_result": {
+                'success': True,
+                'data': None,
+                'error': None,
+                'raw_result': None,
+                'sql_query': cached['sql_query'],
+                'reasoning': cached.get('reasoning'),
+                'summary': None,
+                'usage': None,
+                'metadata': {
+                    'user_query': user_query,
+                    'expanded_query': cached.get('expanded_query', user_query),
+                    'attempt': 0,
+                    'sql_cache_hit': True,
+                    'action_taken': 'sql_served_from_cache'
+                },
+                'action': 'cache_hit',
+                'missing_tables': [],
+                'missing_columns': []
+            },
+            "current_step": "lookup_cached_sql"
+        }
+
+    def _remember_verified_sql(self, query_result: Dict[str, Any]) -> None:
+        metadata = query_result.get('metadata', {})
+        if self.sql_cache is None or not metadata.get('user_query'):
+            return
+        self.sql_cache.store(metadata['user_query'], self._context_fingerprint(), {
+            'sql_query': query_result.get('sql_query'),
+            'reasoning': query_result.get('reasoning'),
+            'expanded_query': metadata.get('expanded_query'),
+        })
+
+    def _forget_cached_sql(self, query_result: Dict[str, Any]) -> None:
+        user_query = query_result.get('metadata', {}).get('user_query')
+        if self.sql_cache is not None and user_query:
+            self.sql_cache.forget(user_query, self._context_fingerprint())
+
+    def check_sql_cache_status(self, state: AgentState) -> str:
+        """Route cache hits straight to SQL display/execution."""
+        action = (state.get('query_result') or {}).get('action')
+        if action == 'cache_hit':
+            return "hit"
+        return "fast_path" if self.fast_path else "miss"
+
+    def _fast_path_generate_steps(self, state: AgentState) -> NodeSteps:
+        """One structured LLM call that expands the question, writes the SQL
+        and self-checks it; accepted only if local validation passes."""
+        messages = state.get('messages', [])
+        user_query = messages[-1].content if isinstance(messages[-1], HumanMessage) else ''
+
+        logging.info(f"\n\n===>> Entering ::  fast_path_generate. User query: {user_query}")
+
+        prompt = self._prompt_builder("fast_path_generate")
+        prompt.add("question", f"""
+        Original User Query: {user_query}""")
+        examples = self._relevant_examples(user_query)
+        self._add_schema(prompt, {}, user_query, examples=examples)
+        self._add_examples(prompt, examples)
+        prompt.add("instructions", """
+        In a single step: understand the question, write a Redshift SQL query
+        that answers it, then check your own work.
+
+        IMPORTANT RULES:
+        1. Use ONLY tables and columns that exist in the provided schema
+        2. For "sales" queries, use booking_state IN ('CONFIRMED', 'PENDING', 'FULFILLED')
+        3. For revenue, use gross_total_sgd, net_total_sgd, or booking_gross_total_sgd
+        4. For date filtering, use booking_date as default unless specified otherwise
+        5. Always include LIMIT 100 for exploratory queries
+        6. If the question is truly ambiguous, set requires_clarification to true
+
+        Output a JSON with:
+        {
+            "expanded_query": "Clear, expanded version of the query",
+            "requires_clarification": true/false,
+            "clarification_questions": ["question1"],
+            "sql_query": "YOUR_SQL_QUERY_HERE",
+            "reasoning": "YOUR_REASONING_FOR_SQL_QUERY_HERE",
+            "missing_tables": [],
+            "missing_columns": [],
+            "self_check": {
+                "uses_only_schema_columns": true/false,
+                "matches_intent": true/false,
+                "is_read_only": true/false
+            }
+        }
+        """, static=True)
+        fast_path_prompt = self._prompt_text("fast_path_generate", prompt)
+        usage = None
+        fallback_reason = None
+        llm_response = None
+        try:
+            print("\n[LLM PROMPT] fast_path_generate:\n", fast_path_prompt)
+            response = yield _ModelCall([SystemMessage(content=fast_path_prompt)])
+            usage = extract_token_usage(response)
+            print("\n[LLM RAW RESPONSE] fast_path_generate:\n", response.content)
+            llm_response = safe_json_loads(response.content)
+        except Exception as e:
+            fallback_reason = f"Fast path call failed: {str(e)}"
+
+        if fallback_reason is None:
+            fallback_reason = self._fast_path_rejection(llm_response)
+
+        if fallback_reason:
+            logging.info(f"\n\n===>> Exiting ::  fast_path_generate. Falling back: {fallback_reason}")
+            # No message appended: the next node reads the user query from
+            # the last (human) message
+            return {
+                "messages": messages,
+                "query_result": {
+                    'success': True,
+                    'action': 'fast_path_fallback',
+                    'usage': usage,
+                    'metadata': {
+                        'user_query': user_query,
+                        'attempt': 0,
+                        'fast_path_fallback_reason': fallback_reason,
+                        'action_taken': 'fast_path_rejected'
+                    }
+                },
+                "current_step": "fast_path_generate"
+            }
+
+        query_result = {
+            'success': True,
+            'data': None,
+            'error': None,
+            'raw_result': None,
+            'sql_query': llm_response['sql_query'],
+            'reasoning': llm_response.get('reasoning', 'No reasoning provided.'),
+            'summary': None,
+            'usage': usage,
+            'metadata': {
+                'user_query': user_query,
+                'expanded_query': llm_response.get('expanded_query', user_query),
+                'attempt': 0,
+                'fast_path': True,
+                'action_taken': 'sql_generated_fast_path'
+            },
+            'action': 'proceed',
+            'missing_tables': [],
+            'missing_columns': []
+        }
+        self._remember_verified_sql(query_result)
+        logging.info(f"\n\n===>> Exiting ::  fast_path_generate with SQL: {query_result['sql_query']}")
+        return {
+            "messages": messages + [AIMessage(content="SQL generated and self-checked.")],
+            "query_result": query_result,
+            "current_step": "fast_path_generate"
+        }
+
+    def _fast_path_rejection(self, llm_response) -> Optional[str]:
+        """Why a fast-path answer cannot be used as-is (None if it can)."""
+        if not llm_response:
+            return "The LLM did not return a valid JSON response."
+        if llm_response.get('requires_clarification'):
+            return "Clarification needed."
+        if llm_response.get('missing_tables') or llm_response.get('missing_columns'):
+            return "The LLM reported missing schema elements."
+        self_check = llm_response.get('self_check') or {}
+        failed_checks = [name for name in ('uses_only_schema_columns',
+                                           'matches_intent', 'is_read_only')
+                         if self_check.get(name) is not True]
+        if failed_checks:
+            return f"Self-check failed: {', '.join(failed_checks)}"
+        validation = validate_sql(llm_response.get('sql_query', ''),
+                                  self.schema, self.allowed_tables)
+        if not validation['is_valid']:
+            return f"Local validation failed: {'; '.join(validation['issues'])}"
+        return None
+
+    def check_fast_path_status(self, state: AgentState) -> str:
+        action = (state.get('query_result') or {}).get('action')
+        return "fallback" if action == 'fast_path_fallback' else "proceed"
+
+    def _understand_and_expand_user_query_steps(self, state: AgentState) -> NodeSteps:
         """LLM-driven query understanding and expansion."""
         messages = state.get('messages', [])
         user_query = messages[-1].content if isinstance(messages[-1], HumanMessage) else ''
@@ -168,10 +812,11 @@ class SQLAgent:
         logging.info(f"\n\n===>> Entering ::  understand_and_expand_user_query. User query: {user_query}")
         
         # LLM prompt for query understanding and expansion
-        understanding_prompt = f"""
-        Original User Query: {user_query}
-        Available Schema: {self.schema}
-        
+        prompt = self._prompt_builder("understand_and_expand_user_query")
+        prompt.add("question", f"""
+        Original User Query: {user_query}""")
+        self._add_schema(prompt, {}, user_query, label="Available Schema")
+        prompt.add("instructions", """
         Your task is to:
         1. Understand the user's intent
         2. Identify any ambiguous terms or missing context
@@ -182,20 +827,22 @@ class SQLAgent:
         For common queries like "sales from last month", use reasonable defaults and proceed.
         
         Output a JSON with:
-        {{
+        {
             "expanded_query": "Clear, expanded version of the query",
             "identified_terms": ["term1", "term2"],
             "missing_context": ["context1", "context2"],
             "schema_concerns": ["concern1", "concern2"],
             "requires_clarification": true/false,
             "clarification_questions": ["question1", "question2"]
-        }}
-        """
+        }
+        """, static=True)
+        understanding_prompt = self._prompt_text(
+            "understand_and_expand_user_query", prompt)
         usage =0.0
         try:
             # In understand_and_expand_user_query
             print("\n[LLM PROMPT] understand_and_expand_user_query:\n", understanding_prompt)
-            response = self.model.invoke([SystemMessage(content=understanding_prompt)])
+            response = yield _ModelCall([SystemMessage(content=understanding_prompt)])
             usage = extract_token_usage(response)
             print("\n[LLM RAW RESPONSE] understand_and_expand_user_query:\n", response.content)
             llm_analysis = safe_json_loads(response.content)
@@ -276,7 +923,7 @@ class SQLAgent:
                 "current_step": "understand_and_expand_user_query"
             }
 
-    def generate_sql(self, state: AgentState) -> Dict[str, Any]:
+    def _generate_sql_steps(self, state: AgentState) -> NodeSteps:
         """Generate SQL query with reasoning."""
         messages = state.get('messages', [])
         query_result = state.get('query_result', {})
@@ -317,13 +964,17 @@ class SQLAgent:
             }
 
         # Enhanced SQL generation prompt with better schema awareness
-        sql_generation_prompt = f"""
+        prompt = self._prompt_builder("generate_sql")
+        prompt.add("header", """
         Given the user query and the database schema, generate a SQL query.
-        
-        Database Schema: {self.schema}
-        Original User Query: {user_query}
-        Expanded Query: {expanded_query}
-        
+        """, static=True)
+        examples = self._relevant_examples(expanded_query or user_query)
+        self._add_schema(prompt, query_result, expanded_query or user_query,
+                         examples=examples)
+        prompt.add("question", f"""        Original User Query: {user_query}
+        Expanded Query: {expanded_query}""")
+        self._add_examples(prompt, examples)
+        prompt.add("instructions", """
         IMPORTANT RULES:
         1. Use ONLY tables and columns that exist in the provided schema
         2. For "sales" queries, use booking_state IN ('CONFIRMED', 'PENDING', 'FULFILLED')
@@ -337,17 +988,18 @@ class SQLAgent:
         do NOT hallucinate; instead, note it as a missing element.
         
         Output a JSON object with the following structure:
-        {{
+        {
             "sql_query": "YOUR_SQL_QUERY_HERE",
             "reasoning": "YOUR_REASONING_FOR_SQL_QUERY_HERE",
             "missing_tables": ["table1", "table2"], 
             "missing_columns": ["column1", "column2"]
-        }}
+        }
         If no tables or columns are missing, provide empty lists.
-        """
+        """, static=True)
+        sql_generation_prompt = self._prompt_text("generate_sql", prompt)
         try:
             print("\n[LLM PROMPT] generate_sql:\n", sql_generation_prompt)
-            response = self.model.invoke([SystemMessage(content=sql_generation_prompt)])
+            response = yield _ModelCall([SystemMessage(content=sql_generation_prompt)])
             usage = extract_token_usage(response)
             print("\n[LLM RAW RESPONSE] generate_sql:\n", response.content)
             llm_response = safe_json_loads(response.content)
@@ -387,6 +1039,8 @@ class SQLAgent:
                 'metadata': {**query_result.get('metadata', {}),
                             'user_query': user_query,
                             'expanded_query': expanded_query,
+                            'schema_scope': ('pruned' if self._is_schema_pruned(query_result)
+                                             else 'full'),
                             'action_taken': 'sql_generated'},
                 'action': 'proceed',
                 'missing_tables': missing_tables,
@@ -415,114 +1069,104 @@ class SQLAgent:
                 "current_step": "generate_sql"
             }
 
-    def verify_sql(self, state: AgentState) -> Dict[str, Any]:
-        """LLM-driven SQL verification against schema and user intent."""
+    def _verify_sql_steps(self, state: AgentState) -> NodeSteps:
+        """Verify the SQL locally against the schema, then (per
+        ``verify_policy``) ask the LLM whether it matches the user's intent."""
         messages = state.get('messages', [])
         query_result = state.get('query_result', {})
         sql_query = query_result.get('sql_query', '')
         user_query = query_result.get('metadata', {}).get('user_query', '')
         expanded_query = query_result.get('metadata', {}).get('expanded_query', user_query)
-        
+        usage = None
+
         logging.info(f"\n\n===>> Entering ::  verify_sql. SQL: {sql_query}, User Query: {user_query}")
-        
-        # LLM prompt for comprehensive SQL verification
-        verification_prompt = f"""
+
+        # Tables, columns and syntax are checked in code, not by the LLM
+        validation = validate_sql(sql_query, self.schema, self.allowed_tables)
+        logging.info(f"verify_sql local validation: {validation}")
+        missing_tables = validation['missing_tables']
+        missing_columns = validation['missing_columns']
+
+        if (missing_tables or missing_columns) and \
+                self._is_schema_pruned(query_result):
+            logging.info("\n\n===>> Exiting ::  verify_sql. Missing schema elements "
+                         "with a pruned schema; regenerating with the full schema.")
+            return {
+                "messages": messages + [AIMessage(content="Retrying with the full schema.")],
+                "query_result": {
+                    **query_result,
+                    'action': 'widen_schema',
+                    'metadata': {
+                        **query_result.get('metadata', {}),
+                        'schema_scope': 'full',
+                        'action_taken': 'schema_widened',
+                        'verification_reasoning': '; '.join(validation['issues'])
+                    }
+                },
+                "current_step": "verify_sql"
+            }
+
+        if not validation['is_valid']:
+            return self._verification_failed(
+                state, validation['issues'], "Local SQL validation failed.",
+                missing_tables=missing_tables, missing_columns=missing_columns)
+
+        if self.verify_policy == 'skip':
+            return self._verification_passed(
+                state, "Local validation passed; semantic check skipped by policy.")
+
+        # LLM prompt for the semantic (intent) check only
+        prompt = self._prompt_builder("verify_sql")
+        prompt.add("question", f"""
         Original User Query: {user_query}
         Expanded Query: {expanded_query}
-        Generated SQL: {sql_query}
-        Available Schema: {self.schema}
-        
+        Generated SQL: {sql_query}""")
+        prompt.add("instructions", """
+        The SQL has already been checked against the schema: all tables and
+        columns exist and the syntax is valid.
+
         Your task is to verify:
         1. Does the SQL accurately reflect the user's intent?
-        2. Are all tables and columns used in the SQL present in the schema?
-        3. Is the SQL syntactically correct?
-        4. Are there any logical issues or missing conditions?
-        
+        2. Are there any logical issues or missing conditions?
+
         Output a JSON with:
-        {{
+        {
             "is_valid": true/false,
             "reasoning": "Detailed explanation of verification results",
-            "missing_tables": ["table1", "table2"],
-            "missing_columns": ["column1", "column2"],
-            "syntax_issues": ["issue1", "issue2"],
             "logical_issues": ["issue1", "issue2"],
             "suggested_fixes": ["fix1", "fix2"],
             "requires_clarification": true/false,
             "clarification_reason": "Why clarification is needed"
-        }}
-        """
-        
+        }
+        """, static=True)
+        verification_prompt = self._prompt_text("verify_sql", prompt)
+
         try:
             print("\n[LLM PROMPT] verify_sql:\n", verification_prompt)
-            response = self.model.invoke([SystemMessage(content=verification_prompt)])
+            response = yield _ModelCall([SystemMessage(content=verification_prompt)])
             usage = extract_token_usage(response)
             print("\n[LLM RAW RESPONSE] verify_sql:\n", response.content)
             verification_result = safe_json_loads(response.content)
             print("\n[LLM PARSED JSON] verify_sql:\n", verification_result)
-            
+
             is_valid = verification_result.get('is_valid', False)
-            missing_tables = verification_result.get('missing_tables', [])
-            missing_columns = verification_result.get('missing_columns', [])
             requires_clarification = verification_result.get('requires_clarification', False)
-            
+
             if not is_valid or requires_clarification:
-                # Construct comprehensive clarification message
                 issues = []
-                if missing_tables:
-                    issues.append(f"Missing tables: {', '.join(missing_tables)}")
-                if missing_columns:
-                    issues.append(f"Missing columns: {', '.join(missing_columns)}")
-                if verification_result.get('syntax_issues'):
-                    issues.append(f"Syntax issues: {', '.join(verification_result['syntax_issues'])}")
                 if verification_result.get('logical_issues'):
                     issues.append(f"Logical issues: {', '.join(verification_result['logical_issues'])}")
-                
-                clarification_message = (
-                    "I couldn't generate a valid SQL query because:\n" +
-                    "\n".join([f"• {issue}" for issue in issues]) + "\n\n" +
-                    f"Reasoning: {verification_result.get('reasoning', 'No specific reason provided')}\n\n" +
-                    "Please clarify your request or provide more specific details about what you're looking for."
-                )
-                
-                logging.info(f"\n\n===>> Exiting ::  verify_sql with clarification. Issues: {issues}")
-                return {
-                    "messages": messages + [AIMessage(content=clarification_message)],
-                    "query_result": {
-                        **query_result,
-                        'success': False,
-                        'error': clarification_message,
-                        'action': 'clarify',
-                        'missing_tables': missing_tables,
-                        'missing_columns': missing_columns,
-                        'usage': usage,
-                        'metadata': {
-                            **query_result.get('metadata', {}),
-                            'action_taken': 'sql_verification_failed',
-                            'verification_reasoning': verification_result.get('reasoning'),
-                            'suggested_fixes': verification_result.get('suggested_fixes', [])
-                        }
-                    },
-                    "current_step": "verify_sql"
-                }
-            
-            logging.info("\n\n===>> Exiting ::  verify_sql with proceed. SQL verified successfully.")
-            return {
-                "messages": messages + [AIMessage(content="SQL verified successfully.")],
-                "query_result": {
-                    **query_result,
-                    'success': True,
-                    'error': None,
-                    'action': 'proceed',
-                    'usage': usage,
-                    'metadata': {
-                        **query_result.get('metadata', {}),
-                        'action_taken': 'sql_verified',
-                        'verification_reasoning': verification_result.get('reasoning')
-                    }
-                },
-                "current_step": "verify_sql"
-            }
-            
+                if requires_clarification and verification_result.get('clarification_reason'):
+                    issues.append(verification_result['clarification_reason'])
+                return self._verification_failed(
+                    state, issues,
+                    verification_result.get('reasoning', 'No specific reason provided'),
+                    usage=usage,
+                    suggested_fixes=verification_result.get('suggested_fixes', []))
+
+            return self._verification_passed(
+                state, verification_result.get('reasoning'), usage=usage)
+
         except Exception as e:
             error_msg = f"Error during SQL verification: {str(e)}"
             logging.error(error_msg)
@@ -542,6 +1186,60 @@ class SQLAgent:
                 "current_step": "verify_sql"
             }
 
+    def _verification_passed(self, state: AgentState, reasoning,
+                             usage=None) -> Dict[str, Any]:
+        query_result = state.get('query_result', {})
+        logging.info("\n\n===>> Exiting ::  verify_sql with proceed. SQL verified successfully.")
+        self._remember_verified_sql(query_result)
+        return {
+            "messages": state.get('messages', []) + [AIMessage(content="SQL verified successfully.")],
+            "query_result": {
+                **query_result,
+                'success': True,
+                'error': None,
+                'action': 'proceed',
+                'usage': usage,
+                'metadata': {
+                    **query_result.get('metadata', {}),
+                    'action_taken': 'sql_verified',
+                    'verification_reasoning': reasoning
+                }
+            },
+            "current_step": "verify_sql"
+        }
+
+    def _verification_failed(self, state: AgentState, issues, reasoning,
+                             usage=None, missing_tables=None,
+                             missing_columns=None,
+                             suggested_fixes=None) -> Dict[str, Any]:
+        query_result = state.get('query_result', {})
+        clarification_message = (
+            "I couldn't generate a valid SQL query because:\n" +
+            "\n".join([f"• {issue}" for issue in issues]) + "\n\n" +
+            f"Reasoning: {reasoning}\n\n" +
+            "Please clarify your request or provide more specific details about what you're looking for."
+        )
+        logging.info(f"\n\n===>> Exiting ::  verify_sql with clarification. Issues: {issues}")
+        return {
+            "messages": state.get('messages', []) + [AIMessage(content=clarification_message)],
+            "query_result": {
+                **query_result,
+                'success': False,
+                'error': clarification_message,
+                'action': 'clarify',
+                'missing_tables': missing_tables or [],
+                'missing_columns': missing_columns or [],
+                'usage': usage,
+                'metadata': {
+                    **query_result.get('metadata', {}),
+                    'action_taken': 'sql_verification_failed',
+                    'verification_reasoning': reasoning,
+                    'suggested_fixes': suggested_fixes or []
+                }
+            },
+            "current_step": "verify_sql"
+        }
+
     def seek_clarification_on_draft_sql(self, state: AgentState) -> Dict[str, Any]:
         """Provides clarification to the user based on missing information."""
         messages = state.get('messages', [])
@@ -619,8 +1317,19 @@ class SQLAgent:
             "current_step": "display_generated_sql"
         }
 
+    def check_cost_gate_status(self, state: AgentState) -> str:
+        action = state.get('query_result', {}).get('action')
+        if action in ('confirm_cost', 'blocked_cost'):
+            return "stop"
+        return "execute"
+
+    def check_entry(self, state: AgentState) -> str:
+        return "job" if state.get('job_id') else "new"
+
     def check_execution_status(self, state: AgentState) -> str:
         query_result = state.get('query_result', {})
+        if query_result.get('action') in ('cancelled', 'busy', 'job_submitted'):
+            return "stop"
         if query_result.get('success'):
             return "success"
         return "error"
@@ -637,7 +1346,9 @@ class SQLAgent:
     def check_sql_verification_status(self, state: AgentState) -> str:
         """Check if generated SQL is valid and ready for user review."""
         query_result = state.get('query_result', {})
-        
+        if query_result.get('action') == 'widen_schema':
+            return "widen_schema"
+
         # Check for missing elements
         missing_tables = query_result.get('missing_tables', [])
         missing_columns = query_result.get('missing_columns', [])
@@ -645,7 +1356,8 @@ class SQLAgent:
         # Check if SQL was generated
         sql_query = query_result.get('sql_query', '')
         
-        if missing_tables or missing_columns or not sql_query.strip():
+        if query_result.get('action') == 'clarify' or \
+                missing_tables or missing_columns or not sql_query.strip():
             logging.info(f"Verification failed: missing_tables={missing_tables}, missing_columns={missing_columns}")
             return "clarify"
         
@@ -688,7 +1400,7 @@ class SQLAgent:
         else:
             return "end"
 
-    def handle_sql_error(self, state: AgentState) -> Dict[str, Any]:
+    def _handle_sql_error_steps(self, state: AgentState) -> NodeSteps:
         """Handles SQL execution errors, attempting to fix or asking for clarification."""
         messages = state.get('messages', [])
         query_result = state.get('query_result', {})
@@ -707,6 +1419,9 @@ class SQLAgent:
         new_attempt_count = attempt_count + 1
         updated_metadata = {**query_result.get('metadata', {}),
                             'attempt': new_attempt_count}
+        if 'does not exist' in str(error_message):
+            # The pruned schema may have hidden the right column or table
+            updated_metadata['schema_scope'] = 'full'
 
         # Limit retries to prevent loops
         if new_attempt_count > self.max_attempts:
@@ -733,23 +1448,31 @@ class SQLAgent:
         
         # Prompt LLM to analyze and potentially fix the SQL error or ask for
         # clarification
-        error_analysis_prompt = f"""
+        prompt = self._prompt_builder("handle_sql_error")
+        prompt.add("question", f"""
 Original user query: {user_query}
-Generated SQL: {sql_query}
-SQL Error: {error_message}
-Schema: {self.schema}
-Analyze this SQL error. Can you fix the SQL query based on the schema and the
+Generated SQL: {sql_query}""")
+        prompt.add("error", f"SQL Error: {error_message}",
+                   max_tokens=Config.PROMPT_BUDGET["error_tokens"])
+        if updated_metadata.get('error_type') == TIMEOUT_ERROR:
+            prompt.add("timeout", """The query is valid but was cancelled by its statement timeout. Do not ask
+for clarification: retry with a cheaper query, e.g. a narrower date range,
+more selective filters, or aggregating before joining.""")
+        self._add_schema(prompt, {**query_result, 'metadata': updated_metadata},
+                         label="Schema", indent="")
+        prompt.add("instructions", """Analyze this SQL error. Can you fix the SQL query based on the schema and the
 error message? If you can fix it, provide the corrected SQL query.
 If the error indicates ambiguity or a missing concept in the user's original
-query that requires clarification, output a JSON with {{"action": "clarify",
-"terms": ["term1", "term2"]}}. Otherwise, output a JSON with
-{{"action": "retry_sql", "corrected_sql": "YOUR_CORRECTED_SQL_HERE"}}.
+query that requires clarification, output a JSON with {"action": "clarify",
+"terms": ["term1", "term2"]}. Otherwise, output a JSON with
+{"action": "retry_sql", "corrected_sql": "YOUR_CORRECTED_SQL_HERE"}.
 If it's an unresolvable error, just output a simple message that says the
 query cannot be fixed, like "I cannot fix this query.".
-"""
+""", static=True)
+        error_analysis_prompt = self._prompt_text("handle_sql_error", prompt)
         
         try:
-            response = self.model.invoke(
+            response = yield _ModelCall(
                 [SystemMessage(content=error_analysis_prompt)])
             usage = extract_token_usage(response)
             llm_decision = safe_json_loads(response.content)
@@ -791,6 +1514,9 @@ query cannot be fixed, like "I cannot fix this query.".
                     **query_result,
                     'sql_query': new_sql,
                     'error': None,  # Clear previous error
+                    # Routes back through generate_sql, which reuses new_sql
+                    'action': 'retry_sql',
+                    'action_taken': 'retry_sql',
                     'metadata': updated_metadata  # Already incremented above
                 }
                 return {
@@ -838,7 +1564,126 @@ query cannot be fixed, like "I cannot fix this query.".
                 "current_step": "handle_sql_error"
             }
 
-    def execute_function(self, state: AgentState) -> Dict[str, Any]:
+    def _check_query_cost_steps(self, state: AgentState) -> NodeSteps:
+        """EXPLAIN the SQL and limit, hold or block it when the plan is over
+        the cost gate's thresholds. The gate fails open: when EXPLAIN itself
+        fails, execute_sql runs the query and reports the real error."""
+        messages = state.get('messages', [])
+        query_result = state.get('query_result', {})
+        metadata = query_result.get('metadata', {})
+        sql_query = query_result.get('sql_query', '')
+        tool = self._query_tool()
+        if self.cost_gate is None or tool is None or not sql_query.strip():
+            return {"current_step": "check_query_cost"}
+
+        try:
+            output = yield _ToolCall(tool, {"query": f"EXPLAIN {sql_query}"})
+        except Exception as e:
+            output = {"error": str(e)}
+        if not output or "data" not in output:
+            error = (output or {}).get("error", "no plan returned")
+            logging.warning(f"EXPLAIN failed; running the query ungated: {error}")
+            return {
+                "query_result": {**query_result, 'metadata': {
+                    **metadata, 'cost_gate': {'action': 'allow',
+                                              'explain_error': error}}},
+                "current_step": "check_query_cost"
+            }
+
+        plan = parse_explain(plan_text(output["data"]))
+        action, reasons = evaluate_plan(plan, self.cost_gate)
+        if action == "limit":
+            limited_sql = add_limit(sql_query, self.cost_gate["limit_rows"])
+            if limited_sql is None:
+                action = "confirm"
+        if action == "confirm" and \
+                state.get('confirmed_sql') == normalize_sql(sql_query):
+            action = "allow"
+        decision = CostGateDecision(action=action, reasons=reasons, plan=plan)
+        logging.info(f"Cost gate: {decision}")
+
+        if action == "allow":
+            return {
+                "query_result": {**query_result,
+                                 'metadata': {**metadata, 'cost_gate': decision}},
+                "current_step": "check_query_cost"
+            }
+        if action == "limit":
+            return {
+                "query_result": {
+                    **query_result,
+                    'sql_query': limited_sql,
+                    'metadata': {**metadata, 'cost_gate': decision,
+                                 'unlimited_sql': sql_query}
+                },
+                "current_step": "check_query_cost"
+            }
+
+        reason_text = "\n".join(f"• {reason}" for reason in reasons)
+        if action == "block":
+            message = ("This query was not run because it looks too expensive "
+                       f"for the cluster:\n{reason_text}\n\nPlease narrow it "
+                       "down, e.g. with a shorter date range or fewer joins.")
+            result_action, action_taken = 'blocked_cost', 'query_blocked_by_cost_gate'
+        else:
+            message = ("This query looks expensive to run:\n"
+                       f"{reason_text}\n\nConfirm to run it anyway, or narrow "
+                       "it down, e.g. with a shorter date range.")
+            result_action, action_taken = 'confirm_cost', 'cost_confirmation_required'
+        return {
+            "messages": messages + [AIMessage(content=message)],
+            "query_result": {
+                **query_result,
+                'success': False,
+                'error': message,
+                'action': result_action,
+                'metadata': {**metadata, 'cost_gate': decision,
+                             'action_taken': action_taken}
+            },
+            "current_step": "check_query_cost"
+        }
+
+    def _submit_job(self, state: AgentState) -> Dict[str, Any]:
+        """Queue the SQL on the job executor and end the graph run with
+        action "job_submitted"; resume() collects the output."""
+        messages = state.get('messages', [])
+        query_result = state.get('query_result', {})
+        request_id = self._request_id()
+        try:
+            job_id = self.job_executor.submit(query_result.get('sql_query', ''),
+                                              request_id)
+        except JobQueueFull as e:
+            logging.warning(str(e))
+            error_detail = f"Redshift is busy: {e}"
+            return {
+                "messages": messages + [AIMessage(content=error_detail)],
+                "query_result": {
+                    **query_result,
+                    'success': False,
+                    'error': error_detail,
+                    'action': 'busy',
+                    'metadata': {**query_result.get('metadata', {}),
+                                 'error_type': QUEUE_FULL_ERROR,
+                                 'action_taken': 'sql_execution_rejected'}
+                },
+                "current_step": "execute_sql"
+            }
+        logging.info(f"SQL submitted as query job {job_id}.")
+        return {
+            "messages": messages + [AIMessage(content="SQL submitted as a query job.")],
+            "query_result": {
+                **query_result,
+                'success': True,
+                'action': 'job_submitted',
+                'metadata': {**query_result.get('metadata', {}),
+                             'job_id': job_id,
+                             'request_id': request_id,
+                             'action_taken': 'sql_job_submitted'}
+            },
+            "current_step": "execute_sql"
+        }
+
+    def _execute_function_steps(self, state: AgentState) -> NodeSteps:
         """Execute the SQL query or call a tool based on the agent's decision."""
         messages = state.get('messages', [])
         query_result = state.get('query_result', {})
@@ -848,11 +1693,14 @@ query cannot be fixed, like "I cannot fix this query.".
         logging.info(
             f"\n\n===>> Entering ::  execute_function. SQL to execute: {sql_query}")
 
-        tool_name = "redshift_query"
-        tool_to_call = self.tools.get(tool_name)
+        job_id = state.get('job_id')
+        if job_id is None and state.get('background_sql'):
+            return self._submit_job(state)
+
+        tool_to_call = self._query_tool()
 
         if not tool_to_call:
-            error_msg = f"Tool {tool_name} not found."
+            error_msg = f"Tool {self.QUERY_TOOL_NAMES[0]} not found."
             logging.error(error_msg)
             return {
                 "messages": messages + [AIMessage(content=error_msg)],
@@ -868,7 +1716,11 @@ query cannot be fixed, like "I cannot fix this query.".
             }
 
         try:
-            tool_output = tool_to_call.invoke({"query": sql_query})
+            if job_id is not None:
+                # resume(): the query ran in the background; collect it
+                tool_output = {**self.job_executor.result(job_id), 'job_id': job_id}
+            else:
+                tool_output = yield _ToolCall(tool_to_call, {"query": sql_query})
             logging.info(f"Tool output: {tool_output}")
 
             if not tool_output or "data" not in tool_output:
@@ -876,7 +1728,29 @@ query cannot be fixed, like "I cannot fix this query.".
                 if tool_output and "error" in tool_output:
                     error_detail = tool_output['error']
                 
+                error_type = (tool_output or {}).get('error_type')
+                if error_type in (CANCELLED_ERROR, QUEUE_FULL_ERROR):
+                    # Nothing for handle_sql_error to fix in the SQL
+                    logging.info(f"SQL execution stopped: {error_detail}")
+                    cancelled = error_type == CANCELLED_ERROR
+                    return {
+                        "messages": messages + [AIMessage(content=error_detail)],
+                        "query_result": {
+                            **query_result,
+                            'success': False,
+                            'error': error_detail,
+                            'action': 'cancelled' if cancelled else 'busy',
+                            'metadata': {**query_result.get('metadata', {}),
+                                         'error_type': error_type,
+                                         'action_taken': (
+                                             'sql_execution_cancelled' if cancelled
+                                             else 'sql_execution_rejected')}
+                        },
+                        "current_step": "execute_sql"
+                    }
                 logging.error(f"SQL execution failed: {error_detail}")
+                # Never serve SQL that failed to run from the generation cache
+                self._forget_cached_sql(query_result)
                 return {
                     "messages": messages + [AIMessage(content="SQL execution failed.")],
                     "query_result": {
@@ -886,14 +1760,24 @@ query cannot be fixed, like "I cannot fix this query.".
                         'raw_result': tool_output,
                         'action': 'error',
                         'metadata': {**query_result.get('metadata', {}),
+                                     'error_type': (tool_output or {}).get('error_type'),
+                                     'execution_policy': (tool_output or {}).get('policy'),
                                      'action_taken': 'sql_execution_failed'}
                     },
                     "current_step": "execute_sql"
                 }
 
-            result_df = pd.DataFrame(tool_output['data'])
-            raw_result = json.dumps(tool_output['data'])
-            summary = f"Query executed successfully. Returned {len(result_df)} rows."
+            # Columnar result; DataFrame/JSON views are derived on demand
+            result_data = tool_output['data']
+            truncated = tool_output.get('truncated', False)
+            policy = tool_output.get('policy') or {}
+            summary = f"Query executed successfully. Returned {len(result_data)} rows."
+            if truncated:
+                summary += (" The result was truncated at the row/size cap; "
+                            "only the rows fetched so far are shown.")
+            elif policy.get('limit') and len(result_data) >= policy['limit']:
+                summary += (f" The query was limited to {policy['limit']} rows; "
+                            "more rows may match.")
             logging.info(f"SQL execution successful. Summary: {summary}")
 
             return {
@@ -901,17 +1785,24 @@ query cannot be fixed, like "I cannot fix this query.".
                 "query_result": {
                     **query_result,
                     'success': True,
-                    'data': result_df,
-                    'raw_result': raw_result,
+                    'data': result_data,
+                    'raw_result': None,
                     'summary': summary,
                     'action': 'proceed',
                     'metadata': {**query_result.get('metadata', {}),
+                                 'row_count': len(result_data),
+                                 'truncated': truncated,
+                                 'from_cache': tool_output.get('cached', False),
+                                 'from_local_cache': tool_output.get('local_cache', False),
+                                 'job_id': tool_output.get('job_id'),
+                                 'error_type': None,
+                                 'execution_policy': policy or None,
                                  'action_taken': 'sql_executed_successfully'}
                 },
                 "current_step": "execute_sql"
             }
         except Exception as e:
-            error_msg = f"Error calling tool {tool_name}: {str(e)}"
+            error_msg = f"Error calling tool {tool_to_call.name}: {str(e)}"
             logging.error(error_msg)
             return {
                 "messages": messages + [AIMessage(content=error_msg)],
@@ -927,6 +1818,14 @@ query cannot be fixed, like "I cannot fix this query.".
                 "current_step": "execute_sql"
             }
 
+    @staticmethod
+    def _result_digest(result_data: ColumnarResult) -> Dict[str, Any]:
+        config = Config.RESULT_DIGEST
+        return digest_result(
+            result_data, chunk_rows=config["chunk_rows"], top_k=config["top_k"],
+            head_rows=config["head_rows"], tail_rows=config["tail_rows"],
+            full_rows_max=config["full_rows_max"])
+
     def process_results(self, state: AgentState) -> Dict[str, Any]:
         """Process the results of the executed SQL query."""
         messages = state.get('messages', [])
@@ -934,9 +1833,13 @@ query cannot be fixed, like "I cannot fix this query.".
         
         logging.info(f"\n\n===>> Entering ::  process_results. Query result: {query_result}")
 
-        # For now, simply passes the results along.
-        # In the future, this node can perform data manipulation or further analysis.
-        processed_result = query_result # No change for now
+        # Bounded statistical digest; the summarize prompt gets this, not rows
+        result_data = query_result.get('data')
+        processed_result = {
+            **query_result,
+            'digest': (self._result_digest(result_data)
+                       if result_data is not None else None)
+        }
 
         logging.info(f"\n\n===>> Exiting ::  process_results. Processed result: {processed_result}")
         return {
@@ -945,30 +1848,44 @@ query cannot be fixed, like "I cannot fix this query.".
             "current_step": "process_results"
         }
 
-    def summarize_results(self, state: AgentState) -> Dict[str, Any]:
+    def _summarize_results_steps(self, state: AgentState) -> NodeSteps:
         """Summarize the processed results for the user."""
         messages = state.get('messages', [])
         query_result = state.get('query_result', {})
         user_query = query_result.get('metadata', {}).get('user_query', '')
         data_summary = query_result.get('summary', 'No summary available.')
-        raw_data = query_result.get('raw_result', '')
+        result_data = query_result.get('data')
+        digest = query_result.get('digest')
+        if digest is None and result_data is not None:
+            digest = self._result_digest(result_data)
+        max_chars = Config.RESULT_DIGEST["max_chars"]
         
         logging.info(f"\n\n===>> Entering ::  summarize_results. User query: {user_query}, " +
                      f"Data summary: {data_summary}")
 
         # Prepare prompt for LLM to summarize the results
-        summary_prompt = f"""
+        prompt = self._prompt_builder("summarize")
+        prompt.add("question", f"""
         Original User Query: {user_query}
-        Data Summary: {data_summary}
-        Raw Data (if available): {raw_data}
-        
+        Data Summary: {data_summary}""")
+        prompt.add_items(
+            "result_digest", sample_rows(digest) if digest is not None else [],
+            lambda kept: (
+                "        Result Digest (row count, per-column statistics, trend and sample\n"
+                "        rows; every row when the result is small): " +
+                (format_digest(with_sample_rows(digest, kept), max_chars)
+                 if digest is not None else '')),
+            trim_as="rows")
+        prompt.add("instructions", """        
         Given the above, generate a concise and user-friendly summary for the user. 
         Focus on answering the original user query based on the data. If the data is 
         empty or an error occurred previously, explain that clearly. Keep it brief.
-        """
+        """, static=True)
+        summary_prompt = self._prompt_text("summarize", prompt)
 
         try:
-            response = self.model.invoke([SystemMessage(content=summary_prompt)])
+            response = yield _ModelCall([SystemMessage(content=summary_prompt)],
+                                        stream=True)
             usage = extract_token_usage(response) 
             final_summary = response.content
             logging.info(f"Generated final summary: {final_summary}")
@@ -1000,22 +1917,267 @@ query cannot be fixed, like "I cannot fix this query.".
                 "current_step": "summarize"
             }
 
-    def ask(self, query: str) -> Dict[str, Any]:
-        """Entry point for asking a question to the SQL Agent."""
-        logging.info(f"Agent received a new query: {query}")
-        initial_state = {
+    def _initial_state(self, query: str, confirmed_sql: Optional[str] = None,
+                       request_id: Optional[str] = None,
+                       background_sql: bool = False) -> Dict[str, Any]:
+        return {
             "messages": [HumanMessage(content=query)],
             "next_step": "understand_and_expand_user_query",
             "query_result": {
                 "user_query": query,
                 "attempt_count": 0
             },
-            "current_step": "start"
+            "current_step": "start",
+            "trace": RequestTrace(query, request_id),
+            "confirmed_sql": normalize_sql(confirmed_sql) if confirmed_sql else None,
+            "background_sql": background_sql,
+            "job_id": None
         }
-        # Run the graph with the initial state
-        final_state = self.graph.invoke(initial_state)
+
+    def _resume_state(self, pending: Dict[str, Any]) -> Dict[str, Any]:
+        """State that re-enters the graph at execute_sql to collect the
+        query job of ``pending`` (a "job_submitted" result)."""
+        metadata = pending.get('metadata', {})
+        query_result = {k: v for k, v in pending.items()
+                        if k not in ('usage', 'cost', 'metrics', 'session_cost')}
+        state = self._initial_state(query_result.get('user_query', ''),
+                                    request_id=metadata.get('request_id'))
+        state['query_result'] = query_result
+        state['job_id'] = metadata['job_id']
+        return state
+
+    def _final_result(self, final_state: Dict[str, Any]) -> Dict[str, Any]:
         result = final_state['query_result']
-        usage = result.get("usage")
-        cost = calculate_cost(usage, model="gpt-4o")  # or your model name
-        result["cost"] = cost
+        trace = final_state.get('trace')
+        if trace is not None:
+            trace.finish()
+            get_query_registry().forget(trace.request_id)
+            # Usage and cost of every model call, not just the last node's
+            result['usage'] = trace.usage()
+            result['cost'] = trace.cost()
+            result['metrics'] = trace.to_dict()
+            self._emit_metrics(result)
+        else:
+            result['cost'] = 0.0
+        result['session_cost'] = self.budget.session_spent
         return result
+
+    def _budget_exceeded_result(self, state: Dict[str, Any],
+                                error: BudgetExceeded) -> Dict[str, Any]:
+        """Result of a request stopped before a call that would overspend."""
+        logging.warning(str(error))
+        query_result = state.get('query_result', {})
+        state['query_result'] = {
+            **query_result,
+            'success': False,
+            'error': str(error),
+            'action': 'budget_exceeded',
+            'metadata': {**query_result.get('metadata', {}),
+                         'budget_scope': error.scope,
+                         'error_time': datetime.now().isoformat(),
+                         'action_taken': 'budget_exceeded'}
+        }
+        return self._final_result(state)
+
+    def _emit_metrics(self, result: Dict[str, Any]) -> None:
+        record = {**result['metrics'], 'success': result.get('success'),
+                  'action': result.get('action')}
+        try:
+            self.metrics_sink.emit(record)
+        except Exception as e:
+            logging.warning(f"Could not emit request metrics: {e}")
+
+    def ask(self, query: str, confirmed_sql: Optional[str] = None,
+            request_id: Optional[str] = None) -> Dict[str, Any]:
+        """Entry point for asking a question to the SQL Agent.
+
+        ``confirmed_sql`` is the ``sql_query`` of an earlier result the cost
+        gate held for confirmation (action "confirm_cost") and the user
+        accepted: that SQL runs if it is generated again, while any other
+        SQL is still gated. Blocked SQL never runs.
+        ``request_id`` (default: a new one, returned in ``metrics``) is what
+        :meth:`cancel` takes. With a job executor the result may instead
+        have action "job_submitted" (see :meth:`resume`).
+        """
+        logging.info(f"Agent received a new query: {query}")
+        # Run the graph with the initial state
+        return self._invoke(self._initial_state(
+            query, confirmed_sql, request_id, self.job_executor is not None))
+
+    def _invoke(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            # Stream the updates into state so a BudgetExceeded keeps what
+            # the graph had already produced (SQL, rows)
+            for update in self.graph.stream(state, stream_mode="updates"):
+                self._apply_updates(update, state)
+        except BudgetExceeded as e:
+            return self._budget_exceeded_result(state, e)
+        return self._final_result(state)
+
+    async def aask(self, query: str, confirmed_sql: Optional[str] = None,
+                   request_id: Optional[str] = None) -> Dict[str, Any]:
+        """Async :meth:`ask`: model calls use ``ainvoke`` and Redshift the
+        async pool, so many questions can share one event loop."""
+        logging.info(f"Agent received a new query (async): {query}")
+        state = self._initial_state(query, confirmed_sql, request_id)
+        try:
+            async for update in self.agraph.astream(state, stream_mode="updates"):
+                self._apply_updates(update, state)
+        except BudgetExceeded as e:
+            return self._budget_exceeded_result(state, e)
+        return self._final_result(state)
+
+    def _progress_event(self, node: str, update: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """User-facing progress event for a finished graph node, if any."""
+        query_result = update.get('query_result') or {}
+        metadata = query_result.get('metadata', {})
+        success = query_result.get('success', True)
+        event = {"type": "progress", "node": node, "success": success}
+        if node == "lookup_cached_sql":
+            if not metadata.get('sql_cache_hit'):
+                return None
+            event.update(step="sql_generated", message="Reusing previously verified SQL.",
+                         sql_query=query_result.get('sql_query'))
+        elif node == "understand_and_expand_user_query":
+            event.update(step="understood", message="Understood the question.")
+        elif node in ("fast_path_generate", "generate_sql"):
+            if query_result.get('action') == 'fast_path_fallback':
+                return None
+            event.update(step="sql_generated", message="SQL generated.",
+                         sql_query=query_result.get('sql_query'))
+        elif node == "verify_sql":
+            event.update(step="verified", message=(
+                "SQL verified." if query_result.get('action') == 'proceed'
+                else "SQL verification did not pass."))
+        elif node == "display_generated_sql":
+            event.update(step="executing", message="Executing SQL on Redshift...",
+                         sql_query=query_result.get('sql_query'))
+        elif node == "check_query_cost":
+            gate = metadata.get('cost_gate') or {}
+            if gate.get('action') == 'limit':
+                event.update(step="sql_limited", sql_query=query_result.get('sql_query'),
+                             message="Large result expected; added a LIMIT.")
+            elif gate.get('action') in ('confirm', 'block'):
+                event.update(step="cost_gate", message=(
+                    "Query held for confirmation: it looks expensive."
+                    if gate['action'] == 'confirm' else
+                    "Query blocked: it looks too expensive."))
+            else:
+                return None
+        elif node == "execute_sql":
+            if query_result.get('action') == 'job_submitted':
+                event.update(step="job_submitted", job_id=metadata.get('job_id'),
+                             message="Query submitted; it runs in the background.")
+            elif query_result.get('action') == 'cancelled':
+                event.update(step="cancelled", message="Query cancelled.")
+            elif query_result.get('action') == 'busy':
+                event.update(step="busy", message="Redshift is busy; try again shortly.")
+            elif success:
+                event.update(step="rows_fetched", row_count=metadata.get('row_count'),
+                             message=f"Fetched {metadata.get('row_count', 0)} rows.")
+            else:
+                event.update(step="execution_failed", message="SQL execution failed.")
+        elif node == "handle_sql_error":
+            event.update(step="fixing_sql", message="Trying to fix the SQL error...")
+        elif node == "process_results":
+            event.update(step="summarizing", message="Summarizing the results...")
+        else:
+            return None
+        return event
+
+    @staticmethod
+    def _apply_updates(payload: Dict[str, Any], state: Dict[str, Any]) -> None:
+        """Apply one "updates" chunk of the graph to ``state``."""
+        for update in payload.values():
+            if update:
+                state.update(update)
+
+    def _stream_events(self, mode: str, payload, state: Dict[str, Any]):
+        if mode == "custom":
+            yield payload
+            return
+        self._apply_updates(payload, state)
+        for node, update in payload.items():
+            if not update:
+                continue
+            event = self._progress_event(node, update)
+            if event is not None:
+                yield event
+
+    def stream(self, query: str, confirmed_sql: Optional[str] = None,
+               request_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Answer ``query`` like :meth:`ask`, yielding events as it goes.
+
+        Yields ``{"type": "progress", "step": ..., "message": ...}`` after
+        each pipeline step (understood, sql_generated, verified, executing,
+        rows_fetched, ...), ``{"type": "token", "content": ...}`` for each
+        chunk of the final summary and, last, ``{"type": "result",
+        "result": ...}`` with what :meth:`ask` would have returned.
+        """
+        logging.info(f"Agent received a new query (streaming): {query}")
+        yield from self._stream(self._initial_state(
+            query, confirmed_sql, request_id, self.job_executor is not None))
+
+    def _stream(self, state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        try:
+            for mode, payload in self.graph.stream(
+                    state, config={"configurable": {"stream_tokens": True}},
+                    stream_mode=["updates", "custom"]):
+                yield from self._stream_events(mode, payload, state)
+        except BudgetExceeded as e:
+            yield {"type": "result", "result": self._budget_exceeded_result(state, e)}
+            return
+        yield {"type": "result", "result": self._final_result(state)}
+
+    async def astream(self, query: str, confirmed_sql: Optional[str] = None,
+                      request_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async :meth:`stream`, running on the async graph."""
+        logging.info(f"Agent received a new query (async streaming): {query}")
+        state = self._initial_state(query, confirmed_sql, request_id)
+        try:
+            async for mode, payload in self.agraph.astream(
+                    state, config={"configurable": {"stream_tokens": True}},
+                    stream_mode=["updates", "custom"]):
+                for event in self._stream_events(mode, payload, state):
+                    yield event
+        except BudgetExceeded as e:
+            yield {"type": "result", "result": self._budget_exceeded_result(state, e)}
+            return
+        yield {"type": "result", "result": self._final_result(state)}
+
+    def job_status(self, job_id: str) -> JobStatus:
+        """Status of a query job of a "job_submitted" result; its state is
+        "succeeded", "failed" or "cancelled" once :meth:`resume` will not
+        wait."""
+        return self.job_executor.status(job_id)
+
+    def resume(self, pending: Dict[str, Any]) -> Dict[str, Any]:
+        """Finish the request of ``pending``, a result with action
+        "job_submitted": collect its query job's output (waiting for it if
+        it is still running) and go on as :meth:`ask` would, e.g. to the
+        summary. A failed query can be fixed and submitted as a new job,
+        so the result may again be "job_submitted"."""
+        logging.info(f"Resuming with query job {pending['metadata']['job_id']}")
+        return self._invoke(self._resume_state(pending))
+
+    def stream_resume(self, pending: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """:meth:`resume`, yielding events like :meth:`stream`."""
+        logging.info(f"Resuming with query job {pending['metadata']['job_id']} "
+                     "(streaming)")
+        yield from self._stream(self._resume_state(pending))
+
+    def cancel(self, request_id: str) -> int:
+        """Stop the request ``request_id`` (of ask/aask/stream/astream).
+
+        Queries it is running are cancelled on the database right away
+        (``pg_cancel_backend`` on Redshift), which frees their WLM slots,
+        and queries it would start later are refused; the request then ends
+        with action "cancelled", as do its queued query jobs. Returns how
+        many running queries were cancelled.
+        """
+        cancelled = cancel_request(request_id)
+        if self.job_executor is not None:
+            for job in self.job_executor.jobs(request_id):
+                if job["state"] == "queued":
+                    self.job_executor.cancel(job["job_id"])
+        return cancelled
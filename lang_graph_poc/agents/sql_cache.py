@@ -0,0 +1,69 @@
+"""Cache of verified SQL per user question, schema and system prompt."""
+
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, Optional
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.cache import QueryResultCache
+
+_PUNCTUATION = re.compile(r"[^\w\s%'.-]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lower-case, drop punctuation and collapse whitespace."""
+    question = _PUNCTUATION.sub(" ", question.lower())
+    return _WHITESPACE.sub(" ", question).strip(" .")
+
+
+def context_fingerprint(schema: Any, system_prompt: str) -> str:
+    """Stable hash of everything the generated SQL depends on besides the
+    question itself."""
+    payload = json.dumps(schema, sort_keys=True, default=str) + "\x00" + \
+        (system_prompt or "")
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SQLGenerationCache:
+    """Maps (question, schema + prompt fingerprint) to verified SQL.
+
+    The fingerprint is part of the key, so entries made under an older
+    schema or prompt can never be served again and simply age out of the
+    LRU.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 86400.0):
+        self._cache = QueryResultCache(max_entries=max_entries, ttl=ttl)
+
+    def lookup(self, question: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get((fingerprint, normalize_question(question)))
+
+    def store(self, question: str, fingerprint: str,
+              entry: Dict[str, Any]) -> None:
+        self._cache.put((fingerprint, normalize_question(question)), entry)
+
+    def forget(self, question: str, fingerprint: str) -> None:
+        self._cache.pop((fingerprint, normalize_question(question)))
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+
+_sql_cache = None
+_sql_cache_lock = threading.Lock()
+
+
+def get_sql_generation_cache() -> SQLGenerationCache:
+    """Return the process-wide SQL generation cache, creating it once."""
+    global _sql_cache
+    if _sql_cache is None:
+        with _sql_cache_lock:
+            if _sql_cache is None:
+                _sql_cache = SQLGenerationCache(
+                    max_entries=Config.SQL_CACHE["max_entries"],
+                    ttl=Config.SQL_CACHE["ttl"]
+                )
+    return _sql_cache
@@ -0,0 +1,174 @@
+"""Local (no LLM) validation of generated SQL.
+
+The SQL is parsed with sqlglot's Redshift dialect and every table, alias,
+CTE and column is resolved against the agent's schema, scope by scope, so
+that existence and syntax questions never need a model call.
+"""
+
+from typing import Dict, Iterable, List, Optional, TypedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import OptimizeError, ParseError
+from sqlglot.optimizer.scope import Scope, traverse_scope
+
+DIALECT = "redshift"
+
+# Statements that must never reach Redshift, even nested in a WITH
+_WRITE_EXPRESSIONS = (exp.Insert, exp.Update, exp.Delete, exp.Merge,
+                      exp.Create, exp.Drop, exp.Alter, exp.Command)
+
+
+class SQLValidationResult(TypedDict):
+    """Outcome of :func:`validate_sql`; ``issues`` is the human-readable
+    union of the other lists."""
+    is_valid: bool
+    syntax_errors: List[str]
+    missing_tables: List[str]
+    missing_columns: List[str]
+    disallowed_tables: List[str]
+    issues: List[str]
+
+
+def _table_name(table: exp.Table) -> str:
+    return ".".join(part for part in (table.db, table.name) if part).lower()
+
+
+def _resolve_table(name: str, candidates: Iterable[str]) -> Optional[str]:
+    """Match ``name`` (qualified or bare) to one of ``candidates``."""
+    candidates = {c.lower(): c for c in candidates}
+    if name in candidates:
+        return candidates[name]
+    if "." not in name:
+        matches = [c for key, c in candidates.items()
+                   if key.rsplit(".", 1)[-1] == name]
+        if len(matches) == 1:
+            return matches[0]
+    return None
+
+
+def _source_columns(source, schema: Dict[str, List[str]]) -> Optional[set]:
+    """Columns a FROM source exposes, or None when they cannot be known
+    (unknown table, ``SELECT *`` in a derived table, ...)."""
+    if isinstance(source, Scope):
+        selects = source.expression.named_selects
+        if "*" in selects or "" in selects:
+            return None
+        return {name.lower() for name in selects}
+    if isinstance(source, exp.Table):
+        table = _resolve_table(_table_name(source), schema)
+        if table is None:
+            return None
+        return {column.lower() for column in schema[table]}
+    return None
+
+
+def _column_resolves(column: exp.Column, scope: Scope,
+                     schema: Dict[str, List[str]]) -> bool:
+    name = column.name.lower()
+    qualifier = column.table.lower()
+    current = scope
+    while current is not None:
+        sources = {alias.lower(): source
+                   for alias, source in current.sources.items()}
+        if qualifier:
+            if qualifier in sources:
+                columns = _source_columns(sources[qualifier], schema)
+                return columns is None or name in columns
+        else:
+            # Redshift lets other clauses refer to select-list aliases
+            if isinstance(current.expression, exp.Select) and any(
+                    isinstance(projection, exp.Alias) and
+                    projection.alias.lower() == name and
+                    column.find_ancestor(exp.Alias) is not projection
+                    for projection in current.expression.expressions):
+                return True
+            for source in sources.values():
+                columns = _source_columns(source, schema)
+                if columns is None or name in columns:
+                    return True
+        # Correlated subqueries may reach into the enclosing query
+        current = current.parent
+    return False
+
+
+def validate_sql(sql: str, schema: Optional[Dict[str, List[str]]],
+                 allowed_tables: Optional[Iterable[str]] = None
+                 ) -> SQLValidationResult:
+    """Check that ``sql`` is one read-only Redshift statement whose tables
+    are allowed and whose tables and columns all exist in ``schema``.
+
+    ``schema`` maps ``schema.table`` to column names; when it is empty,
+    only syntax and the allow-list are checked.
+    """
+    result = SQLValidationResult(
+        is_valid=False, syntax_errors=[], missing_tables=[],
+        missing_columns=[], disallowed_tables=[], issues=[])
+    if not sql or not sql.strip():
+        result["syntax_errors"].append("No SQL was generated.")
+        result["issues"] = list(result["syntax_errors"])
+        return result
+
+    try:
+        statements = [s for s in sqlglot.parse(sql, read=DIALECT) if s is not None]
+    except ParseError as e:
+        error = e.errors[0] if e.errors else {}
+        result["syntax_errors"].append(
+            f"{error.get('description', str(e))} "
+            f"(line {error.get('line')}, column {error.get('col')})"
+            if error else str(e))
+        result["issues"] = [f"Syntax error: {result['syntax_errors'][0]}"]
+        return result
+
+    issues = result["issues"]
+    if len(statements) != 1:
+        issues.append("Exactly one SQL statement is allowed.")
+    if not statements:
+        return result
+    statement = statements[0]
+    if not isinstance(statement, exp.Query) or \
+            statement.find(*_WRITE_EXPRESSIONS) is not None:
+        issues.append("Only SELECT/WITH queries are allowed.")
+    if any(select.args.get("into") for select in statement.find_all(exp.Select)):
+        issues.append("SELECT ... INTO is not allowed.")
+
+    schema = schema or {}
+    allowed = list(allowed_tables) if allowed_tables is not None else None
+    cte_names = {cte.alias_or_name.lower() for cte in statement.find_all(exp.CTE)}
+    for table in statement.find_all(exp.Table):
+        name = _table_name(table)
+        if not name or (not table.db and name in cte_names):
+            continue
+        if allowed is not None and _resolve_table(name, allowed) is None:
+            if name not in result["disallowed_tables"]:
+                result["disallowed_tables"].append(name)
+        elif schema and _resolve_table(name, schema) is None:
+            if name not in result["missing_tables"]:
+                result["missing_tables"].append(name)
+
+    if schema:
+        try:
+            scopes = traverse_scope(statement)
+        except OptimizeError as e:
+            scopes = []
+            result["syntax_errors"].append(str(e))
+        for scope in scopes:
+            for column in scope.columns:
+                if isinstance(column.this, exp.Star):
+                    continue
+                if not _column_resolves(column, scope, schema):
+                    label = column.sql(dialect=DIALECT)
+                    if label not in result["missing_columns"]:
+                        result["missing_columns"].append(label)
+
+    if result["syntax_errors"]:
+        issues.append(f"Syntax error: {'; '.join(result['syntax_errors'])}")
+    if result["disallowed_tables"]:
+        issues.append("Tables outside the allowed list: "
+                      f"{', '.join(result['disallowed_tables'])}")
+    if result["missing_tables"]:
+        issues.append(f"Unknown tables: {', '.join(result['missing_tables'])}")
+    if result["missing_columns"]:
+        issues.append(f"Unknown columns: {', '.join(result['missing_columns'])}")
+    result["is_valid"] = not issues
+    return result
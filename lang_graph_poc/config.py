@@ -1,5 +1,7 @@
 from dotenv import load_dotenv
+import json
 import os
+import tempfile
 
 load_dotenv()
 
@@ -11,4 +13,181 @@ class Config:
         "user": os.getenv("REDSHIFT_USER"),
         "password": os.getenv("REDSHIFT_PASSWORD"),
         "dbname": os.getenv("REDSHIFT_DBNAME")
-    }
\ No newline at end of file
+    }
+    REDSHIFT_POOL = {
+        "minconn": int(os.getenv("REDSHIFT_POOL_MIN", 1)),
+        "maxconn": int(os.getenv("REDSHIFT_POOL_MAX", 10)),
+        "max_lifetime": float(os.getenv("REDSHIFT_POOL_MAX_LIFETIME", 3600)),
+        "checkout_timeout": float(os.getenv("REDSHIFT_POOL_TIMEOUT", 30)),
+        "health_check_interval": float(
+            os.getenv("REDSHIFT_POOL_HEALTH_CHECK_INTERVAL", 30)),
+    }
+    # Applied once per pooled connection, right after it is opened
+    REDSHIFT_SESSION_SETTINGS = {
+        "statement_timeout": int(
+            os.getenv("REDSHIFT_STATEMENT_TIMEOUT_MS", 300000)),
+        "query_group": os.getenv("REDSHIFT_QUERY_GROUP", "nlq_agent"),
+    }
+    # Result fetching: server-side cursor batches and hard caps per query
+    REDSHIFT_FETCH = {
+        "stream": os.getenv("REDSHIFT_STREAM_RESULTS", "true").lower() == "true",
+        "batch_size": int(os.getenv("REDSHIFT_FETCH_BATCH_SIZE", 2000)),
+        "max_rows": int(os.getenv("REDSHIFT_MAX_ROWS", 100000)),
+        "max_bytes": int(os.getenv("REDSHIFT_MAX_BYTES", 256 * 1024 * 1024)),
+    }
+    # Fetched results over spill_bytes (estimated in-memory size) move to
+    # Arrow IPC files in dir, memory-mapped on read (see tools.result_store);
+    # files older than max_age seconds are removed at startup. Downloads
+    # are built in memory, so exports over max_export_bytes are refused
+    RESULT_STORE = {
+        "enabled": os.getenv("RESULT_SPILL_ENABLED", "true").lower() == "true",
+        "spill_bytes": int(os.getenv("RESULT_SPILL_BYTES", 64 * 1024 * 1024)),
+        "dir": os.getenv("RESULT_SPILL_DIR",
+                         os.path.join(tempfile.gettempdir(), "nlq_results")),
+        "max_age": float(os.getenv("RESULT_SPILL_MAX_AGE", 86400)),
+        "page_rows": int(os.getenv("RESULT_PAGE_ROWS", 1000)),
+        "max_export_bytes": int(os.getenv("RESULT_MAX_EXPORT_BYTES",
+                                          200 * 1024 * 1024)),
+    }
+    QUERY_CACHE = {
+        "enabled": os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true",
+        "max_entries": int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 256)),
+        "ttl": float(os.getenv("QUERY_CACHE_TTL", 900)),
+        "watermark_check_interval": float(
+            os.getenv("QUERY_CACHE_WATERMARK_CHECK_INTERVAL", 300)),
+    }
+    # Verified SQL per (question, schema + system prompt fingerprint)
+    SQL_CACHE = {
+        "enabled": os.getenv("SQL_CACHE_ENABLED", "true").lower() == "true",
+        "max_entries": int(os.getenv("SQL_CACHE_MAX_ENTRIES", 512)),
+        "ttl": float(os.getenv("SQL_CACHE_TTL", 86400)),
+    }
+    # Number of retrieved NLQ -> SQL examples included per prompt
+    FEW_SHOT_EXAMPLES = int(os.getenv("FEW_SHOT_EXAMPLES", 4))
+    # Send prompts only the columns relevant to the question
+    SCHEMA_PRUNING = {
+        "enabled": os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() == "true",
+        "max_columns": int(os.getenv("SCHEMA_PRUNING_MAX_COLUMNS", 30)),
+    }
+    # Opt-in single-call understand/generate/self-check path
+    FAST_PATH = os.getenv("FAST_PATH_ENABLED", "false").lower() == "true"
+    # After local SQL validation: "semantic" asks the LLM whether the SQL
+    # matches the question's intent, "skip" trusts the local checks alone
+    SQL_VERIFY_POLICY = os.getenv("SQL_VERIFY_POLICY", "semantic").lower()
+    # Per-request node latency/token breakdown: "logging", "jsonl" or "none"
+    METRICS = {
+        "sink": os.getenv("METRICS_SINK", "logging"),
+        "jsonl_path": os.getenv("METRICS_JSONL_PATH", "sql_agent_metrics.jsonl"),
+    }
+    # Statistical digest sent to the summarize prompt instead of raw rows
+    RESULT_DIGEST = {
+        "full_rows_max": int(os.getenv("RESULT_DIGEST_FULL_ROWS_MAX", 20)),
+        "top_k": int(os.getenv("RESULT_DIGEST_TOP_K", 5)),
+        "head_rows": int(os.getenv("RESULT_DIGEST_HEAD_ROWS", 5)),
+        "tail_rows": int(os.getenv("RESULT_DIGEST_TAIL_ROWS", 5)),
+        "chunk_rows": int(os.getenv("RESULT_DIGEST_CHUNK_ROWS", 50000)),
+        "max_chars": int(os.getenv("RESULT_DIGEST_MAX_CHARS", 6000)),
+    }
+    # Extra/overridden model prices, $ per 1M tokens:
+    # {"model": [input, cached_input, output], ...}
+    MODEL_PRICES = json.loads(os.getenv("MODEL_PRICES", "{}"))
+    # Spend limits in USD (0 = unlimited). A model call that could push a
+    # question or a session over its limit goes to fallback_model instead
+    # when that fits, otherwise the request is stopped.
+    BUDGET = {
+        "question_usd": float(os.getenv("BUDGET_PER_QUESTION_USD", 0)),
+        "session_usd": float(os.getenv("BUDGET_PER_SESSION_USD", 0)),
+        "fallback_model": os.getenv("BUDGET_FALLBACK_MODEL", ""),
+        # Completion tokens assumed when estimating a call's cost up front
+        "expected_output_tokens": int(
+            os.getenv("BUDGET_EXPECTED_OUTPUT_TOKENS", 800)),
+    }
+    # Token budget per prompt; over it, examples, then schema columns, then
+    # result rows are trimmed. "nodes" overrides it per graph node:
+    # {"generate_sql": 12000, ...}
+    PROMPT_BUDGET = {
+        "max_tokens": int(os.getenv("PROMPT_MAX_TOKENS", 8000)),
+        "nodes": json.loads(os.getenv("PROMPT_NODE_MAX_TOKENS", "{}")),
+        # Cap on database error text quoted in the error-fixing prompt
+        "error_tokens": int(os.getenv("PROMPT_ERROR_MAX_TOKENS", 400)),
+    }
+    # Table/column catalog persisted on disk and refreshed in the background
+    SCHEMA_CATALOG = {
+        "path": os.getenv("SCHEMA_CATALOG_PATH", ""),
+        # Comma-separated CREATE TABLE files used when no catalog file exists
+        "ddl_files": os.getenv("SCHEMA_DDL_FILES", ""),
+        "refresh_interval": float(
+            os.getenv("SCHEMA_CATALOG_REFRESH_INTERVAL", 3600)),
+    }
+    # Enforced on every query at execution time (see tools.execution_policy):
+    # row-level SELECTs are capped at detail_limit rows and each query class
+    # (explain, aggregate, detail, other) gets its own statement timeout
+    EXECUTION_POLICY = {
+        "detail_limit": int(os.getenv("EXECUTION_DETAIL_LIMIT", 1000)),
+        "timeouts_ms": {
+            "explain": 10000, "aggregate": 120000, "detail": 60000,
+            "other": 60000,
+            **json.loads(os.getenv("EXECUTION_TIMEOUTS_MS", "{}")),
+        },
+    }
+    # Opt-in: SQLAgent.ask()/stream() submit the SQL as a job on max_workers
+    # background threads (see tools.jobs) and return its job id; the UI
+    # polls it and SQLAgent.resume() collects the rows. max_queued more jobs
+    # may wait, then submissions are refused. Finished jobs are kept
+    # result_ttl seconds, max_results at most. aask()/astream() never use it
+    JOB_QUEUE = {
+        "enabled": os.getenv("QUERY_JOBS_ENABLED", "false").lower() == "true",
+        "max_workers": int(os.getenv("QUERY_JOBS_WORKERS", 8)),
+        "max_queued": int(os.getenv("QUERY_JOBS_MAX_QUEUED", 32)),
+        "result_ttl": float(os.getenv("QUERY_JOBS_RESULT_TTL", 600)),
+        "max_results": int(os.getenv("QUERY_JOBS_MAX_RESULTS", 256)),
+    }
+    # EXPLAIN-based gate before execute_sql (see agents.cost_gate). Plans
+    # over max_cost or with a rejected join step get on_expensive ("confirm"
+    # or "block"); plans only over max_rows result rows get on_large_result
+    # ("limit" adds LIMIT limit_rows, or "confirm"/"block"). 0 disables a limit
+    COST_GATE = {
+        "enabled": os.getenv("COST_GATE_ENABLED", "true").lower() == "true",
+        "max_cost": float(os.getenv("COST_GATE_MAX_COST", 1e9)),
+        "max_rows": int(os.getenv("COST_GATE_MAX_ROWS", 1000000)),
+        "reject_nested_loop": os.getenv("COST_GATE_REJECT_NESTED_LOOP",
+                                        "true").lower() == "true",
+        "reject_broadcast": os.getenv("COST_GATE_REJECT_BROADCAST",
+                                      "false").lower() == "true",
+        "on_expensive": os.getenv("COST_GATE_ON_EXPENSIVE", "confirm").lower(),
+        "on_large_result": os.getenv("COST_GATE_ON_LARGE_RESULT", "limit").lower(),
+        "limit_rows": int(os.getenv("COST_GATE_LIMIT_ROWS", 10000)),
+    }
+    # Where SQL runs: "redshift", or an embedded stand-in loaded with rows
+    # synthetic rows per table spread over the last days days ("duckdb";
+    # "sqlite" handles simple SQL only), see lang_graph_poc.tools.local_backend
+    QUERY_BACKEND = {
+        "kind": os.getenv("QUERY_BACKEND", "redshift"),
+        "rows": int(os.getenv("LOCAL_BACKEND_ROWS", 100000)),
+        "seed": int(os.getenv("LOCAL_BACKEND_SEED", 0)),
+        "days": int(os.getenv("LOCAL_BACKEND_DAYS", 730)),
+    }
+    # Optional DuckDB file with the last window_days days (by booking_date)
+    # of table, refreshed incrementally every refresh_interval seconds (see
+    # tools.local_cache). Date-bounded queries inside the window run on it
+    # unless it is older than max_staleness; a pull over max_rows fails
+    LOCAL_CACHE = {
+        "enabled": os.getenv("LOCAL_CACHE_ENABLED", "false").lower() == "true",
+        "path": os.getenv("LOCAL_CACHE_PATH",
+                          os.path.join(tempfile.gettempdir(), "nlq_local_cache.duckdb")),
+        "table": os.getenv("LOCAL_CACHE_TABLE", "core.t1_bookings_all"),
+        "window_days": int(os.getenv("LOCAL_CACHE_WINDOW_DAYS", 90)),
+        "refresh_interval": float(os.getenv("LOCAL_CACHE_REFRESH_INTERVAL", 900)),
+        "max_staleness": float(os.getenv("LOCAL_CACHE_MAX_STALENESS", 7200)),
+        "max_rows": int(os.getenv("LOCAL_CACHE_MAX_ROWS", 5000000)),
+    }
+    # Record/replay of model calls and queries (see lang_graph_poc.replay):
+    # mode "off", "record" or "replay"; replayed calls wait latency seconds,
+    # or when unset their recorded duration times latency_scale
+    REPLAY = {
+        "mode": os.getenv("REPLAY_MODE", "off"),
+        "cassette": os.getenv("REPLAY_CASSETTE", "sql_agent_cassette.jsonl"),
+        "latency": (float(os.getenv("REPLAY_LATENCY"))
+                    if os.getenv("REPLAY_LATENCY") else None),
+        "latency_scale": float(os.getenv("REPLAY_LATENCY_SCALE", 1.0)),
+    }
@@ -0,0 +1,228 @@
+"""Few-shot NLQ -> SQL example bank with a local BM25 index.
+
+The banks in ``lang_graph_poc/resources`` come in two formats::
+
+    -- User: Show me top 5 products by revenue last month
+    -- Intent: Product Performance
+    -- SQL:
+    SELECT ...;
+
+and markdown::
+
+    ### 1. Geographic Performance Analysis
+    **NLQ:** "Show me booking performance by continent"
+    ```sql
+    SELECT ...;
+    ```
+
+The index is built offline (``python -m lang_graph_poc.llm.examples``) or
+on first use, persisted as JSON next to the banks and rebuilt whenever a
+bank file changes. Nothing here touches the network.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple, TypedDict
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                             "resources")
+DEFAULT_EXAMPLE_FILES = [
+    os.path.join(RESOURCES_DIR, "t1_bookings_all_samples_nlq.sql"),
+    os.path.join(RESOURCES_DIR, "t2_bi_booking_sessions_sample_nlq.sql"),
+]
+DEFAULT_INDEX_PATH = os.path.join(RESOURCES_DIR, "nlq_examples_index.json")
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+_STOPWORDS = frozenset("""
+    a an and are as at be by for from has have how i in is it me many much
+    of on or show tell that the their there this to us was were what whats
+    which who with give list find get
+""".split())
+
+_COMMENT_BLOCK = re.compile(
+    r"^--\s*User:\s*(?P<question>.+?)\s*$"
+    r"(?:\n--\s*Intent:\s*(?P<intent>.+?)\s*$)?"
+    r"\n--\s*SQL:\s*$\n(?P<sql>.*?)(?=^[ \t]*$|^--\s*User:|\Z)",
+    re.MULTILINE | re.DOTALL,
+)
+_MARKDOWN_BLOCK = re.compile(
+    r"^\*\*NLQ:\*\*\s*\"?(?P<question>.+?)\"?\s*$\s*"
+    r"```sql\s*\n(?P<sql>.*?)```",
+    re.MULTILINE | re.DOTALL,
+)
+_MARKDOWN_HEADING = re.compile(r"^#{2,4}\s*(?:\d+\.\s*)?(?P<title>.+?)\s*$",
+                               re.MULTILINE)
+
+
+class NLQExample(TypedDict):
+    """One natural-language question and the SQL that answers it."""
+    question: str
+    sql: str
+    intent: Optional[str]
+    source: str
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stop words."""
+    return [t for t in _TOKEN.findall(text.lower().replace("’", "'"))
+            if t not in _STOPWORDS]
+
+
+def parse_examples(text: str, source: str = "") -> List[NLQExample]:
+    """Extract examples in either bank format from a file's contents."""
+    examples: List[NLQExample] = []
+    for match in _COMMENT_BLOCK.finditer(text):
+        sql = match.group("sql").strip()
+        if sql:
+            examples.append(NLQExample(
+                question=match.group("question"), sql=sql,
+                intent=match.group("intent"), source=source))
+
+    headings = [(m.start(), m.group("title"))
+                for m in _MARKDOWN_HEADING.finditer(text)]
+    for match in _MARKDOWN_BLOCK.finditer(text):
+        intent = None
+        for position, title in headings:
+            if position > match.start():
+                break
+            intent = title
+        examples.append(NLQExample(
+            question=match.group("question").strip('"'),
+            sql=match.group("sql").strip(), intent=intent, source=source))
+    return examples
+
+
+def load_examples(paths: Sequence[str] = DEFAULT_EXAMPLE_FILES) -> List[NLQExample]:
+    examples: List[NLQExample] = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                examples.extend(parse_examples(f.read(), os.path.basename(path)))
+        except OSError as e:
+            logging.error(f"Could not load examples from {path}: {e}")
+    return examples
+
+
+def files_fingerprint(paths: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        try:
+            with open(path, "rb") as f:
+                digest.update(f.read())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+class ExampleIndex:
+    """Okapi BM25 index over example questions (plus their intent)."""
+
+    def __init__(self, examples: List[NLQExample], fingerprint: str = "",
+                 k1: float = 1.5, b: float = 0.75):
+        self.examples = examples
+        self.fingerprint = fingerprint
+        self.k1 = k1
+        self.b = b
+        self._doc_terms = [
+            Counter(tokenize(f"{ex['question']} {ex.get('intent') or ''}"))
+            for ex in examples
+        ]
+        self._doc_lengths = [sum(terms.values()) for terms in self._doc_terms]
+        self._avg_length = (sum(self._doc_lengths) / len(examples)
+                            if examples else 0.0)
+        doc_freq = Counter()
+        for terms in self._doc_terms:
+            doc_freq.update(terms.keys())
+        n = len(examples)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    @classmethod
+    def build(cls, paths: Sequence[str] = DEFAULT_EXAMPLE_FILES) -> "ExampleIndex":
+        return cls(load_examples(paths), fingerprint=files_fingerprint(paths))
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "k1": self.k1,
+                       "b": self.b, "examples": self.examples}, f, indent=1)
+
+    @classmethod
+    def load(cls, path: str) -> "ExampleIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return cls(payload["examples"], fingerprint=payload["fingerprint"],
+                   k1=payload["k1"], b=payload["b"])
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def search(self, question: str, k: int = 4) -> List[Tuple[float, NLQExample]]:
+        """Top-``k`` examples by BM25 score; examples with no overlap are
+        never returned."""
+        query_terms = set(tokenize(question))
+        scored = []
+        for i, terms in enumerate(self._doc_terms):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[i] /
+                              (self._avg_length or 1.0))
+            for term in query_terms & terms.keys():
+                tf = terms[term]
+                score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(score, self.examples[i]) for score, i in scored[:k]]
+
+    def top_examples(self, question: str, k: int = 4) -> List[NLQExample]:
+        return [example for _, example in self.search(question, k)]
+
+
+def format_examples(examples: Sequence[NLQExample]) -> str:
+    """Render examples as prompt text."""
+    return "\n\n".join(
+        f"-- User: {ex['question']}\n-- SQL:\n{ex['sql']}" for ex in examples
+    )
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_example_index(paths: Sequence[str] = DEFAULT_EXAMPLE_FILES,
+                      index_path: str = DEFAULT_INDEX_PATH) -> ExampleIndex:
+    """Load the persisted index, rebuilding it when a bank file changed."""
+    global _index
+    with _index_lock:
+        fingerprint = files_fingerprint(paths)
+        if _index is not None and _index.fingerprint == fingerprint:
+            return _index
+        index = None
+        if os.path.exists(index_path):
+            try:
+                index = ExampleIndex.load(index_path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable example index: {e}")
+        if index is None or index.fingerprint != fingerprint:
+            index = ExampleIndex.build(paths)
+            try:
+                index.save(index_path)
+            except OSError as e:
+                logging.warning(f"Could not persist example index: {e}")
+        logging.info(f"Loaded {len(index)} NLQ examples for retrieval.")
+        _index = index
+        return index
+
+
+if __name__ == "__main__":
+    built = ExampleIndex.build()
+    built.save(DEFAULT_INDEX_PATH)
+    print(f"Indexed {len(built)} examples -> {DEFAULT_INDEX_PATH}")
@@ -0,0 +1,147 @@
+"""Scripted chat model that answers SQLAgent's prompts without an API call.
+
+Each node's prompt is recognised by a marker in its instructions and gets
+canned JSON back; the SQL is picked by matching the user's question against
+``SQL_RULES`` (first match wins). Paired with the local query backend
+(``QUERY_BACKEND=duckdb``) the whole agent runs offline, so it can be load
+tested for concurrency and data volume::
+
+    model = ScriptedChatModel(latency=0.3)
+    agent = SQLAgent(model=model, tools=[execute_sql], schema=...)
+
+``script`` overrides a node's response: a dict, a string, a callable taking
+the prompt, or a list of these served one per call (the last one repeats).
+"""
+
+import asyncio
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+# Marker in each node's instructions, checked in this order
+NODE_MARKERS = {
+    "fast_path_generate": "In a single step",
+    "understand_and_expand_user_query": "Your task is to:",
+    "generate_sql_query": "generate a SQL query",
+    "verify_sql_query": "Your task is to verify",
+    "handle_sql_error": "Analyze this SQL error",
+}
+
+SQL_RULES: List[Tuple[str, str]] = [
+    (r"countr|singapore|australia|indonesia",
+     "SELECT country_id, COUNT(*) AS bookings FROM core.t1_bookings_all "
+     "WHERE booking_date >= DATEADD(month, -3, CURRENT_DATE) "
+     "GROUP BY country_id ORDER BY bookings DESC LIMIT 100"),
+    (r"state|status|cancel",
+     "SELECT booking_state, COUNT(*) AS bookings FROM core.t1_bookings_all "
+     "WHERE booking_date >= CURRENT_DATE - INTERVAL '30 days' "
+     "GROUP BY booking_state ORDER BY bookings DESC LIMIT 100"),
+    (r"product",
+     "SELECT product_name, SUM(gross_total_sgd) AS gmv FROM core.t1_bookings_all "
+     "WHERE booking_state IN ('CONFIRMED', 'PENDING', 'FULFILLED') "
+     "AND booking_date >= CURRENT_DATE - INTERVAL '30 days' "
+     "GROUP BY product_name ORDER BY gmv DESC LIMIT 10"),
+    (r"",
+     "SELECT DATE_TRUNC('day', booking_date) AS day, SUM(gross_total_sgd) AS gmv "
+     "FROM core.t1_bookings_all "
+     "WHERE booking_state IN ('CONFIRMED', 'PENDING', 'FULFILLED') "
+     "AND booking_date >= CURRENT_DATE - INTERVAL '30 days' "
+     "GROUP BY 1 ORDER BY 1 LIMIT 100"),
+]
+
+_QUESTION = re.compile(r"Original User Query:\s*(.*)")
+_ROW_COUNT = re.compile(r'"row_count":\s*(\d+)')
+
+Response = Union[Dict[str, Any], str, Callable[[str], Union[Dict[str, Any], str]]]
+
+
+class ScriptedChatModel:
+    """Chat model stand-in with canned, per-node responses."""
+
+    def __init__(self, script: Optional[Dict[str, Union[Response, List[Response]]]] = None,
+                 sql_rules: Sequence[Tuple[str, str]] = SQL_RULES,
+                 latency: float = 0.0, model_name: str = "gpt-4o-mini"):
+        self.script = {node: list(r) if isinstance(r, list) else r
+                       for node, r in (script or {}).items()}
+        self.sql_rules = [(re.compile(p, re.IGNORECASE), sql) for p, sql in sql_rules]
+        self.latency = latency
+        self.model_name = model_name
+        self.calls = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def sql_for(self, question: str) -> str:
+        return next(sql for pattern, sql in self.sql_rules if pattern.search(question))
+
+    def _default(self, node: str, prompt: str, question: str) -> Response:
+        if node == "understand_and_expand_user_query":
+            return {"expanded_query": question, "requires_clarification": False,
+                    "clarification_questions": []}
+        if node in ("generate_sql_query", "fast_path_generate"):
+            response = {"sql_query": self.sql_for(question),
+                        "reasoning": "Scripted response.",
+                        "missing_tables": [], "missing_columns": []}
+            if node == "fast_path_generate":
+                response.update(expanded_query=question, requires_clarification=False,
+                                self_check={"uses_only_schema_columns": True,
+                                            "matches_intent": True,
+                                            "is_read_only": True})
+            return response
+        if node == "verify_sql_query":
+            return {"is_valid": True, "reasoning": "Scripted response."}
+        if node == "handle_sql_error":
+            return "I cannot fix this query."
+        rows = _ROW_COUNT.search(prompt)
+        return (f"Scripted summary of {rows.group(1) if rows else 'the'} rows "
+                f"answering: {question or 'the question'}")
+
+    def _content(self, prompt: str) -> str:
+        node = next((n for n, marker in NODE_MARKERS.items() if marker in prompt),
+                    "summarize")
+        match = _QUESTION.search(prompt)
+        question = match.group(1).strip() if match else ""
+        response = self.script.get(node)
+        if isinstance(response, list):
+            response = response.pop(0) if len(response) > 1 else response[0]
+        if response is None:
+            response = self._default(node, prompt, question)
+        if callable(response):
+            response = response(prompt)
+        return response if isinstance(response, str) else json.dumps(response)
+
+    def _reply(self, messages) -> AIMessage:
+        self.calls += 1
+        prompt = "\n".join(str(m.content) for m in messages)
+        content = self._content(prompt)
+        usage = {"input_tokens": len(prompt) // 4,
+                 "output_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=content, usage_metadata=usage,
+                         response_metadata={"model_name": self.model_name})
+
+    def invoke(self, messages, **kwargs):
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+    @staticmethod
+    def _chunks(response: AIMessage) -> List[AIMessageChunk]:
+        words = response.content.split(" ")
+        chunks = [AIMessageChunk(content=word + " ") for word in words[:-1]]
+        chunks.append(AIMessageChunk(content=words[-1],
+                                     usage_metadata=response.usage_metadata))
+        return chunks
+
+    def stream(self, messages, **kwargs):
+        yield from self._chunks(self.invoke(messages, **kwargs))
+
+    async def astream(self, messages, **kwargs):
+        for chunk in self._chunks(await self.ainvoke(messages, **kwargs)):
+            yield chunk
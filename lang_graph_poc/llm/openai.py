@@ -5,16 +5,18 @@ import os
 from dotenv import load_dotenv
 import openai
 
+from lang_graph_poc.llm.pricing import usage_cost
+
 # Load environment variables from .env file
 load_dotenv()
 
-def get_model():
+def get_model(model_name="gpt-4o"):
     """Get the OpenAI model instance.    
     Returns:
         ChatOpenAI: Configured OpenAI chat model instance.
     """
     return ChatOpenAI(
-        model="gpt-4o",  # or your preferred model  tried: gpt-4o-mini, gpt-4o
+        model=model_name,  # or your preferred model  tried: gpt-4o-mini, gpt-4o
         temperature=0.0,
         api_key=os.getenv("OPENAI_API_KEY")
     )
@@ -235,18 +237,14 @@ def call_llm(messages, model="gpt-4o", temperature=0.2):
     return response, usage
 
 def calculate_cost(usage, model="gpt-4o"):
-    # Example rates (update with current OpenAI pricing)
-    rates = {
-        "gpt-4o": 0.005,  # $ per 1K tokens (input+output)
-        "gpt-4o-mini": 0.0025,
-        # Add more as needed
-    }
+    """Dollar cost of one response's OpenAI ``token_usage`` at ``model``'s
+    input, cached-input and output rates (see pricing.PRICING)."""
     if not usage:
         return 0.0
-    total_tokens = usage.get("total_tokens", 0)
-    cost = (total_tokens / 1000) * rates.get(model, 0.005)
-    return cost
-
+    if "cached_prompt_tokens" not in usage:
+        details = usage.get("prompt_tokens_details") or {}
+        usage = {**usage, "cached_prompt_tokens": details.get("cached_tokens", 0)}
+    return usage_cost(usage, model)
 
 
 # model = get_model()
@@ -0,0 +1,77 @@
+"""Per-model token prices and cost calculation.
+
+Prices are US dollars per million tokens, split into fresh input, cached
+input (prompt-cache hits are billed at a discount) and output tokens.
+Extra or updated prices can be supplied with the ``MODEL_PRICES`` env var
+(see Config.MODEL_PRICES) without a code change.
+"""
+
+import logging
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from lang_graph_poc.config import Config
+
+
+class ModelPrice(NamedTuple):
+    input: float
+    cached_input: float
+    output: float
+
+
+# Update with current OpenAI pricing
+PRICING: Dict[str, ModelPrice] = {
+    "gpt-4o": ModelPrice(2.50, 1.25, 10.00),
+    "gpt-4o-mini": ModelPrice(0.15, 0.075, 0.60),
+    "gpt-4.1": ModelPrice(2.00, 0.50, 8.00),
+    "gpt-4.1-mini": ModelPrice(0.40, 0.10, 1.60),
+    "gpt-4.1-nano": ModelPrice(0.10, 0.025, 0.40),
+    "o3-mini": ModelPrice(1.10, 0.55, 4.40),
+}
+PRICING.update({model: ModelPrice(*rates)
+                for model, rates in Config.MODEL_PRICES.items()})
+
+DEFAULT_MODEL = "gpt-4o"
+
+# Rough characters per token for English prompts with SQL and JSON
+_CHARS_PER_TOKEN = 4
+
+
+def price_for(model: Optional[str]) -> ModelPrice:
+    """Price of ``model``; dated snapshots such as ``gpt-4o-2024-08-06``
+    use their base model's price. Unknown models are billed as
+    DEFAULT_MODEL so costs are never silently zero."""
+    name = (model or DEFAULT_MODEL).lower()
+    if name in PRICING:
+        return PRICING[name]
+    matches = [m for m in PRICING if name.startswith(m + "-")]
+    if matches:
+        return PRICING[max(matches, key=len)]
+    logging.warning(f"No price for model {model!r}; using {DEFAULT_MODEL} rates.")
+    return PRICING[DEFAULT_MODEL]
+
+
+def usage_cost(usage: Optional[Dict[str, int]], model: Optional[str]) -> float:
+    """Dollar cost of one call's ``usage`` (prompt_tokens includes the
+    cached_prompt_tokens, as reported by OpenAI)."""
+    if not usage:
+        return 0.0
+    price = price_for(model)
+    cached = usage.get("cached_prompt_tokens", 0) or 0
+    fresh = max((usage.get("prompt_tokens", 0) or 0) - cached, 0)
+    completion = usage.get("completion_tokens", 0) or 0
+    return (fresh * price.input + cached * price.cached_input +
+            completion * price.output) / 1_000_000
+
+
+def estimate_prompt_tokens(messages: Iterable) -> int:
+    """Cheap upper-bound-ish token count of a prompt, before sending it."""
+    chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return chars // _CHARS_PER_TOKEN + 1
+
+
+def estimate_call_cost(messages: Iterable, model: Optional[str],
+                       output_tokens: int) -> float:
+    """Expected worst-case cost of sending ``messages`` to ``model``,
+    assuming no cache hits and ``output_tokens`` of completion."""
+    return usage_cost({"prompt_tokens": estimate_prompt_tokens(messages),
+                       "completion_tokens": output_tokens}, model)
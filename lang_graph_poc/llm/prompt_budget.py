@@ -0,0 +1,164 @@
+"""Token-budgeted prompt assembly for SQLAgent nodes.
+
+A prompt is built from named segments (question, schema, examples,
+instructions, ...). Every segment is counted with tiktoken; counts of
+static segments such as the instruction blocks are memoised, since they
+are the same text on every request. When the prompt is over its node's
+budget, trimmable segments lose their least important items, in the order
+of TRIM_ORDER: few-shot examples first, then schema columns, then data
+rows. The build reports the tokens each segment contributed.
+"""
+
+import logging
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import tiktoken
+
+# Which trimmable segments give way first when a prompt is over budget
+TRIM_ORDER = ("examples", "columns", "rows")
+
+_DEFAULT_ENCODING = "o200k_base"
+# Used when no tiktoken encoding can be loaded (e.g. offline, no cache)
+_FALLBACK_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def _load_encoding(model: Optional[str]):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            return tiktoken.get_encoding(_DEFAULT_ENCODING)
+    except Exception as e:
+        logging.warning(f"tiktoken encoding unavailable ({e}); estimating "
+                        f"{_FALLBACK_CHARS_PER_TOKEN} characters per token.")
+        return None
+
+
+class TokenCounter:
+    """Counts tokens with the model's tiktoken encoding."""
+
+    def __init__(self, model: Optional[str] = None, static_cache_size: int = 256):
+        self.model = model
+        self.encoding = _load_encoding(model)
+        self.count_static = lru_cache(maxsize=static_cache_size)(self.count)
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.encoding is None:
+            return -(-len(text) // _FALLBACK_CHARS_PER_TOKEN)
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """``text`` cut to at most ``max_tokens`` tokens."""
+        if self.count(text) <= max_tokens:
+            return text
+        marker = " ...[truncated]"
+        keep = max(max_tokens - self.count(marker), 0)
+        if self.encoding is None:
+            return text[:keep * _FALLBACK_CHARS_PER_TOKEN] + marker
+        return self.encoding.decode(
+            self.encoding.encode(text, disallowed_special=())[:keep]) + marker
+
+
+class PromptBuild(NamedTuple):
+    text: str
+    segments: Dict[str, int]
+    total_tokens: int
+    max_tokens: int
+    trimmed: Dict[str, int]
+
+    def report(self) -> Dict[str, Any]:
+        return {"segments": self.segments, "total_tokens": self.total_tokens,
+                "max_tokens": self.max_tokens, "trimmed": self.trimmed}
+
+
+class _Segment:
+    def __init__(self, name: str, text: str = "", static: bool = False,
+                 items: Optional[Sequence] = None,
+                 render: Optional[Callable[[Sequence], str]] = None,
+                 trim_as: Optional[str] = None, min_items: int = 0):
+        self.name = name
+        self.text = text
+        self.static = static
+        self.items = list(items) if items is not None else None
+        self.render = render
+        self.trim_as = trim_as
+        self.min_items = min_items
+        self.keep = len(self.items) if self.items is not None else 0
+
+    def rendered(self, keep: Optional[int] = None) -> str:
+        if self.items is None:
+            return self.text
+        return self.render(self.items[:self.keep if keep is None else keep])
+
+
+class PromptBuilder:
+    """Collects a node's prompt segments and fits them to ``max_tokens``."""
+
+    def __init__(self, counter: TokenCounter, max_tokens: int):
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self._segments: List[_Segment] = []
+
+    def add(self, name: str, text: str, static: bool = False,
+            max_tokens: Optional[int] = None) -> "PromptBuilder":
+        """A fixed segment; unbounded text (e.g. an error message) can be
+        capped at ``max_tokens``."""
+        if max_tokens is not None:
+            text = self.counter.truncate(text, max_tokens)
+        self._segments.append(_Segment(name, text, static=static))
+        return self
+
+    def add_items(self, name: str, items: Sequence,
+                  render: Callable[[Sequence], str], trim_as: str,
+                  min_items: int = 0) -> "PromptBuilder":
+        """A segment rendered from ``items`` (most important first) that
+        may be trimmed from the end, down to ``min_items``."""
+        if trim_as not in TRIM_ORDER:
+            raise ValueError(f"trim_as must be one of {TRIM_ORDER}, got {trim_as!r}")
+        self._segments.append(_Segment(name, items=items, render=render,
+                                       trim_as=trim_as, min_items=min_items))
+        return self
+
+    def _count(self, segment: _Segment, keep: Optional[int] = None) -> int:
+        text = segment.rendered(keep)
+        return (self.counter.count_static(text) if segment.static
+                else self.counter.count(text))
+
+    def _fit(self, segment: _Segment, tokens: Dict[str, int], total: int) -> int:
+        """Largest item count of ``segment`` that brings the prompt within
+        budget (binary search), or its minimum when none does."""
+        others = total - tokens[segment.name]
+        low, high = segment.min_items, segment.keep
+        while low < high:
+            middle = (low + high + 1) // 2
+            if others + self._count(segment, middle) <= self.max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def build(self) -> PromptBuild:
+        tokens = {s.name: self._count(s) for s in self._segments}
+        total = sum(tokens.values())
+        trimmed: Dict[str, int] = {}
+        for kind in TRIM_ORDER:
+            for segment in self._segments:
+                if total <= self.max_tokens:
+                    break
+                if segment.trim_as != kind or segment.keep <= segment.min_items:
+                    continue
+                keep = self._fit(segment, tokens, total)
+                trimmed[segment.name] = segment.keep - keep
+                segment.keep = keep
+                total -= tokens[segment.name]
+                tokens[segment.name] = self._count(segment)
+                total += tokens[segment.name]
+        if total > self.max_tokens:
+            logging.warning(f"Prompt is {total} tokens after trimming, over its "
+                            f"budget of {self.max_tokens}.")
+        text = "\n".join(s.rendered() for s in self._segments)
+        return PromptBuild(text, tokens, total, self.max_tokens, trimmed)
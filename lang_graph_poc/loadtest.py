@@ -0,0 +1,246 @@
+"""Concurrent multi-user load test of SQLAgent.
+
+N simulated users each send questions sampled from the NLQ banks in
+``lang_graph_poc/resources``, through ``SQLAgent.aask`` (one event loop) or
+``SQLAgent.ask`` (one thread per user). Every user has its own agent, like
+a Streamlit session. Model and database are stand-ins, so no API or
+cluster is needed:
+
+- ``--backend duckdb``/``sqlite``: ScriptedChatModel answers with the bank's
+  SQL for the question, run on synthetic data (see tools.local_backend);
+- ``--backend replay``: model calls and queries come from a cassette
+  recorded with REPLAY_MODE=record (see lang_graph_poc.replay), which must
+  cover the questions asked.
+
+The report (end-to-end and per-node latency percentiles, throughput, token
+usage, errors and peak RSS) is written as JSON so releases can be compared::
+
+    python -m lang_graph_poc.loadtest --users 20 --requests 5 --output load.json
+"""
+
+import asyncio
+import json
+import logging
+import random
+import re
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from lang_graph_poc.agents.instrumentation import NullMetricsSink
+from lang_graph_poc.agents.schema_pruning import SYSTEM_PROMPT_PATH
+from lang_graph_poc.agents.sql_agent import SQLAgent
+from lang_graph_poc.config import Config
+from lang_graph_poc.llm.examples import NLQExample, get_example_index, load_examples
+from lang_graph_poc.llm.fake import SQL_RULES, ScriptedChatModel
+from lang_graph_poc.tools.redshift import ALLOWED_TABLES, execute_sql, set_query_backend
+from lang_graph_poc.tools.schema_catalog import get_schema_catalog
+
+PERCENTILES = (50, 95, 99)
+_TOKEN_KEYS = ("prompt_tokens", "cached_prompt_tokens", "completion_tokens",
+               "total_tokens")
+
+
+def latency_summary(values: Sequence[float]) -> Dict[str, Any]:
+    """Count, mean, max and p50/p95/p99 of ``values`` (seconds)."""
+    if not values:
+        return {"count": 0}
+    summary = {"count": len(values), "mean": float(np.mean(values)),
+               "max": float(np.max(values))}
+    summary.update({f"p{q}": float(v) for q, v in
+                    zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+    return {k: round(v, 4) if isinstance(v, float) else v
+            for k, v in summary.items()}
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def bank_questions(tables: Optional[Sequence[str]] = None) -> List[NLQExample]:
+    """The NLQ bank examples, optionally only those querying ``tables``."""
+    examples = load_examples()
+    if tables is not None:
+        examples = [e for e in examples
+                    if any(t in e["sql"] for t in tables)]
+    return examples
+
+
+def summarize(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    """Aggregate the per-request samples of a run."""
+    node_times = defaultdict(list)
+    tokens = dict.fromkeys(_TOKEN_KEYS, 0)
+    cost = 0.0
+    for sample in samples:
+        metrics = sample.get("metrics") or {}
+        for node, values in metrics.get("nodes", {}).items():
+            node_times[node].append(values["wall_time_s"])
+        totals = metrics.get("totals", {})
+        for key in tokens:
+            tokens[key] += totals.get(key, 0)
+        cost += totals.get("cost_usd", 0.0)
+    succeeded = sum(1 for s in samples if s["success"])
+    return {
+        "requests": len(samples),
+        "succeeded": succeeded,
+        "failed": len(samples) - succeeded,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_rps": round(len(samples) / elapsed, 4) if elapsed else None,
+        "latency_s": latency_summary([s["latency_s"] for s in samples]),
+        "node_latency_s": {node: latency_summary(times)
+                           for node, times in sorted(node_times.items())},
+        "tokens": {**tokens, "per_request": round(
+            tokens["total_tokens"] / len(samples), 1) if samples else 0},
+        "cost_usd": round(cost, 6),
+        "errors": sorted({s["error"] for s in samples if s.get("error")})[:20],
+    }
+
+
+def _sample(question: str, started: float, result: Optional[Dict[str, Any]],
+            error: Optional[str] = None) -> Dict[str, Any]:
+    result = result or {}
+    return {"question": question,
+            "latency_s": time.perf_counter() - started,
+            "success": bool(result.get("success")),
+            "error": error or result.get("error"),
+            "metrics": result.get("metrics")}
+
+
+def run_load(make_agent: Callable[[], SQLAgent], questions: Sequence[str],
+             users: int = 10, requests_per_user: int = 5,
+             use_async: bool = True, seed: int = 0) -> Dict[str, Any]:
+    """Drive ``users`` concurrent users, each asking ``requests_per_user``
+    questions drawn from ``questions``; returns the aggregated report."""
+    rng = random.Random(seed)
+    plans = [[rng.choice(questions) for _ in range(requests_per_user)]
+             for _ in range(users)]
+    agents = [make_agent() for _ in range(users)]
+    samples: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def user(agent, plan):
+        for question in plan:
+            started = time.perf_counter()
+            try:
+                sample = _sample(question, started, agent.ask(question))
+            except Exception as e:
+                sample = _sample(question, started, None, f"{type(e).__name__}: {e}")
+            with lock:
+                samples.append(sample)
+
+    async def auser(agent, plan):
+        for question in plan:
+            started = time.perf_counter()
+            try:
+                sample = _sample(question, started, await agent.aask(question))
+            except Exception as e:
+                sample = _sample(question, started, None, f"{type(e).__name__}: {e}")
+            samples.append(sample)
+
+    async def arun():
+        await asyncio.gather(*(auser(a, p) for a, p in zip(agents, plans)))
+
+    started = time.perf_counter()
+    if use_async:
+        asyncio.run(arun())
+    else:
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            list(pool.map(user, agents, plans))
+    report = summarize(samples, time.perf_counter() - started)
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
+
+
+def _agent_factory(model_factory: Callable[[], Any]) -> Callable[[], SQLAgent]:
+    with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    execute_sql.name = "redshift_query"
+    schema = get_schema_catalog(ALLOWED_TABLES).columns()
+    example_index = get_example_index()
+    return lambda: SQLAgent(model=model_factory(), tools=[execute_sql],
+                            system_prompt=system_prompt, schema=schema,
+                            example_index=example_index, sql_cache=False,
+                            metrics_sink=NullMetricsSink())
+
+
+def run_benchmark(backend: str = "duckdb", users: int = 10,
+                  requests_per_user: int = 5, use_async: bool = True,
+                  latency: Optional[float] = None, rows: Optional[int] = None,
+                  cassette: Optional[str] = None,
+                  questions: Optional[Sequence[str]] = None,
+                  seed: int = 0) -> Dict[str, Any]:
+    """Set up the stand-in backend and model, run the load and return the
+    report with the run's parameters."""
+    if backend == "replay":
+        from lang_graph_poc.replay import use_cassette
+        model, _ = use_cassette(None, "replay", cassette, latency)
+        model_factory = lambda: model  # noqa: E731
+        questions = list(questions or [e["question"] for e in bank_questions()])
+    else:
+        from lang_graph_poc.tools.local_backend import make_local_backend
+        local = make_local_backend(backend, rows=rows, seed=seed)
+        set_query_backend(local)
+        examples = bank_questions(list(local.tables))
+        # Answer each bank question with the bank's own SQL
+        rules = [(re.escape(e["question"]), e["sql"]) for e in examples] + SQL_RULES
+        model_factory = lambda: ScriptedChatModel(  # noqa: E731
+            sql_rules=rules, latency=latency or 0.0)
+        questions = list(questions or [e["question"] for e in examples])
+    started_at = datetime.now(timezone.utc).isoformat()
+    try:
+        report = run_load(_agent_factory(model_factory), questions, users,
+                          requests_per_user, use_async, seed)
+    finally:
+        set_query_backend(None)
+    return {
+        "started_at": started_at,
+        "parameters": {"backend": backend, "users": users,
+                       "requests_per_user": requests_per_user,
+                       "mode": "async" if use_async else "threads",
+                       "latency_s": latency, "rows": rows, "seed": seed,
+                       "questions": len(questions)},
+        **report,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Drive N concurrent simulated users through SQLAgent.")
+    parser.add_argument("--backend", default="duckdb",
+                        choices=["duckdb", "sqlite", "replay"])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=5,
+                        help="questions per user")
+    parser.add_argument("--threads", action="store_true",
+                        help="call ask() from one thread per user instead of aask()")
+    parser.add_argument("--latency", type=float, default=None,
+                        help="seconds per model call (replay: default as recorded)")
+    parser.add_argument("--rows", type=int, default=Config.QUERY_BACKEND["rows"])
+    parser.add_argument("--cassette", default=Config.REPLAY["cassette"])
+    parser.add_argument("--question", action="append", dest="questions",
+                        help="ask only these questions (repeatable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest_results.json")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run_benchmark(args.backend, args.users, args.requests,
+                            not args.threads, args.latency, args.rows,
+                            args.cassette, args.questions, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({k: results[k] for k in ("requests", "failed",
+                                              "throughput_rps", "latency_s",
+                                              "peak_rss_mb")}, indent=2))
+    print(f"Full report -> {args.output}")
@@ -0,0 +1,373 @@
+"""Record/replay of model calls and Redshift queries ("cassettes").
+
+In record mode the chat model and the query backend are wrapped so every
+prompt/response and every query result is appended to a JSONL cassette,
+with the time the real call took. In replay mode the same calls are served
+from the cassette, keyed by a hash of the prompt (or normalised SQL),
+after a simulated latency: the recorded one times ``latency_scale``, or a
+fixed ``latency``. Replays need no network, credentials or credits::
+
+    model, backend = use_cassette(get_model(), "record", "runs/gmv.jsonl")
+    ...                                  # run questions against real services
+    model, backend = use_cassette(None, "replay", "runs/gmv.jsonl")
+    SQLAgent(model=model, ...)           # same prompts -> same answers
+
+``python -m lang_graph_poc.replay QUESTION ...`` replays a cassette through
+the whole graph and prints per-question wall time, simulated call time and
+the remainder, which is the graph's own overhead (prompt building,
+validation, serialisation).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import (
+    AIMessage, AIMessageChunk, messages_from_dict, messages_to_dict
+)
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.cache import normalize_sql
+from lang_graph_poc.tools.redshift import QueryBackend, set_query_backend
+from lang_graph_poc.tools.result import ColumnarResult
+
+_CHUNK = re.compile(r"\S+\s*|\s+")
+
+
+class CassetteMiss(KeyError):
+    """A replayed call that the cassette has no recording for."""
+
+
+def _key(kind: str, request: Any) -> str:
+    payload = json.dumps([kind, request], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _prompt(messages) -> List[Tuple[str, str]]:
+    return [(getattr(m, "type", "human"), str(getattr(m, "content", m)))
+            for m in messages]
+
+
+class Cassette:
+    """Append-only JSONL file of recorded calls.
+
+    Calls with the same key are replayed in recorded order and then from
+    the start again, so repeating a recorded question is deterministic.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._cursors: Dict[str, int] = defaultdict(int)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    cassette._entries[entry["key"]].append(entry)
+        logging.info(f"Loaded {len(cassette)} recorded calls from {path}.")
+        return cassette
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def record(self, kind: str, request: Any, response: Any, seconds: float,
+               **extra: Any) -> None:
+        entry = {"kind": kind, "key": _key(kind, request), "request": request,
+                 "response": response, "seconds": round(seconds, 4), **extra}
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._entries[entry["key"]].append(entry)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def play(self, kind: str, request: Any) -> Dict[str, Any]:
+        key = _key(kind, request)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMiss(f"No recorded {kind} call for {str(request)[:200]!r}")
+            entry = entries[self._cursors[key] % len(entries)]
+            self._cursors[key] += 1
+        return entry
+
+
+class _Latency:
+    def __init__(self, latency: Optional[float], latency_scale: float):
+        self.latency = latency
+        self.latency_scale = latency_scale
+
+    def seconds(self, entry: Dict[str, Any]) -> float:
+        if self.latency is not None:
+            return self.latency
+        return entry.get("seconds", 0.0) * self.latency_scale
+
+
+class RecordingChatModel:
+    """Wraps a chat model and records each call to ``cassette``."""
+
+    def __init__(self, model, cassette: Cassette, model_name: Optional[str] = None):
+        self.model = model
+        self.cassette = cassette
+        self.model_name = (model_name or getattr(model, "model_name", None) or
+                           getattr(model, "model", None))
+
+    def bind_tools(self, tools, **kwargs):
+        return RecordingChatModel(self.model.bind_tools(tools, **kwargs),
+                                  self.cassette, self.model_name)
+
+    def _record(self, messages, response, started: float) -> None:
+        self.cassette.record("model", _prompt(messages),
+                             messages_to_dict([response])[0],
+                             time.perf_counter() - started, model=self.model_name)
+
+    def invoke(self, messages, **kwargs):
+        started = time.perf_counter()
+        response = self.model.invoke(messages, **kwargs)
+        self._record(messages, response, started)
+        return response
+
+    async def ainvoke(self, messages, **kwargs):
+        started = time.perf_counter()
+        response = await self.model.ainvoke(messages, **kwargs)
+        self._record(messages, response, started)
+        return response
+
+    def stream(self, messages, **kwargs):
+        started, response = time.perf_counter(), None
+        for chunk in self.model.stream(messages, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        self._record(messages, _as_message(response), started)
+
+    async def astream(self, messages, **kwargs):
+        started, response = time.perf_counter(), None
+        async for chunk in self.model.astream(messages, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        self._record(messages, _as_message(response), started)
+
+
+def _as_message(chunk) -> AIMessage:
+    if chunk is None:
+        return AIMessage(content="")
+    return AIMessage(content=chunk.content,
+                     additional_kwargs=chunk.additional_kwargs,
+                     response_metadata=chunk.response_metadata,
+                     tool_calls=getattr(chunk, "tool_calls", []),
+                     usage_metadata=getattr(chunk, "usage_metadata", None))
+
+
+class ReplayChatModel:
+    """Serves recorded responses for recorded prompts."""
+
+    def __init__(self, cassette: Cassette, latency: Optional[float] = None,
+                 latency_scale: float = 1.0, model_name: Optional[str] = None):
+        self.cassette = cassette
+        self.latency = _Latency(latency, latency_scale)
+        self.model_name = model_name or next(
+            (e.get("model") for entries in cassette._entries.values()
+             for e in entries if e["kind"] == "model" and e.get("model")), None)
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _play(self, messages) -> Tuple[AIMessage, float]:
+        entry = self.cassette.play("model", _prompt(messages))
+        return messages_from_dict([entry["response"]])[0], self.latency.seconds(entry)
+
+    def invoke(self, messages, **kwargs):
+        response, seconds = self._play(messages)
+        time.sleep(seconds)
+        return response
+
+    async def ainvoke(self, messages, **kwargs):
+        response, seconds = self._play(messages)
+        await asyncio.sleep(seconds)
+        return response
+
+    @staticmethod
+    def _chunks(response: AIMessage) -> List[AIMessageChunk]:
+        pieces = _CHUNK.findall(response.content) or [""]
+        chunks = [AIMessageChunk(content=piece) for piece in pieces]
+        chunks[-1] = AIMessageChunk(content=pieces[-1],
+                                    usage_metadata=response.usage_metadata,
+                                    response_metadata=response.response_metadata)
+        return chunks
+
+    def stream(self, messages, **kwargs):
+        response, seconds = self._play(messages)
+        chunks = self._chunks(response)
+        for chunk in chunks:
+            time.sleep(seconds / len(chunks))
+            yield chunk
+
+    async def astream(self, messages, **kwargs):
+        response, seconds = self._play(messages)
+        chunks = self._chunks(response)
+        for chunk in chunks:
+            await asyncio.sleep(seconds / len(chunks))
+            yield chunk
+
+
+def _query_request(query: str, stream: bool, max_rows: int, max_bytes: int):
+    return [normalize_sql(query), stream, max_rows, max_bytes]
+
+
+def _encode_output(output: dict) -> dict:
+    if "data" in output:
+        return {"data": output["data"].to_dict(), "truncated": output["truncated"]}
+    return dict(output)
+
+
+def _decode_output(payload: dict) -> dict:
+    if "data" in payload:
+        return {"data": ColumnarResult.from_dict(payload["data"]),
+                "truncated": payload["truncated"]}
+    return dict(payload)
+
+
+class RecordingQueryBackend:
+    """Wraps a query backend and records each result to ``cassette``."""
+
+    def __init__(self, backend: QueryBackend, cassette: Cassette):
+        self.backend = backend
+        self.cassette = cassette
+        self.name = f"recording:{backend.name}"
+
+    def run(self, query: str, stream: bool, max_rows: int, max_bytes: int,
+            timeout_ms: Optional[int] = None) -> dict:
+        started = time.perf_counter()
+        output = self.backend.run(query, stream, max_rows, max_bytes, timeout_ms)
+        self.cassette.record("query", _query_request(query, stream, max_rows, max_bytes),
+                             _encode_output(output), time.perf_counter() - started)
+        return output
+
+    async def arun(self, query: str, stream: bool, max_rows: int,
+                   max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+        started = time.perf_counter()
+        output = await self.backend.arun(query, stream, max_rows, max_bytes,
+                                         timeout_ms)
+        self.cassette.record("query", _query_request(query, stream, max_rows, max_bytes),
+                             _encode_output(output), time.perf_counter() - started)
+        return output
+
+    def etl_watermark(self) -> Any:
+        return self.backend.etl_watermark()
+
+
+class ReplayQueryBackend:
+    """Serves recorded results for recorded queries."""
+    name = "replay"
+
+    def __init__(self, cassette: Cassette, latency: Optional[float] = None,
+                 latency_scale: float = 1.0):
+        self.cassette = cassette
+        self.latency = _Latency(latency, latency_scale)
+
+    def _play(self, query, stream, max_rows, max_bytes) -> Tuple[dict, float]:
+        entry = self.cassette.play(
+            "query", _query_request(query, stream, max_rows, max_bytes))
+        return _decode_output(entry["response"]), self.latency.seconds(entry)
+
+    def run(self, query: str, stream: bool, max_rows: int, max_bytes: int,
+            timeout_ms: Optional[int] = None) -> dict:
+        output, seconds = self._play(query, stream, max_rows, max_bytes)
+        time.sleep(seconds)
+        return output
+
+    async def arun(self, query: str, stream: bool, max_rows: int,
+                   max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+        output, seconds = self._play(query, stream, max_rows, max_bytes)
+        await asyncio.sleep(seconds)
+        return output
+
+    def etl_watermark(self) -> Any:
+        return None
+
+
+def use_cassette(model, mode: Optional[str] = None, path: Optional[str] = None,
+                 latency: Optional[float] = None,
+                 latency_scale: Optional[float] = None):
+    """Wrap ``model`` and install a query backend for ``mode`` (default
+    Config.REPLAY): "record", "replay" or "off". Returns the model to give
+    SQLAgent and the installed backend (None when off)."""
+    config = Config.REPLAY
+    mode = (mode or config["mode"]).lower()
+    path = path or config["cassette"]
+    latency = config["latency"] if latency is None else latency
+    latency_scale = (config["latency_scale"] if latency_scale is None
+                     else latency_scale)
+    if mode == "record":
+        from lang_graph_poc.tools.redshift import get_query_backend
+        cassette = Cassette(path)
+        backend = RecordingQueryBackend(get_query_backend(), cassette)
+        set_query_backend(backend)
+        return RecordingChatModel(model, cassette), backend
+    if mode == "replay":
+        cassette = Cassette.load(path)
+        backend = ReplayQueryBackend(cassette, latency, latency_scale)
+        set_query_backend(backend)
+        return ReplayChatModel(cassette, latency, latency_scale), backend
+    if mode != "off":
+        raise ValueError(f"Unknown replay mode {mode!r}")
+    return model, None
+
+
+def _benchmark(cassette_path: str, questions: List[str], repeat: int,
+               latency: Optional[float], latency_scale: float) -> List[Dict[str, Any]]:
+    from lang_graph_poc.agents.instrumentation import NullMetricsSink
+    from lang_graph_poc.agents.schema_pruning import SYSTEM_PROMPT_PATH
+    from lang_graph_poc.agents.sql_agent import SQLAgent
+    from lang_graph_poc.llm.examples import get_example_index
+    from lang_graph_poc.tools.redshift import ALLOWED_TABLES, execute_sql
+    from lang_graph_poc.tools.schema_catalog import get_schema_catalog
+
+    model, _ = use_cassette(None, "replay", cassette_path, latency, latency_scale)
+    with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
+        system_prompt = f.read()
+    execute_sql.name = "redshift_query"
+    agent = SQLAgent(model=model, tools=[execute_sql], system_prompt=system_prompt,
+                     schema=get_schema_catalog(ALLOWED_TABLES).columns(),
+                     example_index=get_example_index(), sql_cache=False,
+                     metrics_sink=NullMetricsSink())
+    rows = []
+    for question in questions:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = agent.ask(question)
+            wall = time.perf_counter() - started
+            totals = result.get("metrics", {}).get("totals", {})
+            simulated = totals.get("llm_time_s", 0.0) + totals.get("db_time_s", 0.0)
+            rows.append({"question": question, "success": result.get("success"),
+                         "wall_time_s": round(wall, 4),
+                         "simulated_calls_s": round(simulated, 4),
+                         "graph_overhead_s": round(wall - simulated, 4)})
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Replay a cassette through SQLAgent and time the graph.")
+    parser.add_argument("questions", nargs="+")
+    parser.add_argument("--cassette", default=Config.REPLAY["cassette"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=None,
+                        help="fixed seconds per call (default: as recorded)")
+    parser.add_argument("--latency-scale", type=float, default=0.0)
+    args = parser.parse_args()
+    for row in _benchmark(args.cassette, args.questions, args.repeat,
+                          args.latency, args.latency_scale):
+        print(json.dumps(row))
@@ -0,0 +1,143 @@
+"""In-process result cache for Redshift queries."""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_STRING_LITERAL = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """Canonical form of a query for cache keys.
+
+    Comments are dropped, whitespace collapsed and keywords/identifiers
+    lower-cased; string literals are kept verbatim so that
+    ``booking_id = 'PG1'`` and ``booking_id = 'pg1'`` stay distinct.
+    """
+    parts = _STRING_LITERAL.split(query)
+    for i in range(0, len(parts), 2):
+        code = _COMMENT.sub(" ", parts[i])
+        parts[i] = _WHITESPACE.sub(" ", code).lower()
+    normalized = "".join(parts).strip()
+    return normalized.rstrip(";").strip()
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value, expires_at):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache with per-entry TTL and watermark invalidation.
+
+    ``watermark_fn`` returns the current ETL watermark (for us
+    ``MAX(sys_process_date)``). It is polled at most once every
+    ``watermark_check_interval`` seconds, and the whole cache is dropped
+    when the value moves, so cache hits normally cost no Redshift round trip.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl: float = 900.0,
+        watermark_fn: Optional[Callable[[], Any]] = None,
+        watermark_check_interval: float = 300.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.watermark_fn = watermark_fn
+        self.watermark_check_interval = watermark_check_interval
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._watermark_checked_at = None
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get(self, key: Hashable):
+        """Return the cached value for ``key`` or None on a miss."""
+        self._check_watermark()
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= now:
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = _Entry(value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def pop(self, key: Hashable) -> None:
+        """Drop a single entry, if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            if self._entries:
+                self._stats["invalidations"] += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+            stats["watermark"] = (str(self._watermark)
+                                  if self._watermark is not None else None)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _check_watermark(self) -> None:
+        if self.watermark_fn is None:
+            return
+        now = self._clock()
+        with self._lock:
+            if (self._watermark_checked_at is not None and
+                    now - self._watermark_checked_at <
+                    self.watermark_check_interval):
+                return
+            # Claim the check so concurrent lookups do not all poll Redshift
+            self._watermark_checked_at = now
+        try:
+            watermark = self.watermark_fn()
+        except Exception as e:
+            logging.warning(f"Could not read ETL watermark, keeping cache: {e}")
+            return
+        with self._lock:
+            previous, self._watermark = self._watermark, watermark
+        if previous is not None and watermark != previous:
+            logging.info(
+                f"ETL watermark moved {previous} -> {watermark}; "
+                "invalidating query cache.")
+            self.invalidate()
@@ -0,0 +1,143 @@
+"""Cancellation of in-flight queries by agent request id.
+
+The agent runs each tool call inside ``request_scope(request_id)``; a
+backend wraps the statement in ``track_query(cancel)``, where ``cancel``
+stops it server-side (``pg_cancel_backend`` of the connection's backend
+PID on Redshift, an interrupt on the embedded engines)::
+
+    with track_query(lambda: cancel_backend(pid)):
+        cur.execute(query)
+
+``cancel_request(request_id)`` calls the cancel function of every query
+the request is running and marks the request, so queries it would start
+later are refused before they reach the database.
+"""
+
+import contextvars
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+CANCELLED_ERROR = "cancelled"
+# Requests remembered as cancelled; older marks are dropped first
+_MAX_CANCELLED = 1024
+
+_current_request: contextvars.ContextVar = contextvars.ContextVar(
+    "nlq_request_id", default=None)
+
+
+class QueryCancelled(Exception):
+    """Raised by :func:`track_query` for a request that was cancelled."""
+
+
+class QueryRegistry:
+    """Running queries by request id, and the requests cancelled so far."""
+
+    def __init__(self, max_cancelled: int = _MAX_CANCELLED):
+        self.max_cancelled = max_cancelled
+        self._running: Dict[str, Dict[int, Callable[[], Any]]] = {}
+        self._cancelled: "OrderedDict[str, None]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def register(self, request_id: str, cancel: Callable[[], Any]) -> int:
+        with self._lock:
+            if request_id in self._cancelled:
+                raise QueryCancelled(f"Request {request_id} was cancelled.")
+            self._next_id += 1
+            self._running.setdefault(request_id, {})[self._next_id] = cancel
+            return self._next_id
+
+    def unregister(self, request_id: str, handle: int) -> None:
+        with self._lock:
+            queries = self._running.get(request_id, {})
+            queries.pop(handle, None)
+            if not queries:
+                self._running.pop(request_id, None)
+
+    def cancel(self, request_id: str) -> int:
+        """Cancel ``request_id``'s running queries; returns how many."""
+        with self._lock:
+            self._cancelled[request_id] = None
+            self._cancelled.move_to_end(request_id)
+            while len(self._cancelled) > self.max_cancelled:
+                self._cancelled.popitem(last=False)
+            cancels = list(self._running.get(request_id, {}).values())
+        cancelled = 0
+        for cancel in cancels:
+            try:
+                cancel()
+                cancelled += 1
+            except Exception as e:
+                logging.error(f"Could not cancel a query of request {request_id}: {e}")
+        logging.info(f"Cancelled request {request_id} "
+                     f"({cancelled} running queries).")
+        return cancelled
+
+    def is_cancelled(self, request_id: Optional[str]) -> bool:
+        with self._lock:
+            return request_id is not None and request_id in self._cancelled
+
+    def forget(self, request_id: str) -> None:
+        """Drop the cancelled mark of a finished request."""
+        with self._lock:
+            self._cancelled.pop(request_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": len(self._running),
+                    "queries": sum(len(q) for q in self._running.values()),
+                    "cancelled_requests": len(self._cancelled)}
+
+
+_registry = QueryRegistry()
+
+
+def get_query_registry() -> QueryRegistry:
+    return _registry
+
+
+def current_request_id() -> Optional[str]:
+    return _current_request.get()
+
+
+@contextmanager
+def request_scope(request_id: Optional[str]):
+    """Attribute queries started inside the block to ``request_id``."""
+    token = _current_request.set(request_id)
+    try:
+        yield
+    finally:
+        _current_request.reset(token)
+
+
+@contextmanager
+def track_query(cancel: Callable[[], Any]):
+    """Make the query run inside the block cancellable through its request.
+    Raises QueryCancelled when the request was already cancelled; outside
+    a request scope the query is not tracked."""
+    request_id = current_request_id()
+    if request_id is None:
+        yield
+        return
+    handle = _registry.register(request_id, cancel)
+    try:
+        yield
+    finally:
+        _registry.unregister(request_id, handle)
+
+
+def query_cancelled() -> bool:
+    """Whether the request of the running query was cancelled."""
+    return _registry.is_cancelled(current_request_id())
+
+
+def cancel_request(request_id: str) -> int:
+    return _registry.cancel(request_id)
+
+
+def cancelled_error() -> Dict[str, Any]:
+    """The structured tool output of a query cancelled by the user."""
+    return {"error": "The query was cancelled.", "error_type": CANCELLED_ERROR}
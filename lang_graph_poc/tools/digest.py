@@ -0,0 +1,283 @@
+"""Bounded statistical digest of a query result for LLM prompts.
+
+Instead of serialising every row, the summarize step gets per-column
+statistics, the most frequent categories, a time-series trend and a few
+head/tail rows. Statistics are computed map-reduce style: each chunk of
+rows is reduced to small partial aggregates (vectorised pandas/NumPy), and
+the partials are merged, so the cost of the merge and the size of the
+digest do not depend on the row count.
+"""
+
+import json
+from collections import Counter
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Per chunk, keep this many times top_k category counts; merged top-k
+# values are exact unless a category is spread thinly over many chunks
+_CATEGORY_KEEP_FACTOR = 10
+_MAX_VALUE_CHARS = 60
+_MAX_TREND_POINTS = 12
+_MAX_TREND_MEASURES = 3
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return "category"
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return "datetime"
+    # NUMERIC columns hold exact Decimals; the digest reads them as floats
+    first = series.first_valid_index()
+    if first is not None and isinstance(series.loc[first], Decimal):
+        return "numeric"
+    return "category"
+
+
+def _short(value: Any) -> Any:
+    """JSON-friendly, length-capped form of a single value."""
+    if isinstance(value, (list, tuple, dict, np.ndarray)):
+        value = str(value)
+    elif value is None or pd.isna(value):
+        return None
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    elif isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else round(value, 4)
+    if isinstance(value, (int, bool)):
+        return value
+    if isinstance(value, pd.Timestamp):
+        if value == value.normalize():
+            return value.date().isoformat()
+        return value.isoformat()
+    text = str(value)
+    if len(text) > _MAX_VALUE_CHARS:
+        text = text[:_MAX_VALUE_CHARS - 3] + "..."
+    return text
+
+
+def _rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    return [{col: _short(val) for col, val in zip(frame.columns, row)}
+            for row in frame.itertuples(index=False, name=None)]
+
+
+def _map_column(series: pd.Series, kind: str, top_k: int) -> Dict[str, Any]:
+    """Partial aggregates of one column over one chunk."""
+    nulls = int(series.isna().sum())
+    partial = {"count": len(series) - nulls, "nulls": nulls}
+    if kind == "numeric":
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        values = values[~np.isnan(values)]
+        if values.size:
+            partial.update(sum=float(values.sum()), min=float(values.min()),
+                           max=float(values.max()))
+    elif kind == "datetime":
+        if partial["count"]:
+            partial.update(min=series.min(), max=series.max())
+    else:
+        try:
+            counts = series.value_counts(dropna=True)
+        except TypeError:  # unhashable values (arrays, dicts)
+            counts = series.dropna().astype(str).value_counts()
+        kept = counts.head(top_k * _CATEGORY_KEEP_FACTOR)
+        partial.update(top=Counter({_short(k): int(v) for k, v in kept.items()}),
+                       distinct=len(counts),
+                       complete=len(kept) == len(counts))
+    return partial
+
+
+def _reduce_column(total: Optional[Dict[str, Any]],
+                   partial: Dict[str, Any]) -> Dict[str, Any]:
+    if total is None:
+        return partial
+    total["count"] += partial["count"]
+    total["nulls"] += partial["nulls"]
+    if "sum" in partial:
+        total["sum"] = total.get("sum", 0.0) + partial["sum"]
+    for key, pick in (("min", min), ("max", max)):
+        if key in partial:
+            total[key] = (pick(total[key], partial[key]) if key in total
+                          else partial[key])
+    if "top" in partial:
+        total["top"].update(partial["top"])
+        total["distinct"] = max(total["distinct"], partial["distinct"])
+        total["complete"] = total["complete"] and partial["complete"]
+    return total
+
+
+def _map_trend(frame: pd.DataFrame, time_column: str,
+               measures: List[str]) -> Optional[pd.DataFrame]:
+    """Daily row counts and measure sums for one chunk."""
+    days = frame[time_column].dt.floor("D")
+    values = pd.DataFrame(
+        {col: frame[col].to_numpy(dtype="float64", na_value=np.nan)
+         for col in measures}, index=frame.index)
+    values["rows"] = 1
+    daily = values.groupby(days).sum(min_count=1)
+    return daily if len(daily) else None
+
+
+def _finish_trend(daily: pd.DataFrame, measures: List[str]) -> Dict[str, Any]:
+    daily = daily.sort_index()
+    span = (daily.index[-1] - daily.index[0]).days
+    for freq, label, max_span in (("D", "day", 14), ("W-MON", "week", 90),
+                                  ("MS", "month", 730), ("QS", "quarter", 3650)):
+        if span <= max_span:
+            break
+    else:
+        freq, label = "YS", "year"
+    buckets = daily.resample(freq, label="left", closed="left").sum(min_count=1)
+    buckets = buckets.dropna(how="all")
+    trend: Dict[str, Any] = {"granularity": label, "periods": len(buckets)}
+    shown = buckets.tail(_MAX_TREND_POINTS)
+    trend["series"] = {
+        col: {_short(ts): _short(v) for ts, v in shown[col].items()}
+        for col in ["rows"] + measures
+    }
+    directions = {}
+    for col in ["rows"] + measures:
+        series = buckets[col].dropna()
+        if len(series) < 2:
+            continue
+        slope = np.polyfit(np.arange(len(series)), series.to_numpy(), 1)[0]
+        first, last = series.iloc[0], series.iloc[-1]
+        directions[col] = {
+            "direction": ("up" if slope > 0 else "down" if slope < 0 else "flat"),
+            "first_to_last_pct": (_short((last - first) / abs(first) * 100)
+                                  if first else None),
+        }
+    trend["trend"] = directions
+    return trend
+
+
+def digest_frames(chunks: Iterable[pd.DataFrame], top_k: int = 5,
+                  head_rows: int = 5, tail_rows: int = 5,
+                  full_rows_max: int = 20) -> Dict[str, Any]:
+    """Digest a result given as an iterable of DataFrame chunks.
+
+    Results of at most ``full_rows_max`` rows are included verbatim;
+    larger ones are represented by statistics plus head/tail rows.
+    """
+    kinds: Dict[str, str] = {}
+    totals: Dict[str, Dict[str, Any]] = {}
+    daily: Optional[pd.DataFrame] = None
+    time_column, measures = None, []
+    row_count = 0
+    head_keep = max(head_rows, full_rows_max + 1)
+    head: Optional[pd.DataFrame] = None
+    tail: Optional[pd.DataFrame] = None
+
+    for chunk in chunks:
+        if not kinds:
+            kinds = {col: _column_kind(chunk[col]) for col in chunk.columns}
+            time_column = next(
+                (c for c, k in kinds.items() if k == "datetime"), None)
+            measures = [c for c, k in kinds.items()
+                        if k == "numeric"][:_MAX_TREND_MEASURES]
+        if not len(chunk):
+            continue
+        row_count += len(chunk)
+        if head is None:
+            head = chunk.head(head_keep)
+        elif len(head) < head_keep:
+            head = pd.concat([head, chunk.head(head_keep - len(head))])
+        tail = pd.concat([tail, chunk.tail(tail_rows)]).tail(tail_rows) \
+            if tail is not None else chunk.tail(tail_rows)
+        for col, kind in kinds.items():
+            totals[col] = _reduce_column(
+                totals.get(col), _map_column(chunk[col], kind, top_k))
+        if time_column is not None:
+            partial = _map_trend(chunk, time_column, measures)
+            if partial is not None:
+                daily = partial if daily is None else daily.add(partial, fill_value=0)
+
+    digest: Dict[str, Any] = {"row_count": row_count,
+                              "columns": list(kinds)}
+    if row_count <= full_rows_max:
+        digest["rows"] = _rows(head) if head is not None else []
+        return digest
+
+    stats = {}
+    for col, total in totals.items():
+        kind = kinds[col]
+        entry = {"type": kind, "count": total["count"], "nulls": total["nulls"]}
+        if kind == "numeric" and total["count"]:
+            entry.update(min=_short(total["min"]), max=_short(total["max"]),
+                         mean=_short(total["sum"] / total["count"]),
+                         sum=_short(total["sum"]))
+        elif kind == "datetime" and total["count"]:
+            entry.update(min=_short(total["min"]), max=_short(total["max"]))
+        elif kind == "category":
+            entry["top_values"] = dict(total["top"].most_common(top_k))
+            entry["distinct"] = (len(total["top"]) if total["complete"]
+                                 else f">={total['distinct']}")
+        stats[col] = entry
+    digest["column_stats"] = stats
+    if daily is not None and len(daily):
+        digest["time_series"] = {"time_column": time_column,
+                                 **_finish_trend(daily, measures)}
+    digest["head_rows"] = _rows(head.head(head_rows))
+    digest["tail_rows"] = _rows(tail)
+    return digest
+
+
+def digest_result(result, chunk_rows: int = 50_000, **kwargs) -> Dict[str, Any]:
+    """Digest a ColumnarResult (see :func:`digest_frames` for options)."""
+    digest = digest_frames(result.iter_chunks(chunk_rows), **kwargs)
+    if getattr(result, "truncated", False):
+        digest["truncated"] = True
+    return digest
+
+
+_SAMPLE_KEYS = ("rows", "head_rows", "tail_rows")
+
+
+def sample_rows(digest: Dict[str, Any]) -> List[tuple]:
+    """The digest's sample rows as (key, row) pairs, most telling first:
+    every row of a small result, else head rows then tail rows."""
+    return [(key, row) for key in _SAMPLE_KEYS for row in digest.get(key, [])]
+
+
+def with_sample_rows(digest: Dict[str, Any], rows: Iterable[tuple]) -> Dict[str, Any]:
+    """Copy of ``digest`` keeping only the given (key, row) sample rows."""
+    trimmed = {k: v for k, v in digest.items() if k not in _SAMPLE_KEYS}
+    for key, row in rows:
+        trimmed.setdefault(key, []).append(row)
+    return trimmed
+
+
+def format_digest(digest: Dict[str, Any], max_chars: int = 6000) -> str:
+    """Compact JSON for a prompt, trimmed to at most ``max_chars``.
+
+    Sample rows go first, then trend points, then per-column detail, so the
+    headline numbers survive the longest.
+    """
+    digest = json.loads(json.dumps(digest, default=str))
+    text = json.dumps(digest, separators=(",", ":"))
+    trims = [("tail_rows",), ("head_rows",), ("rows",),
+             ("time_series", "series"), ("column_stats",)]
+    for path in trims:
+        if len(text) <= max_chars:
+            break
+        parent = digest
+        for key in path[:-1]:
+            parent = parent.get(key) or {}
+        value = parent.get(path[-1])
+        if isinstance(value, list):
+            while value and len(text) > max_chars:
+                value.pop()
+                text = json.dumps(digest, separators=(",", ":"))
+            if not value:
+                parent.pop(path[-1], None)
+        elif isinstance(value, dict):
+            while value and len(text) > max_chars:
+                value.pop(next(reversed(value)))
+                text = json.dumps(digest, separators=(",", ":"))
+        text = json.dumps(digest, separators=(",", ":"))
+    return text[:max_chars]
@@ -0,0 +1,140 @@
+"""Execution policy applied to every query the agent runs.
+
+The prompts ask the model for a LIMIT, but nothing enforced it; here the
+final SQL is parsed and classified, row-level (non-aggregate) SELECTs get
+an outer LIMIT injected or capped, and each class gets its own
+``statement_timeout`` (see Config.EXECUTION_POLICY)::
+
+    policy = apply_execution_policy(sql)
+    backend.run(policy.sql, ..., timeout_ms=policy.timeout_ms)
+
+A query cancelled by its timeout comes back as a structured error
+(``error_type`` "statement_timeout") that handle_sql_error can act on.
+"""
+
+import re
+from typing import Any, Dict, NamedTuple, Optional
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from lang_graph_poc.config import Config
+
+DIALECT = "redshift"
+TIMEOUT_ERROR = "statement_timeout"
+
+_EXPLAIN = re.compile(r"^\s*explain\b", re.IGNORECASE)
+# Postgres/Redshift SQLSTATE query_canceled; also raised by a user cancel
+_QUERY_CANCELED = "57014"
+_TIMEOUT_MESSAGE = re.compile(r"statement timeout", re.IGNORECASE)
+
+
+class ExecutionPolicy(NamedTuple):
+    sql: str
+    query_class: str  # "explain", "aggregate", "detail" or "other"
+    timeout_ms: Optional[int]
+    limit: Optional[int]  # the row limit injected or capped, if any
+
+    def report(self) -> Dict[str, Any]:
+        return {"query_class": self.query_class, "timeout_ms": self.timeout_ms,
+                "limit": self.limit}
+
+
+def _parse(sql: str) -> Optional[exp.Expression]:
+    try:
+        statements = sqlglot.parse(sql, read=DIALECT)
+    except ParseError:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Query):
+        return None
+    return statements[0]
+
+
+def _is_aggregate(query: exp.Query) -> bool:
+    """Whether the outermost SELECT(s) return one row per group rather
+    than one per table row."""
+    if isinstance(query, exp.SetOperation):
+        return _is_aggregate(query.left) and _is_aggregate(query.right)
+    if isinstance(query, exp.Subquery):
+        return _is_aggregate(query.this)
+    if not isinstance(query, exp.Select):
+        return False
+    if query.args.get("group"):
+        return True
+    for projection in query.expressions:
+        # Window functions and aggregates of scalar subqueries keep the rows
+        for agg in projection.find_all(exp.AggFunc):
+            if agg.find_ancestor(exp.Window) is None and \
+                    agg.find_ancestor(exp.Select) is query:
+                return True
+    return False
+
+
+def classify_query(sql: str) -> str:
+    if _EXPLAIN.match(sql):
+        return "explain"
+    query = _parse(sql)
+    if query is None:
+        return "other"
+    return "aggregate" if _is_aggregate(query) else "detail"
+
+
+def add_limit(sql: str, limit: int) -> Optional[str]:
+    """``sql`` returning at most ``limit`` rows (an existing larger LIMIT is
+    lowered), or None when it cannot be rewritten (not a single parseable
+    query)."""
+    query = _parse(sql)
+    if query is None:
+        return None
+    existing = query.args.get("limit")
+    if existing is not None:
+        current = existing.expression
+        if isinstance(current, exp.Literal) and current.is_int and \
+                int(current.this) <= limit:
+            return sql
+    if isinstance(query, exp.Select):
+        return query.limit(limit).sql(dialect=DIALECT)
+    # UNION and friends: limit the combined result
+    return exp.select("*").from_(query.subquery("limited")).limit(limit) \
+        .sql(dialect=DIALECT)
+
+
+def apply_execution_policy(sql: str,
+                           policy: Optional[Dict[str, Any]] = None) -> ExecutionPolicy:
+    """Classify ``sql``, cap row-level SELECTs at ``detail_limit`` rows and
+    pick the class's timeout (default Config.EXECUTION_POLICY)."""
+    policy = policy or Config.EXECUTION_POLICY
+    query_class = classify_query(sql)
+    timeout_ms = policy["timeouts_ms"].get(query_class) or None
+    limit = None
+    if query_class == "detail" and policy["detail_limit"]:
+        limited = add_limit(sql, policy["detail_limit"])
+        if limited is not None and limited != sql:
+            sql, limit = limited, policy["detail_limit"]
+    return ExecutionPolicy(sql, query_class, timeout_ms, limit)
+
+
+def is_timeout_error(error: BaseException, elapsed_s: float = 0.0,
+                     timeout_ms: Optional[int] = None) -> bool:
+    """Whether ``error`` is a statement timeout. Redshift reports timeouts
+    and user cancels with the same SQLSTATE, so a cancel that arrived at
+    the timeout also counts."""
+    message = str(error)
+    if getattr(error, "pgcode", None) == _QUERY_CANCELED or \
+            getattr(getattr(error, "diag", None), "sqlstate", None) == _QUERY_CANCELED:
+        return bool(_TIMEOUT_MESSAGE.search(message)) or bool(
+            timeout_ms and elapsed_s * 1000 >= 0.9 * timeout_ms)
+    return bool(_TIMEOUT_MESSAGE.search(message))
+
+
+def timeout_error(timeout_ms: int, elapsed_s: float,
+                  query_class: Optional[str] = None) -> Dict[str, Any]:
+    """The structured tool output of a query cancelled by its timeout."""
+    return {
+        "error": (f"The query was cancelled after {elapsed_s:.1f}s by its "
+                  f"{timeout_ms / 1000:g}s statement timeout."),
+        "error_type": TIMEOUT_ERROR,
+        "timeout_ms": timeout_ms,
+        "query_class": query_class,
+    }
@@ -0,0 +1,243 @@
+"""Background execution of queries on a bounded pool of worker threads.
+
+A query is submitted as a job and identified by its job id; callers poll
+``status`` or block on ``result``, and finished jobs stay in the result
+store for ``result_ttl`` seconds (at most ``max_results`` of them)::
+
+    job_id = executor.submit(sql, request_id=request_id)
+    executor.status(job_id)["state"]   # "queued", "running", "succeeded", ...
+    output = executor.result(job_id)   # the execute_redshift_query dict
+
+At most ``max_workers`` queries run at once and ``max_queued`` more wait
+for a worker; submitting beyond that raises JobQueueFull. A job runs in the
+cancellation scope of its request (see tools.cancellation), or of its own
+job id when it has none, so ``cancel`` also stops a running query on the
+database.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypedDict
+
+from lang_graph_poc.tools.cancellation import (
+    CANCELLED_ERROR, cancel_request, cancelled_error, get_query_registry,
+    request_scope
+)
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = (
+    "queued", "running", "succeeded", "failed", "cancelled")
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(RuntimeError):
+    """Every worker is busy and the wait queue is full."""
+
+
+class JobNotFound(KeyError):
+    """Unknown job id, or its result expired from the result store."""
+
+
+class JobStatus(TypedDict):
+    job_id: str
+    request_id: Optional[str]
+    state: str
+    queue_position: Optional[int]  # 1 = next to run; None unless queued
+    submitted_at: float  # time.time()
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    error: Optional[str]
+
+
+class _Job:
+    __slots__ = ("job_id", "request_id", "query", "state", "future",
+                 "submitted_at", "started_at", "finished_at", "output",
+                 "expires_at")
+
+    def __init__(self, job_id: str, request_id: Optional[str], query: str):
+        self.job_id = job_id
+        self.request_id = request_id
+        self.query = query
+        self.state = QUEUED
+        self.future: Optional[concurrent.futures.Future] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.output: Optional[Dict[str, Any]] = None
+        self.expires_at: Optional[float] = None
+
+    @property
+    def scope(self) -> str:
+        return self.request_id or self.job_id
+
+
+class QueryJobExecutor:
+    """Thread-safe job queue running ``run_query(sql) -> dict`` on a bounded
+    worker pool, with a TTL/LRU store of finished jobs."""
+
+    def __init__(
+        self,
+        run_query: Callable[[str], Dict[str, Any]],
+        max_workers: int = 8,
+        max_queued: int = 32,
+        result_ttl: float = 600.0,
+        max_results: int = 256,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.run_query = run_query
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="nlq-query")
+        self._jobs: "OrderedDict[str, _Job]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "rejected": 0, "succeeded": 0,
+                       "failed": 0, "cancelled": 0, "expired": 0}
+
+    def submit(self, query: str, request_id: Optional[str] = None) -> str:
+        """Queue ``query``; returns its job id. Raises JobQueueFull."""
+        job = _Job(uuid.uuid4().hex, request_id, query)
+        with self._lock:
+            self._expire()
+            pending = sum(1 for j in self._jobs.values()
+                          if j.state not in FINISHED)
+            if pending >= self.max_workers + self.max_queued:
+                self._stats["rejected"] += 1
+                raise JobQueueFull(
+                    f"{pending} queries are running or queued; try again shortly.")
+            self._jobs[job.job_id] = job
+            self._stats["submitted"] += 1
+            job.future = self._pool.submit(self._run, job)
+        return job.job_id
+
+    def _run(self, job: _Job) -> Dict[str, Any]:
+        with self._lock:
+            if job.state != QUEUED:  # cancelled while queued
+                return job.output
+            job.state = RUNNING
+            job.started_at = time.time()
+        try:
+            with request_scope(job.scope):
+                output = self.run_query(job.query)
+        except Exception as e:
+            logging.error(f"Query job {job.job_id} failed: {e}")
+            output = {"error": str(e)}
+        if job.request_id is None:
+            get_query_registry().forget(job.scope)
+        if output.get("error_type") == CANCELLED_ERROR:
+            state = CANCELLED
+        else:
+            state = FAILED if "error" in output else SUCCEEDED
+        self._finish(job, state, output)
+        return output
+
+    def _finish(self, job: _Job, state: str, output: Dict[str, Any]) -> None:
+        with self._lock:
+            job.state = state
+            job.output = output
+            job.finished_at = time.time()
+            job.expires_at = self._clock() + self.result_ttl
+            self._finished[job.job_id] = None
+            self._stats[state] += 1
+            self._expire()
+
+    def _expire(self) -> None:
+        """Drop finished jobs past their TTL or beyond max_results.
+        Caller holds the lock."""
+        now = self._clock()
+        while self._finished:
+            job_id = next(iter(self._finished))
+            if len(self._finished) <= self.max_results and \
+                    self._jobs[job_id].expires_at > now:
+                break
+            del self._finished[job_id]
+            del self._jobs[job_id]
+            self._stats["expired"] += 1
+
+    def _job(self, job_id: str) -> _Job:
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    def _status(self, job: _Job) -> JobStatus:
+        position = None
+        if job.state == QUEUED:
+            # Jobs are stored in submission order, which is the run order
+            position = 1
+            for other in self._jobs.values():
+                if other is job:
+                    break
+                position += other.state == QUEUED
+        return JobStatus(
+            job_id=job.job_id, request_id=job.request_id, state=job.state,
+            queue_position=position, submitted_at=job.submitted_at,
+            started_at=job.started_at, finished_at=job.finished_at,
+            error=(job.output or {}).get("error"))
+
+    def status(self, job_id: str) -> JobStatus:
+        job = self._job(job_id)
+        with self._lock:
+            return self._status(job)
+
+    def jobs(self, request_id: str) -> List[JobStatus]:
+        """Status of every job of ``request_id`` still in the store."""
+        with self._lock:
+            self._expire()
+            return [self._status(j) for j in self._jobs.values()
+                    if j.request_id == request_id]
+
+    def result(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Output of the job, waiting up to ``timeout`` seconds (forever by
+        default) for it to finish; raises concurrent.futures.TimeoutError."""
+        job = self._job(job_id)
+        try:
+            return job.future.result(timeout)
+        except concurrent.futures.CancelledError:
+            return job.output
+
+    async def aresult(self, job_id: str) -> Dict[str, Any]:
+        """Await the job's output without blocking the event loop."""
+        job = self._job(job_id)
+        try:
+            return await asyncio.wrap_future(job.future)
+        except asyncio.CancelledError:
+            if job.state != CANCELLED:
+                raise
+            return job.output
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or stop a running one on the database (with
+        the rest of its request). False once the job has finished."""
+        job = self._job(job_id)
+        with self._lock:
+            state = job.state
+        if state == QUEUED and job.future.cancel():
+            self._finish(job, CANCELLED, cancelled_error())
+            return True
+        if state in FINISHED:
+            return False
+        cancel_request(job.scope)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            self._expire()
+            states = [j.state for j in self._jobs.values()]
+            return {**self._stats, "queued": states.count(QUEUED),
+                    "running": states.count(RUNNING),
+                    "stored_results": len(self._finished)}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,342 @@
+"""Embedded stand-ins for Redshift: DuckDB (preferred) or SQLite.
+
+The tables of the schema catalog (by default parsed from the DDL in
+``lang_graph_poc/resources``) are created in an in-process database and
+filled with synthetic rows, and the agent's Redshift SQL is transpiled with
+sqlglot before it runs. Selected with ``QUERY_BACKEND=duckdb`` (or
+``sqlite``), this lets the whole agent be benchmarked for concurrency and
+data volume without a cluster. SQLite only understands simple SQL; date
+arithmetic needs DuckDB.
+"""
+
+import asyncio
+import logging
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import sqlglot
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.cancellation import (
+    cancelled_error, query_cancelled, track_query
+)
+from lang_graph_poc.tools.execution_policy import classify_query, timeout_error
+from lang_graph_poc.tools.redshift import ETL_WATERMARK_QUERY, _is_select, _stream_rows
+from lang_graph_poc.tools.result import ColumnarResult
+from lang_graph_poc.tools.schema_catalog import ColumnInfo, catalog_from_ddl
+
+# Realistic values (and weights) for columns the prompts filter on
+_CATEGORIES = {
+    "booking_state": (["CONFIRMED", "FULFILLED", "PENDING", "CANCELLED",
+                       "REJECTED"], [0.45, 0.3, 0.1, 0.12, 0.03]),
+    "country_id": (["SG", "AU", "ID", "MY", "TH", "PH", "VN", "JP", "KR",
+                    "IN"], None),
+    "iso_of_booking_isd": (["SG", "AU", "ID", "MY", "TH", "PH"], None),
+    "currency": (["SGD", "AUD", "IDR", "MYR", "THB", "USD"], None),
+    "payment_type": (["card", "paypal", "grabpay", "alipay"], None),
+    "inventory_type": (["ticket", "tour", "transport", "attraction"], None),
+    "utm_source": (["google", "facebook", "direct", "email", "affiliate"], None),
+    "utm_medium": (["cpc", "organic", "email", "referral"], None),
+    "locale": (["en", "zh", "ja", "ko", "id"], None),
+}
+_CATEGORY_ALIASES = {"booking_currency": "currency",
+                     "refund_currency": "currency"}
+# Distinct values of *_id columns, as a fraction of the row count
+_ID_CARDINALITY = {"booking_id": 1.0, "order_id": 1.0, "customer_id": 0.2,
+                   "product_id": 0.005, "option_id": 0.01}
+_DEFAULT_ID_CARDINALITY = 0.05
+_NULL_PREFIXES = ("cancellation", "refund", "reward", "redemption", "expiry")
+_EXPLAIN = re.compile(r"^\s*explain\s+", re.IGNORECASE)
+
+# Engine type names (as reported in cursor.description) -> Postgres OIDs
+_TYPE_CODES = {"BOOLEAN": 16, "BIGINT": 20, "INTEGER": 23, "SMALLINT": 21,
+               "HUGEINT": 20, "DOUBLE": 701, "FLOAT": 700, "DATE": 1082,
+               "TIMESTAMP": 1114, "TIMESTAMP WITH TIME ZONE": 1184}
+
+
+def _kind(sql_type: str) -> str:
+    sql_type = sql_type.lower()
+    if sql_type.startswith(("timestamp", "datetime")):
+        return "timestamp"
+    if sql_type.startswith("date"):
+        return "date"
+    if sql_type.startswith(("double", "float", "real", "decimal", "numeric")):
+        return "float"
+    if sql_type.startswith(("bigint", "int", "smallint")):
+        return "int"
+    if sql_type.startswith("bool"):
+        return "bool"
+    return "text"
+
+
+def _with_nulls(values, rng, fraction: float):
+    mask = rng.random(len(values)) < fraction
+    values = pd.Series(values)
+    return values.mask(mask).to_numpy() if values.dtype.kind != "M" \
+        else values.mask(mask)
+
+
+def synthetic_frame(columns: Sequence[ColumnInfo], rows: int, seed: int = 0,
+                    days: int = 730, today: Optional[date] = None) -> pd.DataFrame:
+    """``rows`` synthetic rows for ``columns``, vectorised with NumPy.
+
+    Bookings are spread uniformly over the last ``days`` days; other dates
+    follow them; amounts are log-normal; known categorical columns use
+    realistic values; ``*_id`` columns have plausible cardinalities.
+    """
+    rng = np.random.default_rng(seed)
+    today = today or date.today()
+    start = np.datetime64(today - timedelta(days=days), "s")
+    booked = start + rng.integers(0, days * 86400, rows).astype("timedelta64[s]")
+    gross = np.round(rng.lognormal(4.5, 1.0, rows), 2)
+    data: Dict[str, Any] = {}
+    for column in columns:
+        name, kind = column["name"], _kind(column["type"])
+        nullable = name.startswith(_NULL_PREFIXES)
+        if kind == "timestamp":
+            values = (booked if name in ("booking_date", "booking_date_utc8",
+                                         "date_created")
+                      else booked + rng.integers(0, 60 * 86400, rows)
+                      .astype("timedelta64[s]"))
+        elif kind == "date":
+            values = (booked + np.timedelta64(1, "D")).astype("datetime64[D]")
+        elif kind == "float":
+            if name.startswith("exrate") or name.endswith("_rate_sgd"):
+                values = np.round(rng.uniform(0.5, 1.5, rows), 4)
+            elif "discount" in name or "refund" in name or "reward" in name:
+                values = np.round(gross * rng.uniform(0, 0.2, rows), 2)
+            elif name.startswith("net_total") or "commission" in name:
+                values = np.round(gross * 0.85, 2)
+            else:
+                values = gross
+        elif kind == "int":
+            values = (rng.integers(1, 6, rows) if "quantity" in name else
+                      rng.integers(0, 2, rows) if name.startswith("is_") else
+                      rng.integers(0, 91, rows))
+        elif kind == "bool":
+            values = rng.random(rows) < 0.2
+        elif name in _CATEGORIES or name in _CATEGORY_ALIASES:
+            choices, weights = _CATEGORIES[_CATEGORY_ALIASES.get(name, name)]
+            values = np.array(choices, dtype=object)[
+                rng.choice(len(choices), rows, p=weights)]
+        elif name.endswith("_id") or name.endswith("_name"):
+            key = name[:-5] + "_id" if name.endswith("_name") else name
+            distinct = max(int(rows * _ID_CARDINALITY.get(
+                key, _DEFAULT_ID_CARDINALITY)), 1)
+            ids = (np.arange(rows) if distinct >= rows
+                   else rng.integers(0, distinct, rows))
+            prefix = name[:-5].title() + " " if name.endswith("_name") \
+                else key[0].upper()
+            values = np.char.add(prefix, ids.astype(str)).astype(object)
+        else:
+            pool = np.array([f"{name}_{k}" for k in range(20)], dtype=object)
+            values = pool[rng.integers(0, len(pool), rows)]
+        data[name] = _with_nulls(values, rng, 0.85) if nullable else values
+    return pd.DataFrame(data)
+
+
+class _DescribedCursor:
+    """Presents an engine cursor with Postgres type OIDs in its
+    description, so the Redshift batch-fetching code can be reused."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.name = None
+
+    @property
+    def description(self):
+        return [(desc[0], _TYPE_CODES.get(str(desc[1]).upper()))
+                for desc in (self.cursor.description or [])]
+
+    def fetchmany(self, size):
+        return self.cursor.fetchmany(size)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class _LocalBackend(ABC):
+    dialect = ""
+    explain = "EXPLAIN "
+
+    def __init__(self, tables: Optional[Dict[str, List[ColumnInfo]]] = None,
+                 rows: Optional[int] = None, seed: Optional[int] = None,
+                 days: Optional[int] = None):
+        config = Config.QUERY_BACKEND
+        self.name = self.dialect
+        self.tables = tables if tables is not None else catalog_from_ddl().tables
+        self.rows = config["rows"] if rows is None else rows
+        seed = config["seed"] if seed is None else seed
+        days = config["days"] if days is None else days
+        for i, (table, columns) in enumerate(self.tables.items()):
+            frame = synthetic_frame(columns, self.rows, seed + i, days)
+            self._load(table, columns, frame)
+            logging.info(f"{self.dialect}: loaded {len(frame)} synthetic rows "
+                         f"into {table}.")
+
+    def transpile(self, query: str) -> str:
+        # sqlglot keeps EXPLAIN as an opaque command; transpile what it explains
+        explain = _EXPLAIN.match(query)
+        if explain:
+            query = query[explain.end():]
+        sql = sqlglot.transpile(query, read="redshift", write=self.dialect)[0]
+        return self.explain + sql if explain else sql
+
+    @abstractmethod
+    def _load(self, table: str, columns: List[ColumnInfo], frame: pd.DataFrame) -> None:
+        """Create ``table`` and insert ``frame``."""
+
+    @abstractmethod
+    def _cursor(self):
+        """Context manager yielding a cursor for one query."""
+
+    @abstractmethod
+    def _interrupt(self, cur) -> None:
+        """Stop the query running on ``cur`` (from another thread)."""
+
+    def run(self, query: str, stream: bool, max_rows: int, max_bytes: int,
+            timeout_ms: Optional[int] = None) -> dict:
+        started = time.perf_counter()
+        timed_out = threading.Event()
+        timer = None
+        try:
+            sql = self.transpile(query)
+            with self._cursor() as cur:
+                if timeout_ms:
+                    # Emulates Redshift's statement_timeout
+                    def cancel():
+                        timed_out.set()
+                        self._interrupt(cur)
+                    timer = threading.Timer(timeout_ms / 1000, cancel)
+                    timer.daemon = True
+                    timer.start()
+                with track_query(lambda: self._interrupt(cur)):
+                    cur.execute(sql)
+                    described = _DescribedCursor(cur)
+                    if _is_select(query):
+                        result = _stream_rows(described, max_rows, max_bytes,
+                                              Config.REDSHIFT_FETCH["batch_size"])
+                    elif cur.description:
+                        result = ColumnarResult.from_cursor_rows(
+                            described.description, cur.fetchall())
+                    else:
+                        result = ColumnarResult.empty_result()
+            return {"data": result, "truncated": result.truncated}
+        except Exception as e:
+            if query_cancelled():
+                return cancelled_error()
+            if timed_out.is_set():
+                return timeout_error(timeout_ms, time.perf_counter() - started,
+                                     classify_query(query))
+            logging.error(f"Query execution error ({self.dialect}): {e}")
+            return {"error": str(e)}
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    async def arun(self, query: str, stream: bool, max_rows: int,
+                   max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+        return await asyncio.to_thread(self.run, query, stream, max_rows,
+                                       max_bytes, timeout_ms)
+
+    def etl_watermark(self) -> Any:
+        output = self.run(ETL_WATERMARK_QUERY, False, 1, 1 << 20)
+        data = output.get("data")
+        return data.arrays[0][0] if data is not None and len(data) else None
+
+
+class DuckDBBackend(_LocalBackend):
+    """In-memory DuckDB; each query runs on its own cursor, so concurrent
+    requests execute in parallel."""
+    dialect = "duckdb"
+
+    def __init__(self, *args, **kwargs):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("QUERY_BACKEND=duckdb needs the duckdb package "
+                              "(pip install duckdb)") from e
+        self._conn = duckdb.connect(":memory:")
+        super().__init__(*args, **kwargs)
+
+    def _load(self, table, columns, frame):
+        schema_name = table.split(".")[0] if "." in table else None
+        if schema_name:
+            self._conn.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema_name}"')
+        self._conn.register("synthetic_frame", frame)
+        self._conn.execute(f"CREATE TABLE {table} AS SELECT * FROM synthetic_frame")
+        self._conn.unregister("synthetic_frame")
+
+    @contextmanager
+    def _cursor(self):
+        cur = self._conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def _interrupt(self, cur) -> None:
+        cur.interrupt()
+
+
+class SQLiteBackend(_LocalBackend):
+    """In-memory SQLite (standard library). Queries are serialised on one
+    connection; schemas such as ``core`` are attached databases."""
+    dialect = "sqlite"
+    explain = "EXPLAIN QUERY PLAN "
+
+    _SQLITE_TYPES = {"int": "INTEGER", "float": "REAL", "bool": "INTEGER"}
+
+    def __init__(self, *args, **kwargs):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _load(self, table, columns, frame):
+        if "." in table:
+            schema_name = table.split(".")[0]
+            attached = {row[1] for row in self._conn.execute("PRAGMA database_list")}
+            if schema_name not in attached:
+                self._conn.execute(f"ATTACH DATABASE ':memory:' AS \"{schema_name}\"")
+        definition = ", ".join(
+            f'"{c["name"]}" {self._SQLITE_TYPES.get(_kind(c["type"]), "TEXT")}'
+            for c in columns)
+        self._conn.execute(f"CREATE TABLE {table} ({definition})")
+        frame = frame.copy()
+        for column in frame.columns:
+            if frame[column].dtype.kind == "M":
+                frame[column] = frame[column].dt.strftime("%Y-%m-%d %H:%M:%S")
+        frame = frame.astype(object).where(frame.notna(), None)
+        placeholders = ", ".join("?" * len(columns))
+        self._conn.executemany(f"INSERT INTO {table} VALUES ({placeholders})",
+                               frame.itertuples(index=False, name=None))
+        self._conn.commit()
+
+    def _interrupt(self, cur) -> None:
+        self._conn.interrupt()
+
+    @contextmanager
+    def _cursor(self):
+        with self._lock:
+            cur = self._conn.cursor()
+            try:
+                yield cur
+            finally:
+                cur.close()
+
+
+def make_local_backend(kind: str, **kwargs) -> _LocalBackend:
+    """"duckdb" or "sqlite" backend loaded with synthetic data."""
+    if kind == "duckdb":
+        return DuckDBBackend(**kwargs)
+    if kind == "sqlite":
+        return SQLiteBackend(**kwargs)
+    raise ValueError(f"Unknown local query backend {kind!r}")
@@ -0,0 +1,366 @@
+"""Local DuckDB copy of the recent rows of core.t1_bookings_all.
+
+Most questions only look at the last weeks of bookings. This cache keeps
+the rows whose ``window_column`` (booking_date) falls in the last
+``window_days`` days in a DuckDB file on local disk, and
+``execute_redshift_query`` answers a query here instead of on Redshift when
+it reads nothing but the cached table and bounds ``window_column`` from
+below inside the window::
+
+    SELECT booking_state, COUNT(*) FROM core.t1_bookings_all
+    WHERE booking_date >= CURRENT_DATE - INTERVAL '30 days' GROUP BY 1
+
+The first refresh loads the whole window. Later ones pull only the rows
+whose ``incremental_columns`` (sys_process_date, date_modified) are at or
+after the latest values already cached, replace them by ``key_column`` and
+drop the rows that left the window. Queries go back to Redshift whenever
+the last successful refresh is older than ``max_staleness`` seconds.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import sqlglot
+from sqlglot import exp
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.local_backend import _EXPLAIN, DuckDBBackend
+from lang_graph_poc.tools.redshift import QueryBackend, _is_select
+from lang_graph_poc.tools.schema_catalog import ColumnInfo, get_schema_catalog
+
+_STATE_TABLE = "_local_cache_state"
+_BATCH = "_local_cache_batch"
+# Casts that keep a lower bound a lower bound: booking_date::DATE >= d
+# holds exactly when booking_date >= d 00:00
+_BOUND_CASTS = (exp.DataType.Type.DATE, exp.DataType.Type.TIMESTAMP,
+                exp.DataType.Type.DATETIME)
+
+
+def _quote(name: str) -> str:
+    return exp.to_identifier(name, quoted=True).sql("duckdb")
+
+
+def _literal(value: Any) -> str:
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S")
+    return exp.Literal.string(str(value)).sql("redshift")
+
+
+def _conjuncts(node: exp.Expression):
+    if isinstance(node, exp.And):
+        yield from _conjuncts(node.left)
+        yield from _conjuncts(node.right)
+    elif isinstance(node, exp.Paren):
+        yield from _conjuncts(node.this)
+    else:
+        yield node
+
+
+def _table_name(table: exp.Table) -> str:
+    return f"{table.db}.{table.name}" if table.db else table.name
+
+
+class LocalTableCache(DuckDBBackend):
+    """A QueryBackend over a DuckDB file holding the recent window of one
+    table, kept up to date from ``source`` (the Redshift backend).
+
+    Use :meth:`covers` to decide whether a query can run here, :meth:`run`
+    / :meth:`arun` to run it, and :meth:`refresh` (or the thread started
+    by :meth:`start_refresh`) to pull new rows.
+    """
+    name = "local_cache"
+
+    def __init__(
+        self,
+        source: QueryBackend,
+        path: str = ":memory:",
+        table: str = "core.t1_bookings_all",
+        columns: Optional[Sequence[ColumnInfo]] = None,
+        key_column: str = "booking_id",
+        window_column: str = "booking_date",
+        incremental_columns: Sequence[str] = ("sys_process_date", "date_modified"),
+        window_days: int = 90,
+        max_staleness: float = 7200.0,
+        max_rows: int = 5000000,
+        batch_rows: int = 50000,
+        clock: Callable[[], float] = time.time,
+    ):
+        try:
+            import duckdb
+        except ImportError as e:
+            raise ImportError("The local cache needs the duckdb package "
+                              "(pip install duckdb)") from e
+        # No synthetic rows as in DuckDBBackend: the rows come from source
+        self._conn = duckdb.connect(path)
+        self.source = source
+        self.path = path
+        self.table = table
+        if columns is None:
+            columns = get_schema_catalog([table]).tables[table]
+        self.columns: List[ColumnInfo] = list(columns)
+        self.key_column = key_column
+        self.window_column = window_column
+        self.incremental_columns = list(incremental_columns)
+        self.window_days = window_days
+        self.max_staleness = max_staleness
+        self.max_rows = max_rows
+        self.batch_rows = batch_rows
+        self._clock = clock
+        self._refresh_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0,
+                       "rows_pulled": 0, "refresh_errors": 0}
+        self.last_error: Optional[str] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refresh_stop = threading.Event()
+        self._state = self._load_state()
+
+    # -- storage ------------------------------------------------------------
+
+    def _column_names(self) -> List[str]:
+        return [c["name"] for c in self.columns]
+
+    def _load_state(self) -> Optional[Dict[str, Any]]:
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {_STATE_TABLE} (table_name VARCHAR "
+            "PRIMARY KEY, window_start TIMESTAMP, watermarks VARCHAR, "
+            "columns VARCHAR, refreshed_at DOUBLE)")
+        row = self._conn.execute(
+            f"SELECT window_start, watermarks, columns, refreshed_at "
+            f"FROM {_STATE_TABLE} WHERE table_name = ?", [self.table]).fetchone()
+        if row is None or json.loads(row[2]) != self._column_names():
+            return None  # never loaded, or the table's columns changed
+        return {"window_start": row[0], "watermarks": json.loads(row[1]),
+                "refreshed_at": row[3]}
+
+    def _create_table(self, cur) -> None:
+        if "." in self.table:
+            cur.execute(f'CREATE SCHEMA IF NOT EXISTS "{self.table.split(".")[0]}"')
+        definition = ", ".join(f'{_quote(c["name"])} {c["type"]}'
+                               for c in self.columns)
+        cur.execute(f"DROP TABLE IF EXISTS {self.table}")
+        cur.execute(sqlglot.transpile(f"CREATE TABLE {self.table} ({definition})",
+                                      read="redshift", write="duckdb")[0])
+
+    # -- refresh ------------------------------------------------------------
+
+    def _window_start(self) -> datetime:
+        return datetime.combine(date.today() - timedelta(days=self.window_days),
+                                datetime.min.time())
+
+    def _pull_sql(self, window_start: datetime,
+                  watermarks: Optional[Dict[str, Any]]) -> str:
+        columns = ", ".join(f'"{name}"' for name in self._column_names())
+        where = f"{self.window_column} >= {_literal(window_start)}"
+        changed = [f"{column} >= {_literal(value)}"
+                   for column, value in (watermarks or {}).items()
+                   if value is not None]
+        if changed:
+            where += f" AND ({' OR '.join(changed)})"
+        return f"SELECT {columns} FROM {self.table} WHERE {where}"
+
+    def refresh(self) -> int:
+        """Pull new and changed rows from the source; returns how many.
+
+        Raises RuntimeError when the source query fails or the pull is over
+        ``max_rows`` (the window would be incomplete); the cache then keeps
+        its previous contents.
+        """
+        with self._refresh_lock:
+            window_start = self._window_start()
+            state = self._state
+            # Widening the window (or a first load) needs the whole window
+            full = state is None or state["window_start"] > window_start
+            sql = self._pull_sql(window_start,
+                                 None if full else state["watermarks"])
+            output = self.source.run(sql, True, self.max_rows + 1, 1 << 62)
+            if "data" not in output:
+                raise RuntimeError(f"Local cache pull failed: {output.get('error')}")
+            data = output["data"]
+            if output.get("truncated") or len(data) > self.max_rows:
+                raise RuntimeError(
+                    f"Over {self.max_rows} rows changed in {self.table}'s "
+                    f"{self.window_days}-day window; raise LOCAL_CACHE_MAX_ROWS "
+                    "or shorten LOCAL_CACHE_WINDOW_DAYS.")
+            watermarks = self._merge(data, window_start, full)
+            self._state = {"window_start": window_start, "watermarks": watermarks,
+                           "refreshed_at": self._clock()}
+            with self._stats_lock:
+                self._stats["refreshes"] += 1
+                self._stats["rows_pulled"] += len(data)
+            logging.info(f"Local cache: pulled {len(data)} rows of {self.table} "
+                         f"({'full' if full else 'incremental'}).")
+            return len(data)
+
+    def _merge(self, data, window_start: datetime, full: bool) -> Dict[str, Any]:
+        """Write pulled rows in one transaction, so queries running
+        meanwhile see the previous contents; returns the new watermarks."""
+        key = _quote(self.key_column)
+        cur = self._conn.cursor()
+        try:
+            cur.execute("BEGIN TRANSACTION")
+            if full:
+                self._create_table(cur)
+            for chunk in data.iter_chunks(self.batch_rows):
+                cur.register(_BATCH, chunk[self._column_names()])
+                if not full:
+                    cur.execute(f"DELETE FROM {self.table} WHERE {key} IN "
+                                f"(SELECT {key} FROM {_BATCH})")
+                cur.execute(f"INSERT INTO {self.table} BY NAME SELECT * FROM {_BATCH}")
+                cur.unregister(_BATCH)
+            cur.execute(f"DELETE FROM {self.table} WHERE "
+                        f"{_quote(self.window_column)} < ?", [window_start])
+            maxima = cur.execute("SELECT " + ", ".join(
+                f"MAX({_quote(c)})" for c in self.incremental_columns) +
+                f" FROM {self.table}").fetchone()
+            watermarks = {column: None if value is None else str(value)
+                          for column, value in zip(self.incremental_columns, maxima)}
+            cur.execute(f"INSERT OR REPLACE INTO {_STATE_TABLE} VALUES (?, ?, ?, ?, ?)",
+                        [self.table, window_start, json.dumps(watermarks),
+                         json.dumps(self._column_names()), self._clock()])
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        finally:
+            cur.close()
+        return watermarks
+
+    def start_refresh(self, interval: float) -> threading.Thread:
+        """Refresh now and every ``interval`` seconds in a daemon thread; a
+        no-op when the thread is already running."""
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return self._refresh_thread
+            self._refresh_stop.clear()
+
+            def run():
+                while True:
+                    try:
+                        self.refresh()
+                        self.last_error = None
+                    except Exception as e:
+                        logging.warning(f"Local cache refresh failed: {e}")
+                        self.last_error = str(e)
+                        with self._stats_lock:
+                            self._stats["refresh_errors"] += 1
+                    if interval <= 0 or self._refresh_stop.wait(interval):
+                        return
+
+            self._refresh_thread = threading.Thread(
+                target=run, name="local-cache-refresh", daemon=True)
+            self._refresh_thread.start()
+            return self._refresh_thread
+
+    def stop_refresh(self) -> None:
+        self._refresh_stop.set()
+
+    # -- routing ------------------------------------------------------------
+
+    def covers(self, query: str) -> bool:
+        """True when ``query`` (or the query it EXPLAINs) reads only the
+        cached table and every SELECT on it bounds ``window_column`` from
+        below within the cached window."""
+        covered = self._covers(query)
+        with self._stats_lock:
+            self._stats["hits" if covered else "misses"] += 1
+        return covered
+
+    def _covers(self, query: str) -> bool:
+        state = self._state
+        if state is None or self._clock() - state["refreshed_at"] > self.max_staleness:
+            return False
+        explain = _EXPLAIN.match(query)
+        if explain:
+            query = query[explain.end():]
+        if not _is_select(query):
+            return False
+        try:
+            tree = sqlglot.parse_one(query, read="redshift")
+        except sqlglot.errors.ParseError:
+            return False
+        ctes = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+        tables = [t for t in tree.find_all(exp.Table)
+                  if t.db or t.name not in ctes]
+        if not tables or any(_table_name(t) != self.table for t in tables):
+            return False
+        for select in tree.find_all(exp.Select):
+            sources = [t for t in tables if t.parent_select is select
+                       and isinstance(t.parent, (exp.From, exp.Join))]
+            if not sources:
+                continue
+            if len(sources) > 1:
+                return False  # self-joins would need a bound per alias
+            lower = self._lower_bound(select, sources[0])
+            if lower is None or lower < state["window_start"]:
+                return False
+        return True
+
+    def _is_window_column(self, node: exp.Expression, table: exp.Table) -> bool:
+        while isinstance(node, exp.Cast) and node.to.this in _BOUND_CASTS:
+            node = node.this
+        return (isinstance(node, exp.Column) and node.name == self.window_column
+                and node.table in ("", table.alias_or_name, table.name))
+
+    def _lower_bound(self, select: exp.Select,
+                     table: exp.Table) -> Optional[datetime]:
+        """The greatest lower bound the WHERE clause puts on
+        ``window_column``, evaluated by DuckDB; None when there is none."""
+        where = select.args.get("where")
+        if where is None:
+            return None
+        bounds = []
+        for condition in _conjuncts(where.this):
+            if isinstance(condition, exp.Between):
+                if self._is_window_column(condition.this, table):
+                    bounds.append(condition.args["low"])
+            elif isinstance(condition, (exp.GTE, exp.GT, exp.EQ)):
+                if self._is_window_column(condition.this, table):
+                    bounds.append(condition.expression)
+                elif isinstance(condition, exp.EQ) and \
+                        self._is_window_column(condition.expression, table):
+                    bounds.append(condition.this)
+            elif isinstance(condition, (exp.LTE, exp.LT)):
+                if self._is_window_column(condition.expression, table):
+                    bounds.append(condition.this)
+        values = [v for v in map(self._evaluate, bounds) if v is not None]
+        return max(values) if values else None
+
+    def _evaluate(self, bound: exp.Expression) -> Optional[datetime]:
+        if bound.find(exp.Column, exp.Select) is not None:
+            return None
+        sql = exp.select(exp.cast(bound.copy(), "TIMESTAMP")).sql("duckdb")
+        try:
+            with self._cursor() as cur:
+                value = cur.execute(sql).fetchone()[0]
+        except Exception:
+            return None
+        return value if isinstance(value, datetime) else None
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._state or {}
+        with self._stats_lock:
+            stats = dict(self._stats)
+        rows = 0
+        if state:
+            with self._cursor() as cur:
+                rows = cur.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {**stats, "rows": rows,
+                "window_start": str(state.get("window_start")),
+                "watermarks": state.get("watermarks"),
+                "age_seconds": (round(self._clock() - state["refreshed_at"])
+                                if state else None),
+                "last_error": self.last_error}
+
+
+def make_local_cache(source: QueryBackend) -> LocalTableCache:
+    """A LocalTableCache over ``source`` configured by Config.LOCAL_CACHE."""
+    config = Config.LOCAL_CACHE
+    return LocalTableCache(
+        source, path=config["path"], table=config["table"],
+        window_days=config["window_days"],
+        max_staleness=config["max_staleness"], max_rows=config["max_rows"])
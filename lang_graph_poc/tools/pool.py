@@ -0,0 +1,276 @@
+"""Thread-safe connection pool for Redshift (psycopg2) connections."""
+
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2 import errors, extensions
+
+_SETTING_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+class PoolError(Exception):
+    """Raised when the pool cannot hand out a connection."""
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection became available within the timeout."""
+
+
+class _PooledConnection:
+    """A raw connection plus the bookkeeping the pool needs."""
+
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class RedshiftConnectionPool:
+    """Bounded pool of session-configured connections.
+
+    Connections are created lazily up to ``maxconn``; ``minconn`` of them are
+    opened up front. On checkout a connection is recycled once it is older
+    than ``max_lifetime`` seconds and pinged with ``SELECT 1`` when it has
+    been idle longer than ``health_check_interval`` seconds. Session settings
+    (``statement_timeout``, ``query_group``, ...) are applied once, when the
+    connection is opened.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        minconn: int = 1,
+        maxconn: int = 10,
+        max_lifetime: float = 3600.0,
+        checkout_timeout: float = 30.0,
+        health_check_interval: float = 30.0,
+        session_settings: Optional[Dict[str, Any]] = None,
+    ):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(
+                f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+        for name in (session_settings or {}):
+            if not _SETTING_NAME.match(name):
+                raise ValueError(f"Invalid session setting name: {name}")
+
+        self._connect = connect
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.session_settings = dict(session_settings or {})
+
+        self._cond = threading.Condition()
+        self._idle: list[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._size = 0
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "created": 0,
+            "recycled": 0,
+            "discarded": 0,
+            "timeouts": 0,
+            "peak_in_use": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+        }
+
+    def prefill(self) -> None:
+        """Open connections until the pool holds ``minconn`` of them."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                entry = self._create()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                logging.warning(f"Could not prefill connection pool: {e}")
+                return
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+
+    def getconn(self, timeout: Optional[float] = None):
+        """Check a connection out of the pool, waiting up to ``timeout``."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        while True:
+            entry = None
+            with self._cond:
+                if self._closed:
+                    raise PoolError("Connection pool is closed.")
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No Redshift connection available after "
+                            f"{timeout:.1f}s (maxconn={self.maxconn}).")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if entry is None:
+                try:
+                    entry = self._create()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_usable(entry):
+                self._discard(entry)
+                continue
+
+            waited = time.monotonic() - start
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total"] += waited
+                self._stats["wait_time_max"] = max(
+                    self._stats["wait_time_max"], waited)
+                self._stats["peak_in_use"] = max(
+                    self._stats["peak_in_use"], len(self._in_use))
+            return entry.conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """Return a connection; broken or expired ones are closed instead."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            logging.warning("Returned a connection that is not from this pool.")
+            _close_quietly(conn)
+            return
+
+        if discard or self._closed or conn.closed or self._is_expired(entry):
+            self._discard(entry)
+            return
+        try:
+            status = conn.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception as e:
+            logging.warning(f"Discarding connection that failed to reset: {e}")
+            self._discard(entry)
+            return
+
+        entry.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager that checks a connection out and returns it."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except errors.QueryCanceled:
+            # Statement timeout or user cancel: the connection is healthy
+            # and putconn rolls the aborted transaction back
+            self.putconn(conn)
+            raise
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self.putconn(conn, discard=True)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool size, utilisation and checkout wait times."""
+        with self._cond:
+            stats = dict(self._stats)
+            in_use = len(self._in_use)
+            stats.update({
+                "size": self._size,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+                "utilisation": in_use / self.maxconn,
+                "wait_time_avg": (
+                    stats["wait_time_total"] / stats["checkouts"]
+                    if stats["checkouts"] else 0.0
+                ),
+            })
+        return stats
+
+    def closeall(self) -> None:
+        """Close idle connections and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            _close_quietly(entry.conn)
+
+    def _create(self) -> _PooledConnection:
+        conn = self._connect()
+        try:
+            if self.session_settings:
+                with conn.cursor() as cur:
+                    for name, value in self.session_settings.items():
+                        cur.execute(f"SET {name} TO %s", (str(value),))
+                # SET is transactional; commit so it outlives this checkout.
+                conn.commit()
+        except Exception:
+            _close_quietly(conn)
+            raise
+        with self._cond:
+            self._stats["created"] += 1
+        return _PooledConnection(conn)
+
+    def _is_expired(self, entry: _PooledConnection) -> bool:
+        return (self.max_lifetime is not None and
+                time.monotonic() - entry.created_at > self.max_lifetime)
+
+    def _is_usable(self, entry: _PooledConnection) -> bool:
+        if entry.conn.closed:
+            return False
+        if self._is_expired(entry):
+            with self._cond:
+                self._stats["recycled"] += 1
+            return False
+        if time.monotonic() - entry.last_used > self.health_check_interval:
+            try:
+                with entry.conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                entry.conn.rollback()
+            except Exception as e:
+                logging.warning(f"Pooled connection failed health check: {e}")
+                return False
+        return True
+
+    def _discard(self, entry: _PooledConnection) -> None:
+        _close_quietly(entry.conn)
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+
+def _close_quietly(conn) -> None:
+    try:
+        conn.close()
+    except Exception:
+        pass
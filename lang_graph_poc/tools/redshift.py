@@ -1,14 +1,35 @@
+import asyncio
 import logging
 import operator
-from typing import TypedDict, Annotated, Literal
-import datetime
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, TypedDict, Annotated, Literal, Optional, Protocol
 
 import psycopg2
 from langchain_core.messages import ToolMessage, AnyMessage
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 from pydantic.v1 import BaseModel, Field
 import os
 
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.cache import QueryResultCache, normalize_sql
+from lang_graph_poc.tools.cancellation import (
+    cancelled_error, query_cancelled, track_query
+)
+from lang_graph_poc.tools.execution_policy import (
+    ExecutionPolicy, apply_execution_policy, classify_query, is_timeout_error,
+    timeout_error
+)
+from lang_graph_poc.tools.jobs import QueryJobExecutor
+from lang_graph_poc.tools.pool import RedshiftConnectionPool
+from lang_graph_poc.tools.result import (
+    ColumnarResult, ColumnarResultBuilder, estimate_rows_bytes
+)
+from lang_graph_poc.tools.result_store import new_result_builder
+
 logging.basicConfig(level=logging.INFO)
 
 
@@ -17,6 +38,12 @@ ALLOWED_TABLES = [
     "core.t1_bi_bookings"
 ]
 
+QUEUE_FULL_ERROR = "queue_full"
+_SELECT_QUERY = re.compile(r"^\s*(\(\s*)*(select|with)\b", re.IGNORECASE)
+# Moves once per daily ETL load; cached results older than it are stale
+ETL_WATERMARK_QUERY = "SELECT MAX(sys_process_date) FROM core.t1_bookings_all"
+
+
 def get_redshift_connection():
     """Get a connection to the Redshift database."""
     try:
@@ -34,60 +61,595 @@ def get_redshift_connection():
         raise
 
 
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> RedshiftConnectionPool:
+    """Return the process-wide Redshift connection pool, creating it once."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = RedshiftConnectionPool(
+                    connect=get_redshift_connection,
+                    session_settings=Config.REDSHIFT_SESSION_SETTINGS,
+                    **Config.REDSHIFT_POOL
+                )
+                pool.prefill()
+                _pool = pool
+    return _pool
+
+
+@contextmanager
+def redshift_connection():
+    """Borrow a pooled Redshift connection for the duration of the block."""
+    with get_connection_pool().connection() as conn:
+        yield conn
+
+
+def redshift_pool_stats() -> dict:
+    """Pool wait time and utilisation stats, empty if no pool exists yet."""
+    return _pool.stats() if _pool is not None else {}
+
+
+def cancel_backend(pid: int) -> bool:
+    """Cancel the statement running on backend ``pid``. Runs on its own
+    pooled connection; the one running the statement is busy."""
+    with redshift_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_cancel_backend(%s)", (pid,))
+            return bool(cur.fetchone()[0])
+
+
+def fetch_etl_watermark():
+    """Latest ``sys_process_date`` loaded into core.t1_bookings_all, as
+    seen by the active query backend."""
+    return get_query_backend().etl_watermark()
+
+
+class QueryBackend(Protocol):
+    """Where ``execute_redshift_query`` sends SQL once the cache misses.
+
+    ``run``/``arun`` return ``{"data": ColumnarResult, "truncated": bool}``
+    or ``{"error": str}``; SELECTs stop at ``max_rows``/``max_bytes``. A
+    query running longer than ``timeout_ms`` is cancelled and reported with
+    ``"error_type": "statement_timeout"``; one stopped through
+    ``cancellation.cancel_request`` with ``"error_type": "cancelled"``.
+    """
+    name: str
+
+    def run(self, query: str, stream: bool, max_rows: int, max_bytes: int,
+            timeout_ms: Optional[int] = None) -> dict:
+        ...
+
+    async def arun(self, query: str, stream: bool, max_rows: int,
+                   max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+        ...
+
+    def etl_watermark(self) -> Any:
+        ...
+
+
+class RedshiftBackend:
+    """The pooled Redshift connections (psycopg2 blocking, psycopg 3 async)."""
+    name = "redshift"
+
+    def run(self, query: str, stream: bool, max_rows: int, max_bytes: int,
+            timeout_ms: Optional[int] = None) -> dict:
+        return _run_redshift_query(query, stream, max_rows, max_bytes, timeout_ms)
+
+    async def arun(self, query: str, stream: bool, max_rows: int,
+                   max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+        return await _arun_redshift_query(query, stream, max_rows, max_bytes,
+                                          timeout_ms)
+
+    def etl_watermark(self) -> Any:
+        with redshift_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(ETL_WATERMARK_QUERY)
+                return cur.fetchone()[0]
+
+
+_query_backend: Optional[QueryBackend] = None
+
+
+def get_query_backend() -> QueryBackend:
+    """The process-wide query backend: Config.QUERY_BACKEND["kind"] unless
+    replaced with ``set_query_backend``."""
+    global _query_backend
+    if _query_backend is None:
+        with _pool_lock:
+            if _query_backend is None:
+                kind = Config.QUERY_BACKEND["kind"]
+                if kind == "redshift":
+                    _query_backend = RedshiftBackend()
+                else:
+                    from lang_graph_poc.tools.local_backend import make_local_backend
+                    _query_backend = make_local_backend(kind)
+    return _query_backend
+
+
+def set_query_backend(backend: Optional[QueryBackend]) -> None:
+    """Route queries to ``backend`` (None restores the configured one). Cached
+    results of the previous backend are dropped."""
+    global _query_backend
+    with _pool_lock:
+        _query_backend = backend
+    if _query_cache is not None:
+        _query_cache.invalidate()
+
+
+_query_cache = None
+
+
+def get_query_cache() -> QueryResultCache:
+    """Return the process-wide query result cache, creating it once."""
+    global _query_cache
+    if _query_cache is None:
+        with _pool_lock:
+            if _query_cache is None:
+                cache_config = Config.QUERY_CACHE
+                _query_cache = QueryResultCache(
+                    max_entries=cache_config["max_entries"],
+                    ttl=cache_config["ttl"],
+                    watermark_fn=fetch_etl_watermark,
+                    watermark_check_interval=cache_config[
+                        "watermark_check_interval"]
+                )
+    return _query_cache
+
+
+def query_cache_stats() -> dict:
+    """Hit/miss/eviction counters, empty if no cache exists yet."""
+    return _query_cache.stats() if _query_cache is not None else {}
+
+
+_local_cache = None
+# Set when the configured cache cannot be created (duckdb not installed)
+_local_cache_unavailable = False
+
+
+def _local_cache_wanted() -> bool:
+    return _local_cache is not None or (
+        Config.LOCAL_CACHE["enabled"] and not _local_cache_unavailable)
+
+
+def get_local_cache():
+    """The local DuckDB cache of recent bookings (see tools.local_cache),
+    created and its refresh thread started on first use; None unless
+    Config.LOCAL_CACHE is enabled or one was set with set_local_cache.
+    Without duckdb the cache is disabled and every query goes to Redshift."""
+    global _local_cache, _local_cache_unavailable
+    if _local_cache is None and _local_cache_wanted():
+        source = get_query_backend()
+        with _pool_lock:
+            if _local_cache is None and not _local_cache_unavailable:
+                from lang_graph_poc.tools.local_cache import make_local_cache
+                try:
+                    _local_cache = make_local_cache(source)
+                except ImportError as e:
+                    logging.error(f"Local cache disabled: {e}")
+                    _local_cache_unavailable = True
+                    return None
+                _local_cache.start_refresh(Config.LOCAL_CACHE["refresh_interval"])
+    return _local_cache
+
+
+def set_local_cache(cache) -> None:
+    """Answer eligible queries from ``cache`` (None: the configured one)."""
+    global _local_cache
+    with _pool_lock:
+        _local_cache = cache
+    if _query_cache is not None:
+        _query_cache.invalidate()
+
+
+def local_cache_stats() -> dict:
+    """Local cache size, window and hit counters, empty if there is none."""
+    return _local_cache.stats() if _local_cache is not None else {}
+
+
+def _run_on_local_cache(query: str, stream: bool, max_rows: int, max_bytes: int,
+                        timeout_ms: Optional[int]) -> Optional[dict]:
+    """Output of ``query`` on the local cache, or None when the cache does
+    not cover it (or failed on it) and Redshift should run it."""
+    local = get_local_cache()
+    if local is None or not local.covers(query):
+        return None
+    output = local.run(query, stream, max_rows, max_bytes, timeout_ms)
+    if "error" in output and "error_type" not in output:
+        logging.warning(f"Local cache failed; running on Redshift: {output['error']}")
+        return None
+    logging.info("Answered from the local cache; skipping Redshift.")
+    return {**output, "local_cache": True}
+
+
+# Every allowed table's columns and types in one round trip
+TABLE_COLUMNS_QUERY = """
+    SELECT table_schema, table_name, column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema || '.' || table_name IN %s
+    ORDER BY table_schema, table_name, ordinal_position;
+"""
+
+
+def fetch_table_columns(conn, tables):
+    """{"schema.table": [(column, data_type), ...]} for ``tables``, read
+    with a single information_schema query. Tables that do not exist are
+    absent from the result."""
+    if conn is None:
+        with redshift_connection() as pooled_conn:
+            return fetch_table_columns(pooled_conn, tables)
+    tables = [t for t in tables if "." in t]
+    if not tables:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(TABLE_COLUMNS_QUERY, (tuple(tables),))
+        rows = cur.fetchall()
+    columns = {}
+    for schema_name, table_name, column_name, data_type in rows:
+        columns.setdefault(f"{schema_name}.{table_name}", []).append(
+            (column_name, data_type))
+    return columns
+
+
 def fetch_columns_for_allowed_tables(conn, allowed_tables):
-    schema_dict = {}
     for table in allowed_tables:
-        # Assuming table names are in 'schema.table_name' format
-        parts = table.split('.')
-        if len(parts) < 2:
+        if "." not in table:
             logging.warning(f"Invalid table format: {table}. Skipping.")
-            continue
-        
-        schema_name = parts[0]
-        table_name = '.'.join(parts[1:]) # Rejoin in case table name has dots
-
-        query = """
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_schema = %s AND table_name = %s
-            ORDER BY ordinal_position;
-        """
-        try:
-            with conn.cursor() as cur:
-                cur.execute(query, (schema_name, table_name))
-                columns = [row[0] for row in cur.fetchall()]
-                schema_dict[table] = columns
-        except Exception as e:
-            logging.error(f"Error fetching schema for {table}: {e}")
-            # Optionally, you could set an empty list or raise an error
-            schema_dict[table] = [] 
-    return schema_dict
-
-
-def execute_redshift_query(query: str) -> dict:
-    """Execute query and return results as a dictionary."""
-    conn = get_redshift_connection()
     try:
-        with conn.cursor() as cur:
-            cur.execute(query)
-            if cur.description:
-                columns = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                def serialize_value(val):
-                    if isinstance(val, (datetime.datetime, datetime.date)):
-                        return val.isoformat()
-                    return val
-                data = [
-                    {col: serialize_value(val) for col, val in zip(columns, row)}
-                    for row in rows
-                ]
-                return {"data": data}
-            return {"data": []}  # Return empty data list for no-result queries
+        columns = fetch_table_columns(conn, allowed_tables)
     except Exception as e:
+        logging.error(f"Error fetching schema for {allowed_tables}: {e}")
+        columns = {}
+    return {table: [name for name, _ in columns.get(table, [])]
+            for table in allowed_tables if "." in table}
+
+
+def _is_select(query: str) -> bool:
+    """Only SELECT/WITH statements are streamed (DECLARE ... CURSOR accepts
+    nothing else) or cached."""
+    return bool(_SELECT_QUERY.match(query))
+
+
+def _stream_rows(cur, max_rows: int, max_bytes: int,
+                 batch_size: int) -> ColumnarResult:
+    """Pull rows in fetchmany batches until the result or a cap runs out.
+
+    Each batch is folded into column arrays before the next one is fetched.
+    The byte cap is checked per batch, so the rows kept may overshoot
+    ``max_bytes`` by at most one batch.
+    """
+    builder = None
+    row_count = 0
+    total_bytes = 0
+    while row_count < max_rows and total_bytes < max_bytes:
+        batch = cur.fetchmany(min(batch_size, max_rows - row_count))
+        if builder is None:
+            # Named cursors only know their description after a fetch;
+            # results over the spill threshold go to disk (see result_store)
+            builder = new_result_builder(cur.description or [])
+        if not batch:
+            return builder.build()
+        builder.add_rows(batch)
+        row_count += len(batch)
+        total_bytes += estimate_rows_bytes(batch)
+    # A cap was hit; peek one row to tell a full result from a truncated one
+    truncated = bool(cur.fetchmany(1))
+    if builder is None:
+        builder = ColumnarResultBuilder(cur.description or [])
+    return builder.build(truncated=truncated)
+
+
+def execute_redshift_query(
+    query: str,
+    stream: Optional[bool] = None,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+) -> dict:
+    """Execute query and return results as a dictionary.
+
+    ``data`` is a ColumnarResult built directly from the cursor tuples. In
+    streaming mode SELECT results are read through a named (server-side)
+    cursor in ``fetchmany`` batches and reading stops at ``max_rows`` rows or
+    ``max_bytes`` bytes, in which case ``truncated`` is True and ``data``
+    holds the rows seen so far. SELECT results are served from the query
+    cache when possible (``cached`` is then True), and queries on recent
+    bookings from the local DuckDB cache (``local_cache`` is then True). Unset arguments default
+    to ``Config.REDSHIFT_FETCH`` and ``Config.QUERY_CACHE``.
+
+    The execution policy (Config.EXECUTION_POLICY) is applied first: the
+    SQL that ran, its class, timeout and any injected LIMIT are returned
+    under ``policy``, and a query cancelled by its timeout returns
+    ``"error_type": "statement_timeout"``.
+    """
+    fetch_config = Config.REDSHIFT_FETCH
+    stream = fetch_config["stream"] if stream is None else stream
+    max_rows = fetch_config["max_rows"] if max_rows is None else max_rows
+    max_bytes = fetch_config["max_bytes"] if max_bytes is None else max_bytes
+    if use_cache is None:
+        use_cache = Config.QUERY_CACHE["enabled"]
+    policy = apply_execution_policy(query)
+    query = policy.sql
+
+    cache_key = None
+    if use_cache and _is_select(query):
+        cache = get_query_cache()
+        # Caps are part of the key: a truncated result must not answer a
+        # request that allows more rows
+        cache_key = (normalize_sql(query), stream, max_rows, max_bytes)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logging.info("Query cache hit; skipping Redshift.")
+            return {"data": cached, "truncated": cached.truncated,
+                    "cached": True, "policy": _policy_report(policy)}
+
+    output = _run_on_local_cache(query, stream, max_rows, max_bytes,
+                                 policy.timeout_ms)
+    if output is None:
+        output = get_query_backend().run(query, stream, max_rows, max_bytes,
+                                         policy.timeout_ms)
+    if cache_key is not None and "data" in output:
+        cache.put(cache_key, output["data"])
+    return {**output, "policy": _policy_report(policy)}
+
+
+def _policy_report(policy: ExecutionPolicy) -> dict:
+    return {**policy.report(), "sql": policy.sql}
+
+
+def _set_timeout_sql(timeout_ms: int) -> str:
+    # SET takes no bind parameters; the value is an int
+    return f"SET LOCAL statement_timeout TO {int(timeout_ms)}"
+
+
+def _interrupted_output(error: Exception, query: str, elapsed: float,
+                        timeout_ms: Optional[int]) -> Optional[dict]:
+    """Structured output when ``error`` is ``query`` being cancelled by the
+    user or by its timeout."""
+    if query_cancelled():
+        # Same SQLSTATE as a timeout, but the user asked for it
+        return cancelled_error()
+    if not timeout_ms or not is_timeout_error(error, elapsed, timeout_ms):
+        return None
+    logging.warning(f"Query hit its {timeout_ms} ms statement timeout: {error}")
+    return timeout_error(timeout_ms, elapsed, classify_query(query))
+
+
+def _run_redshift_query(query: str, stream: bool, max_rows: int,
+                        max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+    fetch_config = Config.REDSHIFT_FETCH
+    started = time.perf_counter()
+    try:
+        with redshift_connection() as conn:
+            if stream and _is_select(query):
+                cursor = conn.cursor(name=f"nlq_{uuid.uuid4().hex}")
+            else:
+                cursor = conn.cursor()
+            if timeout_ms:
+                # Scoped to this query's transaction; the pool rolls it back
+                with conn.cursor() as cur:
+                    cur.execute(_set_timeout_sql(timeout_ms))
+            pid = conn.get_backend_pid()
+            with cursor as cur, track_query(lambda: cancel_backend(pid)):
+                cur.execute(query)
+                if cur.name:
+                    result = _stream_rows(
+                        cur, max_rows, max_bytes, fetch_config["batch_size"])
+                elif cur.description:
+                    result = ColumnarResult.from_cursor_rows(
+                        cur.description, cur.fetchall())
+                else:
+                    # No-result statements still return an (empty) result
+                    result = ColumnarResult.empty_result()
+                if result.truncated:
+                    logging.warning(
+                        f"Result truncated after {len(result)} rows "
+                        f"(max_rows={max_rows}, max_bytes={max_bytes})")
+                return {"data": result, "truncated": result.truncated}
+    except Exception as e:
+        interrupted = _interrupted_output(
+            e, query, time.perf_counter() - started, timeout_ms)
+        if interrupted is not None:
+            return interrupted
         logging.error(f"Query execution error: {e}")
         return {"error": str(e)}
+
+
+# Event loop -> its async pool; removed when the loop shuts down
+_async_pools = {}
+_async_pool_lock = threading.Lock()
+
+
+async def _configure_async_connection(conn) -> None:
+    from psycopg import sql
+
+    async with conn.cursor() as cur:
+        for name, value in Config.REDSHIFT_SESSION_SETTINGS.items():
+            # SET takes no bind parameters; compose the value client-side
+            await cur.execute(sql.SQL("SET {} TO {}").format(
+                sql.Identifier(name), sql.Literal(str(value))))
+    # SET is transactional; commit so it outlives this checkout.
+    await conn.commit()
+
+
+async def _close_with_loop(loop, pool):
+    """Async generator that closes ``pool`` when finalised. Left suspended,
+    it is finalised by the loop's shutdown (``loop.shutdown_asyncgens``,
+    which ``asyncio.run`` calls before closing the loop)."""
+    try:
+        yield
     finally:
-        conn.close()
+        with _async_pool_lock:
+            _async_pools.pop(loop, None)
+        await pool.close()
+
+
+async def get_async_connection_pool():
+    """Return the psycopg 3 async pool for the running event loop.
+
+    Async pools are bound to the loop that opened them, so one is created
+    per loop (normally one per process) and shared by every coroutine; it
+    is closed with its connections when the loop shuts down.
+    """
+    # psycopg 3 is only needed on the async path
+    from psycopg.conninfo import make_conninfo
+    from psycopg_pool import AsyncConnectionPool
+
+    loop = asyncio.get_running_loop()
+    with _async_pool_lock:
+        entry = _async_pools.get(loop)
+        if entry is not None:
+            return entry[0]
+        pool_config = Config.REDSHIFT_POOL
+        pool = AsyncConnectionPool(
+            make_conninfo(**{k: v for k, v in Config.REDSHIFT_CONFIG.items()
+                             if v is not None}),
+            min_size=pool_config["minconn"],
+            max_size=pool_config["maxconn"],
+            max_lifetime=pool_config["max_lifetime"],
+            timeout=pool_config["checkout_timeout"],
+            # Redshift has no use for psycopg's server-side prepared statements
+            kwargs={"prepare_threshold": None},
+            configure=_configure_async_connection,
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        closer = _close_with_loop(loop, pool)
+        _async_pools[loop] = (pool, closer)
+    await closer.asend(None)  # registers it with the loop's shutdown
+    await pool.open()
+    return pool
+
+
+async def _astream_rows(cur, max_rows: int, max_bytes: int,
+                        batch_size: int) -> ColumnarResult:
+    """Async twin of :func:`_stream_rows`."""
+    builder = None
+    row_count = 0
+    total_bytes = 0
+    while row_count < max_rows and total_bytes < max_bytes:
+        batch = await cur.fetchmany(min(batch_size, max_rows - row_count))
+        if builder is None:
+            builder = new_result_builder(cur.description or [])
+        if not batch:
+            return builder.build()
+        builder.add_rows(batch)
+        row_count += len(batch)
+        total_bytes += estimate_rows_bytes(batch)
+    truncated = bool(await cur.fetchmany(1))
+    if builder is None:
+        builder = ColumnarResultBuilder(cur.description or [])
+    return builder.build(truncated=truncated)
+
+
+async def aexecute_redshift_query(
+    query: str,
+    stream: Optional[bool] = None,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    use_cache: Optional[bool] = None,
+) -> dict:
+    """Non-blocking :func:`execute_redshift_query` on the psycopg 3 async
+    pool; returns the same dictionary and shares the same query cache."""
+    fetch_config = Config.REDSHIFT_FETCH
+    stream = fetch_config["stream"] if stream is None else stream
+    max_rows = fetch_config["max_rows"] if max_rows is None else max_rows
+    max_bytes = fetch_config["max_bytes"] if max_bytes is None else max_bytes
+    if use_cache is None:
+        use_cache = Config.QUERY_CACHE["enabled"]
+    policy = apply_execution_policy(query)
+    query = policy.sql
+
+    cache_key = None
+    if use_cache and _is_select(query):
+        cache = get_query_cache()
+        cache_key = (normalize_sql(query), stream, max_rows, max_bytes)
+        # A lookup may poll the ETL watermark over the blocking driver
+        cached = await asyncio.to_thread(cache.get, cache_key)
+        if cached is not None:
+            logging.info("Query cache hit; skipping Redshift.")
+            return {"data": cached, "truncated": cached.truncated,
+                    "cached": True, "policy": _policy_report(policy)}
+
+    output = None
+    if _local_cache_wanted():
+        # Routing and the local run are DuckDB calls; keep them off the loop
+        output = await asyncio.to_thread(_run_on_local_cache, query, stream,
+                                         max_rows, max_bytes, policy.timeout_ms)
+    if output is None:
+        output = await get_query_backend().arun(query, stream, max_rows,
+                                                max_bytes, policy.timeout_ms)
+    if cache_key is not None and "data" in output:
+        cache.put(cache_key, output["data"])
+    return {**output, "policy": _policy_report(policy)}
+
+
+async def _arun_redshift_query(query: str, stream: bool, max_rows: int,
+                               max_bytes: int, timeout_ms: Optional[int] = None) -> dict:
+    fetch_config = Config.REDSHIFT_FETCH
+    started = time.perf_counter()
+    try:
+        pool = await get_async_connection_pool()
+        async with pool.connection() as conn:
+            if stream and _is_select(query):
+                cursor = conn.cursor(name=f"nlq_{uuid.uuid4().hex}")
+            else:
+                cursor = conn.cursor()
+            if timeout_ms:
+                async with conn.cursor() as cur:
+                    await cur.execute(_set_timeout_sql(timeout_ms))
+            pid = conn.info.backend_pid
+            with track_query(lambda: cancel_backend(pid)):
+                async with cursor as cur:
+                    await cur.execute(query)
+                    if stream and _is_select(query):
+                        result = await _astream_rows(
+                            cur, max_rows, max_bytes, fetch_config["batch_size"])
+                    elif cur.description:
+                        result = ColumnarResult.from_cursor_rows(
+                            cur.description, await cur.fetchall())
+                    else:
+                        result = ColumnarResult.empty_result()
+                    if result.truncated:
+                        logging.warning(
+                            f"Result truncated after {len(result)} rows "
+                            f"(max_rows={max_rows}, max_bytes={max_bytes})")
+                    return {"data": result, "truncated": result.truncated}
+    except Exception as e:
+        interrupted = _interrupted_output(
+            e, query, time.perf_counter() - started, timeout_ms)
+        if interrupted is not None:
+            return interrupted
+        logging.error(f"Query execution error: {e}")
+        return {"error": str(e)}
+
+
+_job_executor = None
+
+
+def get_job_executor() -> QueryJobExecutor:
+    """Return the process-wide query job executor, creating it once."""
+    global _job_executor
+    if _job_executor is None:
+        with _pool_lock:
+            if _job_executor is None:
+                job_config = Config.JOB_QUEUE
+                _job_executor = QueryJobExecutor(
+                    execute_redshift_query,
+                    max_workers=job_config["max_workers"],
+                    max_queued=job_config["max_queued"],
+                    result_ttl=job_config["result_ttl"],
+                    max_results=job_config["max_results"]
+                )
+    return _job_executor
+
+
+def query_job_stats() -> dict:
+    """Job queue counters, empty if no executor exists yet."""
+    return _job_executor.stats() if _job_executor is not None else {}
 
 
 class SQLQuery(BaseModel):
@@ -95,12 +657,23 @@ class SQLQuery(BaseModel):
     query: str = Field(description="SQL query to execute")
 
 
-@tool(args_schema=SQLQuery)
-def execute_sql(query: str) -> dict:
+def _execute_sql(query: str) -> dict:
     """Execute SQL query on Redshift and return results."""
     return execute_redshift_query(query)
 
 
+async def _aexecute_sql(query: str) -> dict:
+    """Execute SQL query on Redshift and return results."""
+    return await aexecute_redshift_query(query)
+
+
+# ``await execute_sql.ainvoke(...)`` runs the coroutine, not a thread
+execute_sql = StructuredTool.from_function(
+    func=_execute_sql, coroutine=_aexecute_sql, name="execute_sql",
+    description="Execute SQL query on Redshift and return results.",
+    args_schema=SQLQuery)
+
+
 class AgentState(TypedDict):
     """State for the SQL agent workflow."""
     messages: Annotated[list[AnyMessage], operator.add]
@@ -0,0 +1,203 @@
+"""Columnar query results built straight from cursor tuples."""
+
+import json
+import logging
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Postgres/Redshift type OIDs (cursor.description type_code) -> column kind
+_TYPE_KINDS = {
+    16: "bool",
+    20: "int", 21: "int", 23: "int",
+    700: "float", 701: "float",
+    # NUMERIC stays exact (Decimal objects); only the digest reads it as float
+    1700: "decimal",
+    1082: "datetime", 1114: "datetime", 1184: "datetime",
+}
+
+
+_BYTE_ESTIMATE_SAMPLE_ROWS = 50
+
+
+def estimate_rows_bytes(rows) -> int:
+    """Rough in-memory size of a batch, extrapolated from its first rows."""
+    sample = rows[:_BYTE_ESTIMATE_SAMPLE_ROWS]
+    sample_bytes = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(val) for val in row)
+        for row in sample
+    )
+    return sample_bytes * len(rows) // max(len(sample), 1)
+
+
+def _type_code(array) -> Optional[int]:
+    """A type OID that _to_array maps back to ``array``'s kind."""
+    dtype = getattr(array, "dtype", None)
+    if dtype is None:
+        return None
+    if dtype == object:
+        first = next((v for v in array if v is not None), None)
+        return 1700 if isinstance(first, Decimal) else None
+    if pd.api.types.is_bool_dtype(dtype):
+        return 16
+    if pd.api.types.is_integer_dtype(dtype):
+        return 20
+    if pd.api.types.is_float_dtype(dtype):
+        return 701
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return 1114
+    return None
+
+
+def _to_array(values: List[Any], type_code: Optional[int]):
+    """Convert one column's values to a typed array, object as fallback."""
+    kind = _TYPE_KINDS.get(type_code)
+    try:
+        if kind == "int":
+            return pd.array(values, dtype="Int64")
+        if kind == "float":
+            return np.asarray(values, dtype="float64")
+        if kind == "bool":
+            return pd.array(values, dtype="boolean")
+        if kind == "datetime":
+            return pd.to_datetime(values).array
+        if kind == "decimal":
+            values = [v if v is None or isinstance(v, Decimal) else Decimal(str(v))
+                      for v in values]
+    except (TypeError, ValueError, OverflowError, ArithmeticError) as e:
+        logging.warning(f"Falling back to object column ({kind}): {e}")
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class ColumnarResultBuilder:
+    """Accumulates fetched batches column by column.
+
+    Each batch of row tuples is transposed as it arrives, so the row tuples
+    can be released before the next batch is fetched.
+    """
+
+    def __init__(self, description: Sequence[Sequence[Any]]):
+        self.columns = [desc[0] for desc in description]
+        self.type_codes = [desc[1] if len(desc) > 1 else None
+                           for desc in description]
+        # DB-API scale, for NUMERIC columns; None when unknown
+        self.scales = [desc[5] if len(desc) > 5 else None
+                       for desc in description]
+        self._values: List[List[Any]] = [[] for _ in self.columns]
+
+    def add_rows(self, rows: Iterable[Sequence[Any]]) -> None:
+        for values, column in zip(self._values, zip(*rows)):
+            values.extend(column)
+
+    def build(self, truncated: bool = False) -> "ColumnarResult":
+        arrays = []
+        for i, type_code in enumerate(self.type_codes):
+            arrays.append(_to_array(self._values[i], type_code))
+            self._values[i] = []
+        return ColumnarResult(self.columns, arrays, truncated=truncated)
+
+
+class ColumnarResult:
+    """A query result held once, as one typed array per column.
+
+    DataFrame, JSON and preview views are derived on demand; only the
+    DataFrame view is cached since it shares the column arrays.
+    """
+
+    def __init__(self, columns: List[str], arrays: List[Any],
+                 truncated: bool = False):
+        self.columns = list(columns)
+        self.arrays = list(arrays)
+        self.truncated = truncated
+        self._frame: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def from_cursor_rows(cls, description, rows, truncated: bool = False):
+        builder = ColumnarResultBuilder(description)
+        builder.add_rows(rows)
+        return builder.build(truncated=truncated)
+
+    @classmethod
+    def empty_result(cls) -> "ColumnarResult":
+        return cls([], [])
+
+    def __len__(self) -> int:
+        return len(self.arrays[0]) if self.arrays else 0
+
+    @property
+    def row_count(self) -> int:
+        return len(self)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        return {col: str(array.dtype)
+                for col, array in zip(self.columns, self.arrays)}
+
+    def column(self, name: str):
+        return self.arrays[self.columns.index(name)]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        if self._frame is None:
+            self._frame = pd.DataFrame(
+                dict(zip(self.columns, self.arrays)), copy=False)
+        return self._frame
+
+    def iter_chunks(self, rows: int) -> Iterator[pd.DataFrame]:
+        """DataFrame views of at most ``rows`` rows each (at least one,
+        possibly empty, chunk)."""
+        frame = self.to_dataframe()
+        yield frame.iloc[:rows]
+        for start in range(rows, len(frame), rows):
+            yield frame.iloc[start:start + rows]
+
+    def preview(self, n: int = 10) -> pd.DataFrame:
+        return self.to_dataframe().head(n)
+
+    def page(self, offset: int = 0, limit: int = 1000,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Rows ``offset`` to ``offset + limit`` of ``columns`` (default
+        all); same as SpilledResult.page."""
+        frame = self.to_dataframe()
+        if columns is not None:
+            frame = frame[list(columns)]
+        return frame.iloc[offset:offset + limit]
+
+    def to_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return json.loads(self.to_json(limit=limit))
+
+    def to_json(self, limit: Optional[int] = None) -> str:
+        frame = self.to_dataframe()
+        if limit is not None:
+            frame = frame.head(limit)
+        return frame.to_json(orient="records", date_format="iso")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serialisable form; :meth:`from_dict` restores the column
+        kinds (int, float, bool, datetime, decimal, object). Decimals are
+        written as strings, so they stay exact."""
+        return {
+            "columns": self.columns,
+            "type_codes": [_type_code(array) for array in self.arrays],
+            "rows": json.loads(self.to_dataframe().to_json(
+                orient="values", date_format="iso")) if self.columns else [],
+            "truncated": self.truncated,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, Any]) -> "ColumnarResult":
+        return cls.from_cursor_rows(
+            list(zip(payload["columns"], payload["type_codes"])),
+            payload["rows"], truncated=payload.get("truncated", False))
+
+    def __repr__(self) -> str:
+        return (f"ColumnarResult(rows={len(self)}, columns={self.columns}, "
+                f"truncated={self.truncated})")
@@ -0,0 +1,292 @@
+"""Large query results spilled to disk as Arrow IPC files.
+
+``new_result_builder`` replaces ColumnarResultBuilder while rows are
+fetched: rows are buffered in memory as usual, but once the buffer passes
+Config.RESULT_STORE["spill_bytes"] it is written out as an Arrow record
+batch, and so on until the result ends. ``build`` then returns a
+:class:`SpilledResult`, which memory-maps the file and reads only what is
+asked for: a page of rows, some columns, or chunks for the digest::
+
+    result.page(offset=2000, limit=1000, columns=["booking_id"])
+    export_result(result, "parquet")   # path of a download file
+
+Small results stay ColumnarResults. Arrow IPC is used rather than Parquet
+because it can be memory-mapped without decoding; Parquet (and CSV) are
+written on demand for downloads. pyarrow is only needed once a result
+spills.
+"""
+
+import json
+import logging
+import os
+import time
+import uuid
+import weakref
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.result import (
+    ColumnarResult, ColumnarResultBuilder, _to_array, _TYPE_KINDS,
+    estimate_rows_bytes
+)
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def cleanup_spill_dir(directory: str, max_age: float) -> int:
+    """Delete spill and export files older than ``max_age`` seconds (left
+    behind by earlier processes); returns how many were deleted."""
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.startswith("result_") and \
+                entry.stat().st_mtime < cutoff:
+            _remove(entry.path)
+            removed += 1
+    return removed
+
+
+class SpilledResult:
+    """A query result held in an Arrow IPC file and memory-mapped on read.
+
+    Offers the ColumnarResult views (``to_dataframe``, ``iter_chunks``,
+    ``preview``, ``to_records``, ...) plus :meth:`page`; only the record
+    batches a view touches are paged in. The file is deleted with the
+    object.
+    """
+
+    def __init__(self, path: str, truncated: bool = False):
+        pa = _pyarrow()
+        self.path = path
+        self.truncated = truncated
+        self._source = pa.memory_map(path, "r")
+        self._reader = pa.ipc.open_file(self._source)
+        self.schema = self._reader.schema
+        self.columns = list(self.schema.names)
+        self._batch_offsets = [0]
+        for i in range(self._reader.num_record_batches):
+            self._batch_offsets.append(
+                self._batch_offsets[-1] + self._reader.get_batch(i).num_rows)
+        self.nbytes = os.path.getsize(path)
+        self._finalizer = weakref.finalize(self, _remove, path)
+
+    def __len__(self) -> int:
+        return self._batch_offsets[-1]
+
+    @property
+    def row_count(self) -> int:
+        return len(self)
+
+    @property
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        frame = self._to_pandas(self.schema.empty_table())
+        return {col: str(dtype) for col, dtype in frame.dtypes.items()}
+
+    @staticmethod
+    def _to_pandas(table) -> pd.DataFrame:
+        # Same column dtypes as a ColumnarResult (nullable ints and bools)
+        pa = _pyarrow()
+        mapping = {pa.int64(): pd.Int64Dtype(), pa.bool_(): pd.BooleanDtype()}
+        return table.to_pandas(types_mapper=mapping.get)
+
+    def _table(self, start: int, stop: int,
+               columns: Optional[Sequence[str]] = None):
+        pa = _pyarrow()
+        batches = []
+        for i in range(self._reader.num_record_batches):
+            first, last = self._batch_offsets[i], self._batch_offsets[i + 1]
+            if last <= start or first >= stop:
+                continue
+            batch = self._reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(list(columns))
+            batches.append(batch.slice(max(start - first, 0),
+                                       min(stop, last) - max(start, first)))
+        schema = self.schema if columns is None else pa.schema(
+            [self.schema.field(c) for c in columns])
+        return pa.Table.from_batches(batches, schema=schema)
+
+    def page(self, offset: int = 0, limit: int = 1000,
+             columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Rows ``offset`` to ``offset + limit`` of ``columns`` (default
+        all), with a RangeIndex starting at ``offset``."""
+        frame = self._to_pandas(self._table(offset, offset + limit, columns))
+        frame.index = pd.RangeIndex(offset, offset + len(frame))
+        return frame
+
+    def column(self, name: str):
+        return self.to_dataframe([name])[name].array
+
+    def to_dataframe(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """The whole result (or ``columns`` of it) in memory."""
+        return self.page(0, len(self), columns)
+
+    def iter_chunks(self, rows: int) -> Iterator[pd.DataFrame]:
+        yield self.page(0, rows)
+        for start in range(rows, len(self), rows):
+            yield self.page(start, rows)
+
+    def preview(self, n: int = 10) -> pd.DataFrame:
+        return self.page(0, n)
+
+    def to_json(self, limit: Optional[int] = None) -> str:
+        return self.page(0, len(self) if limit is None else limit).to_json(
+            orient="records", date_format="iso")
+
+    def to_records(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        return json.loads(self.to_json(limit=limit))
+
+    def to_dict(self) -> Dict[str, Any]:
+        frame = self.to_dataframe()
+        return ColumnarResult(self.columns, [frame[c].array for c in self.columns],
+                              truncated=self.truncated).to_dict()
+
+    def iter_batches(self):
+        for i in range(self._reader.num_record_batches):
+            yield self._reader.get_batch(i)
+
+    def close(self) -> None:
+        """Unmap and delete the file."""
+        self._source.close()
+        self._finalizer()
+
+    def __repr__(self) -> str:
+        return (f"SpilledResult(rows={len(self)}, columns={self.columns}, "
+                f"bytes={self.nbytes}, truncated={self.truncated})")
+
+
+class SpillingResultBuilder(ColumnarResultBuilder):
+    """ColumnarResultBuilder that moves its rows to an Arrow IPC file in
+    record batches once they pass ``spill_bytes``."""
+
+    def __init__(self, description: Sequence[Sequence[Any]], spill_bytes: int,
+                 directory: str):
+        super().__init__(description)
+        self.spill_bytes = spill_bytes
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._buffered_bytes = 0
+        self._schema = None
+        self._sink = None
+        self._writer = None
+
+    def add_rows(self, rows) -> None:
+        super().add_rows(rows)
+        self._buffered_bytes += estimate_rows_bytes(rows)
+        if self._buffered_bytes >= self.spill_bytes:
+            self._spill()
+
+    def _arrow_column(self, i: int, values: List[Any]):
+        pa = _pyarrow()
+        kind = _TYPE_KINDS.get(self.type_codes[i])
+        if kind == "decimal" and self.scales[i] is not None:
+            return pa.array(_to_array(values, self.type_codes[i]),
+                            type=pa.decimal128(38, self.scales[i]))
+        if kind in (None, "decimal"):
+            # Untyped columns (text, decimals of unknown scale, ...) as text
+            return pa.array([None if v is None else str(v) for v in values],
+                            type=pa.string())
+        array = pa.array(_to_array(values, self.type_codes[i]), from_pandas=True)
+        if self._schema is not None:
+            array = array.cast(self._schema.field(i).type)
+        return array
+
+    def _spill(self) -> None:
+        pa = _pyarrow()
+        arrays = [self._arrow_column(i, values)
+                  for i, values in enumerate(self._values)]
+        if self._writer is None:
+            self._schema = pa.schema([
+                pa.field(name, pa.string() if pa.types.is_null(a.type) else a.type)
+                for name, a in zip(self.columns, arrays)])
+            arrays = [a.cast(f.type) for a, f in zip(arrays, self._schema)]
+            os.makedirs(self.directory, exist_ok=True)
+            self.path = os.path.join(self.directory,
+                                     f"result_{uuid.uuid4().hex}.arrow")
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, self._schema)
+            logging.info(f"Result over {self.spill_bytes} bytes; spilling to {self.path}")
+        self._writer.write_batch(pa.record_batch(arrays, schema=self._schema))
+        self._values = [[] for _ in self.columns]
+        self._buffered_bytes = 0
+
+    def build(self, truncated: bool = False):
+        if self._writer is None:
+            return super().build(truncated=truncated)
+        if any(self._values):
+            self._spill()
+        self._writer.close()
+        self._sink.close()
+        return SpilledResult(self.path, truncated=truncated)
+
+
+_cleaned_dirs = set()
+
+
+def new_result_builder(description: Sequence[Sequence[Any]]) -> ColumnarResultBuilder:
+    """The builder for a fetched result: spilling per Config.RESULT_STORE,
+    or in memory when disabled or pyarrow is missing."""
+    config = Config.RESULT_STORE
+    if not config["enabled"] or not description:
+        return ColumnarResultBuilder(description)
+    if _pyarrow() is None:
+        logging.warning("pyarrow is not installed; large results stay in memory.")
+        return ColumnarResultBuilder(description)
+    if config["dir"] not in _cleaned_dirs:
+        _cleaned_dirs.add(config["dir"])
+        cleanup_spill_dir(config["dir"], config["max_age"])
+    return SpillingResultBuilder(description, config["spill_bytes"], config["dir"])
+
+
+def export_result(result, fmt: str, directory: Optional[str] = None) -> str:
+    """Write ``result`` as a ``fmt`` ("csv" or "parquet") file and return
+    its path. Spilled results are copied batch by batch, so the whole
+    result is never in memory."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}; use {EXPORT_FORMATS}")
+    directory = directory or Config.RESULT_STORE["dir"]
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"result_{uuid.uuid4().hex}.{fmt}")
+    if not isinstance(result, SpilledResult):
+        frame = result.to_dataframe()
+        if fmt == "csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_parquet(path, index=False)
+        return path
+    pa = _pyarrow()
+    if fmt == "csv":
+        import pyarrow.csv
+        with pyarrow.csv.CSVWriter(path, result.schema) as writer:
+            for batch in result.iter_batches():
+                writer.write_batch(batch)
+    else:
+        import pyarrow.parquet
+        with pyarrow.parquet.ParquetWriter(path, result.schema) as writer:
+            for batch in result.iter_batches():
+                writer.write_table(pa.Table.from_batches([batch]))
+    return path
@@ -0,0 +1,240 @@
+"""Persistent catalog of the allowed tables' columns and data types.
+
+The catalog is loaded from disk (or, on a fresh checkout, parsed from the
+DDL files in ``lang_graph_poc/resources``) so that startup never waits on
+Redshift. A background thread then refreshes it with one
+``information_schema`` query; when the fingerprint of the result changes,
+the new catalog replaces the old one in memory and on disk::
+
+    catalog = get_schema_catalog()       # instant: disk or DDL
+    start_schema_refresh()               # Redshift, in the background
+    agent = SQLAgent(..., schema=catalog.columns())
+
+Build or refresh the file offline with
+``python -m lang_graph_poc.tools.schema_catalog [--ddl-only]``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypedDict
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from lang_graph_poc.config import Config
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                             "resources")
+DEFAULT_DDL_FILES = [os.path.join(RESOURCES_DIR, "t1_bookings_all.sql")]
+DEFAULT_CATALOG_PATH = os.path.join(RESOURCES_DIR, "schema_catalog.json")
+
+
+class ColumnInfo(TypedDict):
+    name: str
+    type: str
+
+
+def tables_fingerprint(tables: Dict[str, List[ColumnInfo]]) -> str:
+    canonical = json.dumps(tables, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SchemaCatalog:
+    """Columns (with data types) of each ``schema.table``."""
+
+    def __init__(self, tables: Dict[str, List[ColumnInfo]], source: str = "",
+                 fetched_at: Optional[str] = None):
+        self.tables = tables
+        self.source = source
+        self.fetched_at = fetched_at or datetime.now(timezone.utc).isoformat()
+        self.fingerprint = tables_fingerprint(tables)
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Sequence[Tuple[str, str]]],
+                     source: str = "") -> "SchemaCatalog":
+        return cls({table: [ColumnInfo(name=name, type=(data_type or "").lower())
+                            for name, data_type in cols]
+                    for table, cols in columns.items()}, source=source)
+
+    def columns(self) -> Dict[str, List[str]]:
+        """Column names per table: the ``schema`` SQLAgent expects."""
+        return {table: [c["name"] for c in cols]
+                for table, cols in self.tables.items()}
+
+    def types(self) -> Dict[str, Dict[str, str]]:
+        return {table: {c["name"]: c["type"] for c in cols}
+                for table, cols in self.tables.items()}
+
+    def __len__(self) -> int:
+        return len(self.tables)
+
+    def save(self, path: str) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": self.fingerprint, "source": self.source,
+                       "fetched_at": self.fetched_at, "tables": self.tables},
+                      f, indent=1)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SchemaCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        catalog = cls(payload["tables"], source=payload.get("source", ""),
+                      fetched_at=payload.get("fetched_at"))
+        if catalog.fingerprint != payload["fingerprint"]:
+            raise ValueError(f"Schema catalog {path} does not match its fingerprint")
+        return catalog
+
+
+def parse_ddl(text: str) -> Dict[str, List[Tuple[str, str]]]:
+    """{"schema.table": [(column, type), ...]} of the CREATE TABLE
+    statements in ``text`` (Redshift dialect)."""
+    columns = {}
+    for statement in sqlglot.parse(text, read="redshift"):
+        if not isinstance(statement, exp.Create) or statement.kind != "TABLE":
+            continue
+        table = statement.find(exp.Table)
+        name = ".".join(part for part in (table.db, table.name) if part)
+        columns[name] = [
+            (column.name, column.args["kind"].sql(dialect="redshift")
+             if column.args.get("kind") else "")
+            for column in statement.find_all(exp.ColumnDef)
+        ]
+    return columns
+
+
+def catalog_from_ddl(paths: Sequence[str] = DEFAULT_DDL_FILES,
+                     allowed_tables: Optional[Sequence[str]] = None) -> SchemaCatalog:
+    columns = {}
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                columns.update(parse_ddl(f.read()))
+        except (OSError, ParseError) as e:
+            logging.warning(f"Skipping schema DDL {path}: {e}")
+    if allowed_tables is not None:
+        columns = {t: cols for t, cols in columns.items() if t in allowed_tables}
+    return SchemaCatalog.from_columns(columns, source="ddl")
+
+
+def catalog_from_redshift(allowed_tables: Sequence[str], conn=None) -> SchemaCatalog:
+    from lang_graph_poc.tools.redshift import fetch_table_columns
+    return SchemaCatalog.from_columns(
+        fetch_table_columns(conn, allowed_tables), source="redshift")
+
+
+def _ddl_files() -> List[str]:
+    configured = Config.SCHEMA_CATALOG["ddl_files"]
+    return ([p.strip() for p in configured.split(",") if p.strip()]
+            if configured else DEFAULT_DDL_FILES)
+
+
+def _catalog_path() -> str:
+    return Config.SCHEMA_CATALOG["path"] or DEFAULT_CATALOG_PATH
+
+
+_catalog: Optional[SchemaCatalog] = None
+_catalog_lock = threading.Lock()
+_refresh_thread: Optional[threading.Thread] = None
+_refresh_stop = threading.Event()
+
+
+def get_schema_catalog(allowed_tables: Optional[Sequence[str]] = None,
+                       path: Optional[str] = None) -> SchemaCatalog:
+    """The current catalog, never querying Redshift: the in-memory copy,
+    else the persisted file, else the DDL files."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is not None:
+            return _catalog
+        path = path or _catalog_path()
+        catalog = None
+        if os.path.exists(path):
+            try:
+                catalog = SchemaCatalog.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable schema catalog: {e}")
+        if catalog is None:
+            catalog = catalog_from_ddl(_ddl_files(), allowed_tables)
+            logging.info(f"Bootstrapped schema catalog from DDL: {list(catalog.tables)}")
+        _catalog = catalog
+        return catalog
+
+
+def refresh_schema_catalog(allowed_tables: Sequence[str],
+                           path: Optional[str] = None,
+                           fetch: Optional[Callable[[Sequence[str]], SchemaCatalog]] = None
+                           ) -> bool:
+    """Re-read the catalog from Redshift; returns True when it changed.
+
+    Tables Redshift did not return (e.g. no permission) keep their last
+    known columns.
+    """
+    global _catalog
+    fresh = (fetch or catalog_from_redshift)(allowed_tables)
+    current = get_schema_catalog(allowed_tables, path)
+    tables = {**{t: cols for t, cols in current.tables.items()
+                 if t in allowed_tables}, **fresh.tables}
+    if tables_fingerprint(tables) == current.fingerprint:
+        return False
+    catalog = SchemaCatalog(tables, source=fresh.source)
+    with _catalog_lock:
+        _catalog = catalog
+    try:
+        catalog.save(path or _catalog_path())
+    except OSError as e:
+        logging.warning(f"Could not persist schema catalog: {e}")
+    logging.info(f"Schema catalog refreshed from {fresh.source}; "
+                 f"fingerprint {catalog.fingerprint[:12]}.")
+    return True
+
+
+def start_schema_refresh(allowed_tables: Sequence[str],
+                         interval: Optional[float] = None,
+                         path: Optional[str] = None,
+                         fetch: Optional[Callable[[Sequence[str]], SchemaCatalog]] = None
+                         ) -> threading.Thread:
+    """Refresh the catalog now and every ``interval`` seconds (default
+    Config.SCHEMA_CATALOG["refresh_interval"]) in a daemon thread; a no-op
+    when the thread is already running."""
+    global _refresh_thread
+    interval = (Config.SCHEMA_CATALOG["refresh_interval"] if interval is None
+                else interval)
+    with _catalog_lock:
+        if _refresh_thread is not None and _refresh_thread.is_alive():
+            return _refresh_thread
+        _refresh_stop.clear()
+
+        def run():
+            while True:
+                try:
+                    refresh_schema_catalog(allowed_tables, path, fetch)
+                except Exception as e:
+                    logging.warning(f"Schema catalog refresh failed: {e}")
+                if interval <= 0 or _refresh_stop.wait(interval):
+                    return
+
+        _refresh_thread = threading.Thread(
+            target=run, name="schema-catalog-refresh", daemon=True)
+        _refresh_thread.start()
+        return _refresh_thread
+
+
+def stop_schema_refresh() -> None:
+    _refresh_stop.set()
+
+
+if __name__ == "__main__":
+    import sys
+
+    from lang_graph_poc.tools.redshift import ALLOWED_TABLES
+    built = (catalog_from_ddl(_ddl_files(), ALLOWED_TABLES)
+             if "--ddl-only" in sys.argv else catalog_from_redshift(ALLOWED_TABLES))
+    built.save(_catalog_path())
+    print(f"Catalogued {len(built)} tables from {built.source} -> {_catalog_path()}")
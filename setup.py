@@ -9,8 +9,16 @@ setup(
         "langchain-openai>=0.0.5",
         "langgraph>=0.0.10",
         "psycopg2-binary>=2.9.9",
+        "psycopg[binary]>=3.1",
+        "psycopg-pool>=3.2",
         "pandas>=2.1.0",
+        "pyarrow>=14.0.0",
+        "sqlglot>=25.0.0",
+        "tiktoken",
         "python-dotenv>=1.0.0",
         "streamlit>=1.31.0",
     ],
+    extras_require={
+        "local": ["duckdb>=1.0.0"],
+    },
 )
\ No newline at end of file
@@ -1,16 +1,31 @@
 import os
+import queue
 import sys
 import logging
+import threading
+import time
+import uuid
 
 import streamlit as st
 
+from lang_graph_poc.llm.examples import get_example_index
 from lang_graph_poc.llm.openai import get_model
 from lang_graph_poc.tools.redshift import (
     execute_sql,
-    fetch_columns_for_allowed_tables,
-    get_redshift_connection
+    get_local_cache,
+    local_cache_stats,
+    query_cache_stats,
+    query_job_stats,
+    redshift_pool_stats
 )
+from lang_graph_poc.tools.result_store import EXPORT_FORMATS, export_result
+from lang_graph_poc.tools.schema_catalog import (
+    get_schema_catalog,
+    start_schema_refresh
+)
+from lang_graph_poc.agents.budget import CostBudget
 from lang_graph_poc.agents.sql_agent import SQLAgent
+from lang_graph_poc.config import Config
 
 # Give the tool the correct name for the agent to find
 execute_sql.name = "redshift_query"
@@ -44,18 +59,6 @@ SYSTEM_PROMPT_FILE = "lang_graph_poc/llm/system_prompt.txt"
 
 
 # --- Session State Initialization and Data Loading ---
-def load_examples_from_file(path):
-    try:
-        with open(path, "r") as f:
-            return f.read()
-    except Exception as e:
-        logger.error(f"Could not load examples from {path}: {e}")
-        return ""
-
-# When loading the system prompt:
-SYSTEM_PROMPT_FILE = "lang_graph_poc/llm/system_prompt.txt"
-SAMPLES_FILE = "lang_graph_poc/context_kb/t1_bookings_all_samples_nlq.sql"
-
 def load_system_prompt():
     base_prompt = ""
     try:
@@ -63,26 +66,143 @@ def load_system_prompt():
             base_prompt = f.read()
     except FileNotFoundError:
         st.error(f"System prompt file not found at {SYSTEM_PROMPT_FILE}")
-    # Append examples
-    examples = load_examples_from_file(SAMPLES_FILE)
-    if examples:
-        base_prompt += "\n\n# Additional Example Patterns:\n" + examples
+    # Examples are no longer appended wholesale; the agent retrieves the
+    # most similar ones per question from the example index.
     return base_prompt
 
+
 @st.cache_resource
-def get_redshift_schema():
-    """Fetches the Redshift schema for allowed tables."""
-    with st.spinner("Fetching Redshift schema..."):
+def get_nlq_example_index():
+    """Loads (or builds) the local index over the NLQ example banks."""
+    return get_example_index()
+
+
+def stream_in_background(stream):
+    """Yield the events of ``stream()`` (an agent stream) from a worker
+    thread, and None while waiting. The script thread stays free to update
+    the page, which is where Streamlit lets a Stop click interrupt this
+    run."""
+    events = queue.Queue()
+
+    def worker():
         try:
-            conn = get_redshift_connection()
-            schema = fetch_columns_for_allowed_tables(conn, ALLOWED_TABLES)
-            conn.close()  # Close connection after fetching schema
-            logger.info(f"Fetched schema: {schema}")
-            return schema
+            for event in stream():
+                events.put(event)
         except Exception as e:
-            logger.error(f"Error fetching Redshift schema: {e}")
-            st.error(f"Failed to fetch Redshift schema: {e}")
-            return {}
+            events.put(e)
+        finally:
+            events.put(StopIteration())
+
+    threading.Thread(target=worker, daemon=True).start()
+    while True:
+        try:
+            event = events.get(timeout=0.5)
+        except queue.Empty:
+            yield None
+            continue
+        if isinstance(event, StopIteration):
+            return
+        if isinstance(event, Exception):
+            raise event
+        yield event
+
+
+def show_events(events, status, summary_placeholder, started):
+    """Show agent stream events as they arrive; returns the final result."""
+    result = {}
+    streamed_summary = ""
+    for event in events:
+        if event is None:
+            # Touching the page lets a Stop click interrupt this run
+            status.update(label=f"Working... {time.monotonic() - started:.0f}s")
+        elif event["type"] == "progress":
+            status.update(label=event["message"])
+            status.write(event["message"])
+            if event.get("sql_query") and event["step"] == "executing":
+                status.code(event["sql_query"], language="sql")
+        elif event["type"] == "token":
+            streamed_summary += event["content"]
+            summary_placeholder.markdown(streamed_summary + "▌")
+        elif event["type"] == "result":
+            result = event["result"]
+    return result
+
+
+def wait_for_job(agent, job_id, status):
+    """Poll a question's query job until it finishes. No agent thread
+    waits on Redshift meanwhile, and touching the page lets a Stop click
+    interrupt this run."""
+    while True:
+        job = agent.job_status(job_id)
+        if job["state"] == "queued":
+            status.update(label=f"Query queued (position {job['queue_position']})...")
+        elif job["state"] == "running":
+            status.update(label=f"Query running for "
+                                f"{time.time() - job['started_at']:.0f}s...")
+        else:
+            return
+        time.sleep(0.5)
+
+
+def export_bytes(data, fmt):
+    """Contents of ``data`` as a ``fmt`` file, for a download button; None
+    when the file is over Config.RESULT_STORE["max_export_bytes"]. Only
+    the file's size is checked before it is read into memory."""
+    path = export_result(data, fmt)
+    try:
+        if os.path.getsize(path) > Config.RESULT_STORE["max_export_bytes"]:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(path)
+
+
+def show_result(data):
+    """One page of ``data`` plus CSV/Parquet downloads. Results spilled to
+    disk are memory-mapped, so only the page shown is read into memory."""
+    page_rows = Config.RESULT_STORE["page_rows"]
+    pages = max(1, -(-len(data) // page_rows))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page (of {pages}; {len(data):,} rows)",
+                               min_value=1, max_value=pages, value=1,
+                               key="result_page")
+    st.dataframe(data.page((page - 1) * page_rows, page_rows))
+    # Files are built on request, not on every rerun of the page
+    exports = st.session_state.setdefault("result_exports", {})
+    for column, fmt in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS):
+        if fmt not in exports:
+            if column.button(f"Prepare {fmt.upper()} download", key=f"export_{fmt}"):
+                exports[fmt] = export_bytes(data, fmt)
+                st.rerun()
+        elif exports[fmt] is None:
+            column.warning(f"The {fmt.upper()} file is too large to download; "
+                           "add filters or aggregation.")
+        else:
+            column.download_button(
+                f"Download {fmt.upper()}", data=exports[fmt],
+                file_name=f"result.{fmt}", key=f"download_{fmt}")
+
+
+def stop_active_request():
+    """Stop button: cancel the running question's Redshift queries."""
+    request_id = st.session_state.get("active_request_id")
+    st.session_state.active_request_id = None
+    if request_id and "sql_agent" in st.session_state:
+        st.session_state.sql_agent.cancel(request_id)
+        st.session_state.messages.append(
+            {"role": "assistant", "content": "Stopped. The query was cancelled."})
+
+
+def get_redshift_schema():
+    """Current schema catalog for allowed tables. Loaded from disk (or the
+    DDL files) without waiting on Redshift, which refreshes it in a
+    background thread."""
+    start_schema_refresh(list(ALLOWED_TABLES))
+    # Starts the local bookings cache's refresh thread when enabled
+    get_local_cache()
+    return get_schema_catalog(list(ALLOWED_TABLES))
 
 
 # Initialize session state variables if not already present
@@ -90,19 +210,35 @@ if "messages" not in st.session_state:
     st.session_state.messages = []
 if "system_prompt" not in st.session_state:
     st.session_state.system_prompt = load_system_prompt()
-if "schema" not in st.session_state:
-    st.session_state.schema = get_redshift_schema()
+catalog = get_redshift_schema()
+if st.session_state.get("schema_fingerprint") != catalog.fingerprint:
+    st.session_state.schema = catalog.columns()
+    st.session_state.schema_fingerprint = catalog.fingerprint
+    # A refreshed catalog re-creates the agent below with the new schema
+    st.session_state.pop("llm", None)
+    logger.info(f"Using schema catalog from {catalog.source}: "
+                f"{list(catalog.tables)}")
 
 # Initialize LLM and Agent only once, and if schema is available
 if "llm" not in st.session_state and st.session_state.schema:
     with st.spinner("Initializing LLM and Agent..."):
         try:
             st.session_state.llm = get_model()
+            # Cheaper model used once the session nears its spend limit
+            st.session_state.fallback_llm = (
+                get_model(Config.BUDGET["fallback_model"])
+                if Config.BUDGET["fallback_model"] else None)
+            # Kept across agent re-initialisation so the session limit holds
+            if "budget" not in st.session_state:
+                st.session_state.budget = CostBudget()
             st.session_state.sql_agent = SQLAgent(
                 model=st.session_state.llm,
                 tools=[execute_sql],
                 system_prompt=st.session_state.system_prompt,
-                schema=st.session_state.schema
+                schema=st.session_state.schema,
+                example_index=get_nlq_example_index(),
+                budget=st.session_state.budget,
+                fallback_model=st.session_state.fallback_llm
             )
             logger.info("LLM and SQL Agent initialized successfully.")
         except Exception as e:
@@ -130,7 +266,10 @@ with st.sidebar:
                     model=st.session_state.llm,
                     tools=[execute_sql],
                     system_prompt=st.session_state.system_prompt,
-                    schema=st.session_state.schema
+                    schema=st.session_state.schema,
+                    example_index=get_nlq_example_index(),
+                    budget=st.session_state.budget,
+                    fallback_model=st.session_state.fallback_llm
                 )
                 st.success("System prompt updated and agent re-initialized!")
                 logger.info("System prompt updated and agent re-initialized.")
@@ -140,6 +279,21 @@ with st.sidebar:
         else:
             st.warning("Agent not initialized yet. Prompt will apply on first agent init.")
 
+    with st.expander("Redshift Pool Stats"):
+        st.json(redshift_pool_stats())
+    with st.expander("Query Cache Stats"):
+        st.json(query_cache_stats())
+    if Config.JOB_QUEUE["enabled"]:
+        with st.expander("Query Job Stats"):
+            st.json(query_job_stats())
+    if Config.LOCAL_CACHE["enabled"]:
+        with st.expander("Local Cache Stats"):
+            st.json(local_cache_stats())
+    with st.expander("Schema Catalog"):
+        st.json({"source": catalog.source, "fetched_at": catalog.fetched_at,
+                 "fingerprint": catalog.fingerprint[:12],
+                 "tables": {t: len(c) for t, c in catalog.tables.items()}})
+
     st.write("--- Jarvin V1.0 ---")
 
 # Display chat messages from history
@@ -147,9 +301,19 @@ for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
+# A question the cost gate held for confirmation can be re-run; only the
+# SQL shown to the user skips the gate
+confirmed_prompt = confirmed_sql = None
+if st.session_state.get("pending_cost_confirmation"):
+    if st.button("Run the expensive query anyway"):
+        confirmed_prompt, confirmed_sql = st.session_state.pending_cost_confirmation
+        st.session_state.pending_cost_confirmation = None
+
 # Chat input
-if prompt := st.chat_input("What would you like to know?"):
+if prompt := (st.chat_input("What would you like to know?") or confirmed_prompt):
     st.session_state.messages.append({"role": "user", "content": prompt})
+    st.session_state.last_result = None
+    st.session_state.result_exports = {}
     with st.chat_message("user"):
         st.markdown(prompt)
 
@@ -159,68 +323,114 @@ if prompt := st.chat_input("What would you like to know?"):
         st.stop()
 
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            try:
-                # Call the agent's ask method with the user query
-                result = st.session_state.sql_agent.ask(prompt)
-                print("\n\n ====>>> ", result)
-                if result.get("usage"):
-                    st.info(
-                        f"Tokens used: {result['usage'].get('total_tokens', 0)} | "
-                        f"Cost: ${result.get('cost', 0.0):.4f}"
-                    )
-                # Initialize response variables
-                response_message = ""
-                summary = ""
-                final_content = None
-                # Determine what to display based on the agent's result
-                if result.get('action') == 'clarify':
-                    response_message = result.get(
-                        'error',  # Use error field for clarification messages
-                        "I need more information to process your request."
-                    )
-                    st.markdown(response_message)
-                elif result.get('success'):
-                    summary = result.get('summary', "Query Generated successfully.")
-                    st.markdown(summary)
-                    if result.get('data') is not None and not result['data'].empty:
-                        st.dataframe(result['data'])
-                        # Display other relevant metadata if available
-                        st.json({
-                            "SQL Query": result.get('sql_query'),
-                            "Reasoning": result.get('reasoning'),
-                            "Assumptions": result.get('metadata', {}).get('assumptions'),
-                            "Row Count": result.get('metadata', {}).get('row_count'),
-                            "Column Count": result.get('metadata', {}).get('column_count'),
-                            "Time Taken": (
-                                f"{result.get('metadata', {}).get('execution_time')}"
-                            )
-                        })
-                else:
-                    error_message = result.get('error', "An unknown error occurred.")
-                    st.error(f"Error: {error_message}")
-                    logger.error(f"Agent returned an error: {error_message}")
-                    response_message = error_message
-
-                # Add the final assistant response to chat history
-                # Prefer summary, then error, then reasoning, then fallback to a generic message
-                if result.get('summary'):
-                    final_content = result['summary']
-                elif result.get('error'):
-                    final_content = result['error']
-                elif result.get('reasoning'):
-                    final_content = result['reasoning']
-                elif result.get('sql_query'):
-                    final_content = f"Generated SQL: {result['sql_query']}"
-                else:
-                    final_content = "No response generated. Please try again or rephrase your query."
-
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": final_content
-                })
-            except Exception as e:
-                error_message = f"An error occurred during agent execution: {str(e)}"
-                st.error(error_message)
-                logger.error(error_message)
-                st.session_state.messages.append({"role": "assistant", "content": error_message})
\ No newline at end of file
+        status = st.status("Thinking...")
+        stop_placeholder = st.empty()
+        summary_placeholder = st.empty()
+        request_id = uuid.uuid4().hex
+        st.session_state.active_request_id = request_id
+        stop_placeholder.button("Stop", key=f"stop_{request_id}",
+                                on_click=stop_active_request)
+        started = time.monotonic()
+        agent = st.session_state.sql_agent
+        try:
+            # Stream the agent's progress and summary tokens as they arrive
+            result = show_events(stream_in_background(lambda: agent.stream(
+                prompt, confirmed_sql=(confirmed_sql if prompt == confirmed_prompt
+                                       else None),
+                request_id=request_id)), status, summary_placeholder, started)
+            # With the job queue the query runs in the background: poll it,
+            # then let the agent summarize (or fix and resubmit the SQL)
+            while result.get("action") == "job_submitted":
+                wait_for_job(agent, result["metadata"]["job_id"], status)
+                result = show_events(
+                    stream_in_background(
+                        lambda pending=result: agent.stream_resume(pending)),
+                    status, summary_placeholder, started)
+            st.session_state.active_request_id = None
+            stop_placeholder.empty()
+            status.update(label="Done", state="complete", expanded=False)
+            print("\n\n ====>>> ", result)
+            if result.get("usage"):
+                st.info(
+                    f"Tokens used: {result['usage'].get('total_tokens', 0)} | "
+                    f"Cost: ${result.get('cost', 0.0):.4f} | "
+                    f"Session cost: ${result.get('session_cost', 0.0):.4f}"
+                )
+            if result.get("metrics"):
+                with st.expander("Request Metrics"):
+                    st.json(result["metrics"])
+            # Initialize response variables
+            response_message = ""
+            summary = ""
+            final_content = None
+            # Determine what to display based on the agent's result
+            st.session_state.pending_cost_confirmation = None
+            if result.get('action') == 'cancelled':
+                st.warning(result.get('error'))
+            elif result.get('action') == 'confirm_cost':
+                st.warning(result.get('error'))
+                st.code(result.get('sql_query'), language="sql")
+                st.session_state.pending_cost_confirmation = (
+                    prompt, result.get('sql_query'))
+            elif result.get('action') == 'clarify':
+                response_message = result.get(
+                    'error',  # Use error field for clarification messages
+                    "I need more information to process your request."
+                )
+                st.markdown(response_message)
+            elif result.get('success'):
+                summary = result.get('summary', "Query Generated successfully.")
+                summary_placeholder.markdown(summary)
+                if result.get('metadata', {}).get('truncated'):
+                    st.warning("Result truncated at the configured row/size "
+                               "cap. Add filters or aggregation to see everything.")
+                if result.get('data') is not None and not result['data'].empty:
+                    # Shown below; kept across reruns so it can be paged
+                    st.session_state.last_result = result['data']
+                    # Display other relevant metadata if available
+                    st.json({
+                        "SQL Query": result.get('sql_query'),
+                        "Reasoning": result.get('reasoning'),
+                        "Assumptions": result.get('metadata', {}).get('assumptions'),
+                        "Row Count": result.get('metadata', {}).get('row_count'),
+                        "Column Count": result.get('metadata', {}).get('column_count'),
+                        "Time Taken": (
+                            f"{result.get('metadata', {}).get('execution_time')}"
+                        )
+                    })
+            else:
+                error_message = result.get('error', "An unknown error occurred.")
+                st.error(f"Error: {error_message}")
+                logger.error(f"Agent returned an error: {error_message}")
+                response_message = error_message
+
+            # Add the final assistant response to chat history
+            # Prefer summary, then error, then reasoning, then fallback to a generic message
+            if result.get('summary'):
+                final_content = result['summary']
+            elif result.get('error'):
+                final_content = result['error']
+            elif result.get('reasoning'):
+                final_content = result['reasoning']
+            elif result.get('sql_query'):
+                final_content = f"Generated SQL: {result['sql_query']}"
+            else:
+                final_content = "No response generated. Please try again or rephrase your query."
+
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": final_content
+            })
+        except Exception as e:
+            error_message = f"An error occurred during agent execution: {str(e)}"
+            st.session_state.active_request_id = None
+            stop_placeholder.empty()
+            status.update(label="Failed", state="error")
+            st.error(error_message)
+            logger.error(error_message)
+            st.session_state.messages.append({"role": "assistant", "content": error_message})
+
+# Latest result: paged from memory, or from disk when it was spilled
+if st.session_state.get("last_result") is not None:
+    with st.expander("Latest result", expanded=True):
+        show_result(st.session_state.last_result)
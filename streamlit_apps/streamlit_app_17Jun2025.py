@@ -34,7 +34,7 @@ def display_query_results(query_result: QueryResult, show_summary: bool = False)
     # Results Tab
     with tab1:
         if query_result.get('data') is not None:
-            df = query_result['data']
+            df = query_result['data'].to_dataframe()
             if not df.empty:
                 # Display data in a clean format
                 st.dataframe(
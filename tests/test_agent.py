@@ -1,25 +1,87 @@
-system_prompt = """You're a senior Redshift SQL expert. Use below domain knowledge to generate related SQL queries,
-Domain MetaData:
-1. For Booking related query prefer to refer and return from core.t1_bookings_all.
-2. For Product only related query prefer to refer and return based on core.t1_products_all
-3. For Customer related queries prefer and fetch result from core.t1_customers
-4. For Event Tracking Data related queries prefer to fetch and results from core.t1_bi_event_sessions, core.t2_bi_booking_sessions
-
-Follow these rules: 
-1. Always verify table/column names exist
-2. Use APPROXIMATE COUNT(DISTINCT) for large tables
-3. Never return raw data - always summarize, and give me the query used to answer in SQL format.
-4. Add LIMIT 10 if querying raw data"""
-
-agent = SQLAgent(
-    model=model,
-    tools=[execute_sql],
-    system_prompt=system_prompt
-)
-
-# Test simple query
-result = agent.graph.invoke({
-    "messages": [HumanMessage(content="How many Bookings are from Singapore, Australia and Indonesia in last 3 months")]
-})
-
-print(result['messages'][-1].content)
\ No newline at end of file
+"""End to end: SQLAgent with the scripted model against embedded DuckDB."""
+
+import asyncio
+
+import pytest
+
+from lang_graph_poc.agents.instrumentation import NullMetricsSink
+from lang_graph_poc.agents.sql_agent import SQLAgent
+from lang_graph_poc.llm.fake import ScriptedChatModel
+from lang_graph_poc.tools.redshift import execute_sql, set_query_backend
+from lang_graph_poc.tools.schema_catalog import catalog_from_ddl
+
+pytest.importorskip("duckdb")
+
+from lang_graph_poc.tools.local_backend import DuckDBBackend, synthetic_frame  # noqa: E402
+
+system_prompt = """You're a senior Redshift SQL expert.
+1. For Booking related query prefer to refer and return from core.t1_bookings_all."""
+
+QUESTION = "How many Bookings are from Singapore, Australia and Indonesia in last 3 months"
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return catalog_from_ddl()
+
+
+@pytest.fixture(scope="module")
+def backend(catalog):
+    backend = DuckDBBackend(tables=catalog.tables, rows=5000, seed=1)
+    set_query_backend(backend)
+    yield backend
+    set_query_backend(None)
+
+
+def make_agent(catalog, model):
+    execute_sql.name = "redshift_query"
+    return SQLAgent(model=model, tools=[execute_sql], system_prompt=system_prompt,
+                    schema=catalog.columns(), sql_cache=False,
+                    metrics_sink=NullMetricsSink())
+
+
+def test_synthetic_frame_follows_ddl(catalog):
+    columns = catalog.tables["core.t1_bookings_all"]
+    frame = synthetic_frame(columns, 1000, seed=3)
+
+    assert list(frame.columns) == [c["name"] for c in columns]
+    assert frame["booking_id"].is_unique
+    assert set(frame["booking_state"]) <= {"CONFIRMED", "FULFILLED", "PENDING",
+                                           "CANCELLED", "REJECTED"}
+    assert (frame["gross_total_sgd"] > 0).all()
+    assert frame.equals(synthetic_frame(columns, 1000, seed=3))
+
+
+def test_ask_answers_from_duckdb(catalog, backend):
+    model = ScriptedChatModel()
+    result = make_agent(catalog, model).ask(QUESTION)
+
+    assert result["success"]
+    assert "country_id" in result["sql_query"]
+    assert result["data"].columns == ["country_id", "bookings"]
+    assert 0 < sum(result["data"].column("bookings")) <= backend.rows
+    assert model.calls == 4  # understand, generate, verify, summarize
+
+
+def test_concurrent_aask(catalog, backend):
+    agent = make_agent(catalog, ScriptedChatModel(latency=0.01))
+
+    async def run():
+        return await asyncio.gather(*(agent.aask(q) for q in (
+            QUESTION, "GMV by day last month", "Top products by GMV")))
+
+    results = asyncio.run(run())
+
+    assert all(r["success"] for r in results)
+    assert [r["data"].columns[0] for r in results] == ["country_id", "day",
+                                                      "product_name"]
+
+
+def test_sql_error_reaches_error_handler(catalog, backend):
+    model = ScriptedChatModel(script={"generate_sql_query": {
+        "sql_query": "SELECT no_such_column FROM core.t1_bookings_all",
+        "reasoning": "", "missing_tables": [], "missing_columns": []}})
+    result = make_agent(catalog, model).ask(QUESTION)
+
+    assert not result["success"]
+    assert result["error"]
@@ -0,0 +1,77 @@
+import threading
+import time
+
+import pytest
+
+from lang_graph_poc.tools.cancellation import (
+    CANCELLED_ERROR, QueryCancelled, QueryRegistry, get_query_registry,
+    request_scope, track_query)
+from lang_graph_poc.tools.redshift import execute_sql, set_query_backend
+from tests.test_sql_agent import RESPONSES, FakeModel, make_agent
+
+SLOW_SQL = ("SELECT COUNT(*) AS n FROM core.t1_bookings_all a, "
+            "core.t1_bookings_all b, core.t1_bookings_all c "
+            "WHERE a.gross_total_sgd + b.gross_total_sgd > c.gross_total_sgd")
+
+
+def test_registry_cancels_running_and_refuses_later_queries():
+    registry = QueryRegistry(max_cancelled=2)
+    cancelled = []
+    handle = registry.register("r1", lambda: cancelled.append("q1"))
+
+    assert registry.cancel("r1") == 1
+    assert cancelled == ["q1"]
+    with pytest.raises(QueryCancelled):
+        registry.register("r1", lambda: None)
+    registry.unregister("r1", handle)
+    assert registry.stats() == {"requests": 0, "queries": 0,
+                                "cancelled_requests": 1}
+
+    registry.cancel("r2")
+    registry.cancel("r3")
+    assert not registry.is_cancelled("r1")  # oldest mark dropped
+
+
+def test_queries_outside_a_request_are_not_tracked():
+    with track_query(lambda: None):
+        assert get_query_registry().stats()["queries"] == 0
+    with request_scope("r-tracked"), track_query(lambda: None):
+        assert get_query_registry().stats()["queries"] == 1
+
+
+@pytest.fixture
+def duckdb_backend():
+    pytest.importorskip("duckdb")
+    from lang_graph_poc.tools.local_backend import DuckDBBackend
+    from lang_graph_poc.tools.schema_catalog import catalog_from_ddl
+
+    backend = DuckDBBackend(tables=catalog_from_ddl().tables, rows=5000, seed=1)
+    set_query_backend(backend)
+    yield backend
+    set_query_backend(None)
+
+
+def test_cancel_stops_the_running_query(duckdb_backend):
+    execute_sql.name = "redshift_query"
+    responses = {**RESPONSES, "generate a SQL query": {
+        **RESPONSES["generate a SQL query"], "sql_query": SLOW_SQL}}
+    agent = make_agent(FakeModel(responses), execute_sql, sql_cache=False)
+    results = []
+    worker = threading.Thread(target=lambda: results.append(
+        agent.ask("Pairs of bookings", request_id="slow-request")))
+    worker.start()
+    deadline = time.monotonic() + 10
+    while get_query_registry().stats()["queries"] == 0:
+        assert time.monotonic() < deadline, "the query never started"
+        time.sleep(0.01)
+    time.sleep(0.2)  # an interrupt before the statement starts is a no-op
+
+    started = time.monotonic()
+    assert agent.cancel("slow-request") == 1
+    worker.join(timeout=10)
+
+    assert time.monotonic() - started < 5
+    result = results[0]
+    assert result["action"] == "cancelled"
+    assert result["metadata"]["error_type"] == CANCELLED_ERROR
+    assert not get_query_registry().is_cancelled("slow-request")
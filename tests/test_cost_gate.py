@@ -0,0 +1,137 @@
+import pytest
+
+from lang_graph_poc.agents.cost_gate import evaluate_plan, parse_explain
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.execution_policy import add_limit
+from lang_graph_poc.tools.result import ColumnarResult
+from tests.test_sql_agent import SQL, FakeModel, FakeTool, make_agent
+
+CHEAP_PLAN = """XN Aggregate  (cost=1250.00..1250.00 rows=1 width=8)
+  ->  XN Seq Scan on t1_bookings_all  (cost=0.00..1000.00 rows=100000 width=8)"""
+CROSS_JOIN_PLAN = """XN Limit  (cost=1000000012250.00..1000000012250.00 rows=100 width=8)
+  ->  XN Nested Loop DS_BCAST_INNER  (cost=1000000000000.00..1000000012250.00 rows=900000000 width=8)
+        ->  XN Seq Scan on t1_bookings_all a  (cost=0.00..1000.00 rows=100000 width=8)"""
+WIDE_SCAN_PLAN = """XN Seq Scan on t1_bookings_all  (cost=0.00..50000.00 rows=5000000 width=120)"""
+
+
+def thresholds(**overrides):
+    return {**Config.COST_GATE, "max_cost": 1e9, "max_rows": 1000000,
+            "reject_nested_loop": True, "reject_broadcast": False,
+            "on_expensive": "confirm", "on_large_result": "limit",
+            "limit_rows": 1000, **overrides}
+
+
+def test_parse_explain_reads_root_estimates_and_risky_steps():
+    plan = parse_explain(CROSS_JOIN_PLAN)
+
+    assert plan["cost"] == pytest.approx(1000000012250.0)
+    assert plan["rows"] == 100
+    assert plan["max_step_rows"] == 900000000
+    assert plan["nested_loop"]
+    assert plan["broadcast"] == ["DS_BCAST_INNER"]
+
+    duckdb = parse_explain("│  HASH_GROUP_BY  │\n│   ~10 rows   │\n│  ~8,825 rows  │")
+    assert (duckdb["cost"], duckdb["rows"], duckdb["max_step_rows"]) == (None, 10, 8825)
+
+
+def test_evaluate_plan_actions():
+    assert evaluate_plan(parse_explain(CHEAP_PLAN), thresholds()) == ("allow", [])
+
+    action, reasons = evaluate_plan(parse_explain(CROSS_JOIN_PLAN), thresholds())
+    assert action == "confirm"
+    assert any("nested loop" in r for r in reasons)
+
+    assert evaluate_plan(parse_explain(WIDE_SCAN_PLAN), thresholds())[0] == "limit"
+    assert evaluate_plan(parse_explain(WIDE_SCAN_PLAN),
+                         thresholds(max_rows=0))[0] == "allow"
+
+
+def test_add_limit():
+    assert add_limit("SELECT a FROM t", 100) == "SELECT a FROM t LIMIT 100"
+    assert add_limit("SELECT a FROM t LIMIT 5", 100) == "SELECT a FROM t LIMIT 5"
+    assert add_limit("SELECT a FROM t UNION SELECT b FROM u", 100).endswith(
+        "AS limited LIMIT 100")
+    assert add_limit("DELETE FROM t", 100) is None
+
+
+class PlanTool(FakeTool):
+    """FakeTool that answers EXPLAIN with ``plan``."""
+
+    def __init__(self, plan):
+        super().__init__()
+        self.plan = plan
+
+    def invoke(self, args):
+        if args["query"].startswith("EXPLAIN "):
+            self.queries.append(args["query"])
+            return {"data": ColumnarResult.from_cursor_rows(
+                [("QUERY PLAN", 25)], [(line,) for line in self.plan.splitlines()])}
+        return super().invoke(args)
+
+
+def test_cheap_query_runs_unchanged():
+    tool = PlanTool(CHEAP_PLAN)
+    result = make_agent(FakeModel(), tool, sql_cache=False,
+                        cost_gate=thresholds()).ask("GMV last 30 days")
+
+    assert result["success"]
+    assert tool.queries == [f"EXPLAIN {SQL}", SQL]
+    assert result["metadata"]["cost_gate"]["action"] == "allow"
+
+
+def test_large_result_gets_a_limit():
+    tool = PlanTool(WIDE_SCAN_PLAN)
+    result = make_agent(FakeModel(), tool, sql_cache=False,
+                        cost_gate=thresholds()).ask("GMV last 30 days")
+
+    assert result["success"]
+    assert tool.queries[-1].endswith("LIMIT 1000")
+    assert result["metadata"]["unlimited_sql"] == SQL
+
+
+def test_expensive_query_waits_for_confirmation():
+    tool = PlanTool(CROSS_JOIN_PLAN)
+    agent = make_agent(FakeModel(), tool, sql_cache=False, cost_gate=thresholds())
+
+    held = agent.ask("GMV last 30 days")
+    assert not held["success"]
+    assert held["action"] == "confirm_cost"
+    assert tool.queries == [f"EXPLAIN {SQL}"]
+
+    confirmed = agent.ask("GMV last 30 days", confirmed_sql=held["sql_query"])
+    assert confirmed["success"]
+    assert tool.queries[-1] == SQL
+
+
+def test_confirmation_only_covers_the_sql_the_user_saw():
+    tool = PlanTool(CROSS_JOIN_PLAN)
+    agent = make_agent(FakeModel(), tool, sql_cache=False, cost_gate=thresholds())
+
+    # Regenerated SQL that differs from what was confirmed is held again
+    result = agent.ask("GMV last 30 days",
+                       confirmed_sql="SELECT COUNT(*) FROM core.t1_bookings_all")
+    assert result["action"] == "confirm_cost"
+    assert SQL not in tool.queries
+
+
+def test_gate_finds_the_tool_under_its_own_name(caplog):
+    tool = PlanTool(CROSS_JOIN_PLAN)
+    tool.name = "execute_sql"
+    result = make_agent(FakeModel(), tool, sql_cache=False,
+                        cost_gate=thresholds()).ask("GMV last 30 days")
+    assert result["action"] == "confirm_cost"
+
+    other = FakeTool()
+    other.name = "some_tool"
+    make_agent(FakeModel(), other, cost_gate=thresholds())
+    assert "queries are not gated" in caplog.text
+
+
+def test_blocked_query_never_runs_even_when_confirmed():
+    tool = PlanTool(CROSS_JOIN_PLAN)
+    result = make_agent(FakeModel(), tool, sql_cache=False,
+                        cost_gate=thresholds(on_expensive="block")
+                        ).ask("GMV last 30 days", confirmed_sql=SQL)
+
+    assert result["action"] == "blocked_cost"
+    assert SQL not in tool.queries
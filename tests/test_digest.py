@@ -0,0 +1,80 @@
+import datetime
+import json
+from decimal import Decimal
+
+from lang_graph_poc.tools.digest import digest_result, format_digest
+from lang_graph_poc.tools.result import ColumnarResult
+
+DESCRIPTION = [("booking_date", 1114), ("country_name", 1043),
+               ("gross_total_sgd", 701), ("item_quantity", 20)]
+
+
+def make_result(n):
+    start = datetime.datetime(2025, 1, 1)
+    rows = [(start + datetime.timedelta(days=i // 10),
+             ["Singapore", "Malaysia", "Thailand"][i % 3],
+             float(i),
+             None if i % 4 == 0 else 1)
+            for i in range(n)]
+    return ColumnarResult.from_cursor_rows(DESCRIPTION, rows)
+
+
+def test_small_results_are_included_verbatim():
+    digest = digest_result(make_result(3))
+
+    assert digest["row_count"] == 3
+    assert [row["country_name"] for row in digest["rows"]] == [
+        "Singapore", "Malaysia", "Thailand"]
+    assert "column_stats" not in digest
+
+
+def test_chunked_stats_match_a_single_pass():
+    result = make_result(1000)
+    one_pass = digest_result(result, chunk_rows=10_000)
+    chunked = digest_result(result, chunk_rows=64)
+
+    assert chunked["column_stats"] == one_pass["column_stats"]
+    stats = chunked["column_stats"]
+    assert stats["gross_total_sgd"]["mean"] == 499.5
+    assert stats["gross_total_sgd"]["max"] == 999
+    assert stats["item_quantity"]["nulls"] == 250
+    assert stats["country_name"]["top_values"]["Singapore"] == 334
+    assert stats["country_name"]["distinct"] == 3
+    assert stats["booking_date"]["max"] == "2025-04-10"
+    assert len(chunked["head_rows"]) == 5 and len(chunked["tail_rows"]) == 5
+    assert chunked["tail_rows"][-1]["gross_total_sgd"] == 999
+
+
+def test_time_series_trend():
+    trend = digest_result(make_result(1000))["time_series"]
+
+    assert trend["time_column"] == "booking_date"
+    assert trend["granularity"] == "month"
+    assert trend["trend"]["gross_total_sgd"]["direction"] == "up"
+
+
+def test_formatted_digest_size_does_not_grow_with_rows():
+    sizes = [len(format_digest(digest_result(make_result(n)), max_chars=4000))
+             for n in (100, 10_000, 100_000)]
+
+    assert max(sizes) <= 4000
+    assert max(sizes) - min(sizes) < 500
+
+
+def test_format_digest_trims_sample_rows_first():
+    digest = digest_result(make_result(1000))
+    text = format_digest(digest, max_chars=1500)
+
+    parsed = json.loads(text)
+    assert len(text) <= 1500
+    assert parsed["row_count"] == 1000
+    assert "tail_rows" not in parsed
+
+
+def test_numeric_columns_are_summarised_as_numbers():
+    rows = [(Decimal(i) / 4,) for i in range(100)]
+    result = ColumnarResult.from_cursor_rows([("gross_total_sgd", 1700)], rows)
+    stats = digest_result(result, chunk_rows=16)["column_stats"]
+
+    assert stats["gross_total_sgd"]["mean"] == 12.375
+    assert stats["gross_total_sgd"]["max"] == 24.75
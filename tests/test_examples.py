@@ -0,0 +1,67 @@
+from lang_graph_poc.llm import examples
+from lang_graph_poc.llm.examples import ExampleIndex, parse_examples
+
+COMMENT_BANK = """-- User: Show me top 5 products by revenue last month
+-- Intent: Product Performance
+-- SQL:
+SELECT product_name, SUM(gross_total_sgd) AS revenue
+FROM core.t1_bookings_all
+GROUP BY product_name;
+
+-- User: What is the total refund amount in SGD?
+-- Intent: Refund Analysis
+-- SQL:
+SELECT SUM(refund_amount_sgd) FROM core.t1_bookings_all;
+"""
+
+MARKDOWN_BANK = """## Samples
+
+### 2. KrisFlyer Miles Analysis
+
+**NLQ:** "What's the KrisFlyer miles burn rate by country?"
+```sql
+SELECT country_name, SUM(kf_miles_redeemed) FROM core.t2_bi_booking_sessions
+GROUP BY country_name;
+```
+"""
+
+
+def test_both_bank_formats_are_parsed():
+    parsed = parse_examples(COMMENT_BANK + "\n" + MARKDOWN_BANK, "bank.sql")
+
+    assert [ex["question"] for ex in parsed] == [
+        "Show me top 5 products by revenue last month",
+        "What is the total refund amount in SGD?",
+        "What's the KrisFlyer miles burn rate by country?",
+    ]
+    assert parsed[1]["sql"] == \
+        "SELECT SUM(refund_amount_sgd) FROM core.t1_bookings_all;"
+    assert parsed[2]["intent"] == "KrisFlyer Miles Analysis"
+
+
+def test_search_returns_most_similar_examples_first():
+    index = ExampleIndex(parse_examples(COMMENT_BANK + MARKDOWN_BANK))
+
+    top = index.top_examples("krisflyer miles redeemed per country", k=2)
+    assert top[0]["question"].startswith("What's the KrisFlyer")
+    assert index.top_examples("completely unrelated words", k=2) == []
+
+
+def test_index_is_persisted_and_rebuilt_when_a_bank_changes(tmp_path):
+    bank = tmp_path / "bank.sql"
+    bank.write_text(COMMENT_BANK)
+    index_path = tmp_path / "index.json"
+    examples._index = None
+
+    first = examples.get_example_index([str(bank)], str(index_path))
+    assert len(first) == 2 and index_path.exists()
+    assert ExampleIndex.load(str(index_path)).fingerprint == first.fingerprint
+
+    bank.write_text(COMMENT_BANK + MARKDOWN_BANK)
+    second = examples.get_example_index([str(bank)], str(index_path))
+    assert len(second) == 3
+    examples._index = None
+
+
+def test_default_banks_are_indexed():
+    assert len(ExampleIndex.build()) >= 30
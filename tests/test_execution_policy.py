@@ -0,0 +1,83 @@
+import pytest
+
+from lang_graph_poc.tools.execution_policy import (
+    TIMEOUT_ERROR, apply_execution_policy, classify_query, is_timeout_error,
+    timeout_error)
+from tests.test_sql_agent import SQL, FakeModel, FakeTool, RESPONSES, make_agent
+
+POLICY = {"detail_limit": 500,
+          "timeouts_ms": {"explain": 1000, "aggregate": 120000,
+                          "detail": 60000, "other": 60000}}
+DETAIL_SQL = "SELECT booking_id, gross_total_sgd FROM core.t1_bookings_all"
+
+
+def test_classify_query():
+    assert classify_query(SQL) == "aggregate"
+    assert classify_query("SELECT country_id, COUNT(*) FROM t GROUP BY 1") == "aggregate"
+    assert classify_query(DETAIL_SQL) == "detail"
+    assert classify_query("SELECT booking_id, SUM(gross_total_sgd) OVER () "
+                          "FROM t") == "detail"
+    assert classify_query(f"EXPLAIN {SQL}") == "explain"
+    assert classify_query("SET search_path TO core") == "other"
+
+
+def test_policy_caps_detail_queries_only():
+    detail = apply_execution_policy(DETAIL_SQL, POLICY)
+    assert detail.sql.endswith("LIMIT 500")
+    assert (detail.query_class, detail.limit, detail.timeout_ms) == ("detail", 500, 60000)
+
+    assert apply_execution_policy(f"{DETAIL_SQL} LIMIT 10", POLICY).limit is None
+    assert apply_execution_policy(f"{DETAIL_SQL} LIMIT 5000", POLICY).sql.endswith(
+        "LIMIT 500")
+
+    aggregate = apply_execution_policy(SQL, POLICY)
+    assert (aggregate.sql, aggregate.limit, aggregate.timeout_ms) == (SQL, None, 120000)
+
+
+class QueryCanceled(Exception):
+    pgcode = "57014"
+
+
+def test_is_timeout_error():
+    assert is_timeout_error(QueryCanceled("canceling statement due to statement timeout"))
+    # A cancel that arrives at the timeout is the timeout, earlier is the user
+    assert is_timeout_error(QueryCanceled("query cancelled"), 59.5, 60000)
+    assert not is_timeout_error(QueryCanceled("query cancelled"), 2.0, 60000)
+    assert not is_timeout_error(ValueError("column x does not exist"))
+
+
+def test_local_backend_interrupts_at_the_timeout():
+    pytest.importorskip("duckdb")
+    from lang_graph_poc.tools.local_backend import DuckDBBackend
+    from lang_graph_poc.tools.schema_catalog import catalog_from_ddl
+
+    backend = DuckDBBackend(tables=catalog_from_ddl().tables, rows=2000, seed=1)
+    output = backend.run(
+        "SELECT COUNT(*) FROM core.t1_bookings_all a, core.t1_bookings_all b, "
+        "core.t1_bookings_all c "
+        "WHERE a.gross_total_sgd + b.gross_total_sgd > c.gross_total_sgd",
+        False, 100, 1 << 20, timeout_ms=100)
+
+    assert output["error_type"] == TIMEOUT_ERROR
+    assert output["query_class"] == "aggregate"
+
+
+class TimeoutOnceTool(FakeTool):
+    def invoke(self, args):
+        if not self.queries:
+            self.queries.append(args["query"])
+            return timeout_error(120000, 120.0, "aggregate")
+        return super().invoke(args)
+
+
+def test_timeout_asks_for_a_narrower_query():
+    narrower = SQL.replace("30 days", "7 days")
+    model = FakeModel({**RESPONSES, "cancelled by its statement timeout":
+                       {"action": "retry_sql", "corrected_sql": narrower}})
+    tool = TimeoutOnceTool()
+
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    assert result["success"]
+    assert tool.queries == [SQL, narrower]
+    assert any("narrower date range" in p for p in model.prompts)
@@ -0,0 +1,61 @@
+import json
+
+from langchain_core.messages import AIMessage
+
+from lang_graph_poc.agents.instrumentation import (
+    JsonlMetricsSink, RequestTrace, current_span, node_span,
+    response_token_usage
+)
+
+
+def test_token_usage_from_usage_metadata_and_openai_metadata():
+    modern = AIMessage(content="", usage_metadata={
+        "input_tokens": 100, "output_tokens": 20, "total_tokens": 120,
+        "input_token_details": {"cache_read": 64}})
+    legacy = AIMessage(content="", response_metadata={"token_usage": {
+        "prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120,
+        "prompt_tokens_details": {"cached_tokens": 64}}})
+
+    expected = {"prompt_tokens": 100, "cached_prompt_tokens": 64,
+                "completion_tokens": 20, "total_tokens": 120}
+    assert response_token_usage(modern) == expected
+    assert response_token_usage(legacy) == expected
+
+
+def test_calls_inside_a_span_are_attributed_to_its_node():
+    trace = RequestTrace("question")
+    with node_span(trace, "generate_sql"):
+        span_trace, node = current_span()
+        span_trace.record_model_call(node, 0.5, AIMessage(
+            content="", usage_metadata={"input_tokens": 10, "output_tokens": 5,
+                                        "total_tokens": 15}))
+    with node_span(trace, "execute_sql"):
+        trace.record_db_call("execute_sql", 1.25)
+    assert current_span() is None
+
+    metrics = trace.to_dict()
+    assert metrics["nodes"]["generate_sql"]["llm_time_s"] == 0.5
+    assert metrics["nodes"]["execute_sql"]["db_time_s"] == 1.25
+    assert metrics["totals"]["total_tokens"] == 15
+    assert trace.usage()["prompt_tokens"] == 10
+
+
+def test_failed_node_is_counted_as_error():
+    trace = RequestTrace()
+    try:
+        with node_span(trace, "verify_sql"):
+            raise ValueError("boom")
+    except ValueError:
+        pass
+
+    assert trace.to_dict()["nodes"]["verify_sql"]["errors"] == 1
+
+
+def test_jsonl_sink_appends_one_line_per_record(tmp_path):
+    path = tmp_path / "metrics.jsonl"
+    sink = JsonlMetricsSink(str(path))
+    sink.emit({"request_id": "a"})
+    sink.emit({"request_id": "b"})
+
+    lines = path.read_text().splitlines()
+    assert [json.loads(line)["request_id"] for line in lines] == ["a", "b"]
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from lang_graph_poc.tools.cancellation import CANCELLED_ERROR
+from lang_graph_poc.tools.jobs import JobNotFound, JobQueueFull, QueryJobExecutor
+
+
+class BlockingQueries:
+    """run_query stand-in whose queries finish when released."""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = []
+
+    def __call__(self, query):
+        self.started.append(query)
+        self.release.wait(5)
+        if query == "bad":
+            raise ValueError("syntax error")
+        return {"data": query, "truncated": False}
+
+
+def wait_until_running(executor, job_id):
+    deadline = time.monotonic() + 5
+    while executor.status(job_id)["state"] != "running":
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def queries():
+    queries = BlockingQueries()
+    yield queries
+    queries.release.set()
+
+
+def test_submit_poll_and_result(queries):
+    executor = QueryJobExecutor(queries, max_workers=1, max_queued=2)
+    first = executor.submit("SELECT 1", request_id="r1")
+    second = executor.submit("SELECT 2", request_id="r1")
+    wait_until_running(executor, first)
+
+    assert executor.status(second)["state"] == "queued"
+    assert executor.status(second)["queue_position"] == 1
+    with pytest.raises(TimeoutError):
+        executor.result(first, timeout=0.05)
+
+    queries.release.set()
+    assert executor.result(first) == {"data": "SELECT 1", "truncated": False}
+    assert asyncio.run(executor.aresult(second))["data"] == "SELECT 2"
+    assert [j["state"] for j in executor.jobs("r1")] == ["succeeded", "succeeded"]
+    executor.shutdown()
+
+
+def test_failed_query_is_reported_not_raised(queries):
+    executor = QueryJobExecutor(queries, max_workers=1)
+    job_id = executor.submit("bad")
+    queries.release.set()
+
+    assert executor.result(job_id) == {"error": "syntax error"}
+    assert executor.status(job_id)["state"] == "failed"
+    executor.shutdown()
+
+
+def test_queue_is_bounded_and_queued_jobs_cancel(queries):
+    executor = QueryJobExecutor(queries, max_workers=1, max_queued=1)
+    executor.submit("SELECT 1")
+    queued = executor.submit("SELECT 2")
+    with pytest.raises(JobQueueFull):
+        executor.submit("SELECT 3")
+
+    assert executor.cancel(queued)
+    assert executor.result(queued)["error_type"] == CANCELLED_ERROR
+    assert executor.status(queued)["state"] == "cancelled"
+    last = executor.submit("SELECT 4")  # the cancelled job freed its slot
+    queries.release.set()
+    executor.result(last)
+    assert queries.started == ["SELECT 1", "SELECT 4"]
+    assert executor.stats()["rejected"] == 1
+    executor.shutdown()
+
+
+def test_finished_results_expire():
+    now = [0.0]
+    executor = QueryJobExecutor(lambda q: {"data": q}, max_workers=1,
+                                result_ttl=10, max_results=2,
+                                clock=lambda: now[0])
+    job_ids = [executor.submit(f"SELECT {i}") for i in range(3)]
+    for job_id in job_ids:
+        executor.result(job_id)
+    with pytest.raises(JobNotFound):  # over max_results
+        executor.status(job_ids[0])
+
+    now[0] = 11.0
+    with pytest.raises(JobNotFound):  # past the TTL
+        executor.status(job_ids[2])
+    executor.shutdown()
+
+
+def test_agent_submits_the_query_and_resumes_with_its_rows(queries):
+    from tests.test_sql_agent import SQL, FakeModel, FakeTool, make_agent
+
+    tool = FakeTool()
+    executor = QueryJobExecutor(
+        lambda query: queries(query) and tool.invoke({"query": query}))
+    agent = make_agent(FakeModel(), tool, sql_cache=False, job_executor=executor)
+
+    events = list(agent.stream("GMV last 30 days"))
+    pending = events[-1]["result"]
+    job_id = pending["metadata"]["job_id"]
+    assert pending["action"] == "job_submitted"
+    assert events[-2]["step"] == "job_submitted"
+    assert executor.status(job_id)["request_id"] == pending["metrics"]["request_id"]
+    assert agent.job_status(job_id)["state"] in ("queued", "running")
+
+    queries.release.set()
+    result = agent.resume(pending)
+    assert result["success"]
+    assert result["sql_query"] == SQL
+    assert result["metadata"]["job_id"] == job_id
+    assert len(result["data"]) == 1
+    assert tool.queries == [SQL]
+    executor.shutdown()
+
+
+def test_async_agent_awaits_the_query_not_a_job():
+    from tests.test_sql_agent import FakeModel, FakeTool, make_agent
+
+    def no_jobs(query):
+        raise AssertionError("aask must not submit a job")
+    executor = QueryJobExecutor(no_jobs)
+    agent = make_agent(FakeModel(), FakeTool(), sql_cache=False,
+                       job_executor=executor)
+
+    result = asyncio.run(agent.aask("GMV last 30 days"))
+    assert result["success"]
+    assert executor.stats()["submitted"] == 0
+    executor.shutdown()
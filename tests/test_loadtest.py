@@ -0,0 +1,37 @@
+import pytest
+
+from lang_graph_poc.llm.fake import ScriptedChatModel
+from lang_graph_poc.loadtest import bank_questions, latency_summary, run_load
+from tests.test_sql_agent import FakeTool, make_agent
+
+
+def test_latency_summary_percentiles():
+    summary = latency_summary([i / 100 for i in range(1, 101)])
+
+    assert summary["count"] == 100
+    assert summary["p50"] == pytest.approx(0.505)
+    assert summary["p99"] == pytest.approx(0.9901)
+    assert summary["max"] == 1.0
+    assert latency_summary([]) == {"count": 0}
+
+
+def test_bank_questions_filter_by_table():
+    examples = bank_questions(["core.t1_bookings_all"])
+
+    assert examples
+    assert all("t1_bookings_all" in e["sql"] for e in examples)
+
+
+@pytest.mark.parametrize("use_async", [True, False])
+def test_run_load_reports_per_node_and_end_to_end(use_async):
+    report = run_load(lambda: make_agent(ScriptedChatModel(), FakeTool(),
+                                         sql_cache=False),
+                      ["GMV last 30 days", "Bookings by country"],
+                      users=3, requests_per_user=2, use_async=use_async)
+
+    assert report["requests"] == 6 and report["failed"] == 0
+    assert report["latency_s"]["count"] == 6
+    assert report["node_latency_s"]["execute_sql"]["count"] == 6
+    assert report["tokens"]["total_tokens"] > 0
+    assert report["throughput_rps"] > 0
+    assert report["peak_rss_mb"] > 0
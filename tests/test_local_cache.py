@@ -0,0 +1,120 @@
+import pytest
+
+pytest.importorskip("duckdb")
+
+from lang_graph_poc.tools.local_backend import DuckDBBackend
+from lang_graph_poc.tools.local_cache import LocalTableCache
+from lang_graph_poc.tools.redshift import (
+    execute_redshift_query, set_local_cache, set_query_backend
+)
+from lang_graph_poc.tools.schema_catalog import catalog_from_ddl
+
+TABLE = "core.t1_bookings_all"
+RECENT = ("SELECT booking_state, COUNT(*) AS n, SUM(gross_total_sgd) AS gross "
+          "FROM core.t1_bookings_all "
+          "WHERE booking_date >= CURRENT_DATE - INTERVAL '30 days' "
+          "GROUP BY booking_state ORDER BY booking_state")
+
+
+@pytest.fixture
+def source():
+    return DuckDBBackend(tables=catalog_from_ddl().tables, rows=3000, seed=2,
+                         days=365)
+
+
+@pytest.fixture
+def cache(source):
+    cache = LocalTableCache(source, columns=source.tables[TABLE], window_days=90)
+    cache.refresh()
+    return cache
+
+
+def records(backend, sql):
+    output = backend.run(sql, False, 10000, 1 << 30)
+    return output["data"].to_records()
+
+
+@pytest.mark.parametrize("where", [
+    "booking_date >= CURRENT_DATE - INTERVAL '30 days'",
+    "booking_date::DATE BETWEEN DATEADD(day, -7, GETDATE()) AND GETDATE()",
+    "b.booking_date > '2999-01-01' AND b.booking_state = 'CONFIRMED'",
+    "CURRENT_DATE - 14 <= booking_date",
+])
+def test_covers_date_bounded_queries_inside_the_window(cache, where):
+    assert cache.covers(f"SELECT COUNT(*) FROM core.t1_bookings_all b WHERE {where}")
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT COUNT(*) FROM core.t1_bookings_all",
+    "SELECT COUNT(*) FROM core.t1_bookings_all WHERE booking_date >= '2000-01-01'",
+    "SELECT COUNT(*) FROM core.t1_bookings_all WHERE booking_date >= "
+    "CURRENT_DATE - 7 OR booking_state = 'CONFIRMED'",
+    "SELECT COUNT(*) FROM core.t1_bookings_all WHERE date_created >= CURRENT_DATE - 7",
+    "SELECT COUNT(*) FROM core.t1_bi_bookings WHERE booking_date >= CURRENT_DATE - 7",
+    "SELECT COUNT(*) FROM core.t1_bookings_all WHERE booking_date >= CURRENT_DATE - 7 "
+    "AND booking_id IN (SELECT booking_id FROM core.t1_bookings_all)",
+    "DELETE FROM core.t1_bookings_all WHERE booking_date >= CURRENT_DATE - 7",
+])
+def test_other_queries_go_to_redshift(cache, sql):
+    assert not cache.covers(sql)
+
+
+def test_answers_match_the_source_after_incremental_refreshes(source, cache):
+    assert records(cache, RECENT) == records(source, RECENT)
+    pulled = cache.stats()["rows_pulled"]
+
+    source._conn.execute(
+        "UPDATE core.t1_bookings_all SET booking_state = 'CANCELLED', "
+        "date_modified = (SELECT MAX(date_modified) FROM core.t1_bookings_all) "
+        "+ INTERVAL 1 DAY "
+        "WHERE booking_date >= CURRENT_DATE - INTERVAL 10 DAY")
+    source._conn.execute(
+        "INSERT INTO core.t1_bookings_all (booking_id, booking_date, "
+        "booking_state, gross_total_sgd, sys_process_date) VALUES "
+        "('NEW1', NOW(), 'CONFIRMED', 99.5, CURRENT_DATE + 2)")
+    changed = cache.refresh()
+
+    assert records(cache, RECENT) == records(source, RECENT)
+    assert changed < pulled  # only new and changed rows were pulled
+    cache.refresh()  # rows at the watermark come again; they are replaced
+    assert records(cache, RECENT) == records(source, RECENT)
+
+
+def test_stale_cache_falls_back(source):
+    now = [1000.0]
+    cache = LocalTableCache(source, columns=source.tables[TABLE],
+                            max_staleness=60, clock=lambda: now[0])
+    assert not cache.covers(RECENT)  # never loaded
+    cache.refresh()
+    assert cache.covers(RECENT)
+    now[0] += 61
+    assert not cache.covers(RECENT)
+
+
+def test_state_survives_a_restart(source, tmp_path):
+    path = str(tmp_path / "cache.duckdb")
+    first = LocalTableCache(source, path=path, columns=source.tables[TABLE])
+    first.refresh()
+    expected = records(first, RECENT)
+    first._conn.close()
+
+    again = LocalTableCache(source, path=path, columns=source.tables[TABLE])
+    assert again.covers(RECENT)
+    assert records(again, RECENT) == expected
+
+
+def test_execute_routes_covered_queries_to_the_local_cache(source, cache):
+    set_query_backend(source)
+    set_local_cache(cache)
+    try:
+        local = execute_redshift_query(RECENT, use_cache=False)
+        remote = execute_redshift_query(
+            "SELECT COUNT(*) AS n FROM core.t1_bookings_all", use_cache=False)
+    finally:
+        set_local_cache(None)
+        set_query_backend(None)
+
+    assert local["local_cache"]
+    assert local["data"].to_records() == records(source, RECENT)
+    assert "local_cache" not in remote
+    assert remote["data"].to_records() == [{"n": 3000}]
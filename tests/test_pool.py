@@ -0,0 +1,133 @@
+import threading
+import time
+
+import psycopg2
+import pytest
+from psycopg2 import errors, extensions
+
+from lang_graph_poc.tools.pool import PoolTimeoutError, RedshiftConnectionPool
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise RuntimeError("connection lost")
+        self.conn.executed.append((sql, params))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+def make_pool(**kwargs):
+    created = []
+
+    def connect():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return RedshiftConnectionPool(connect=connect, **kwargs), created
+
+
+def test_connections_are_reused_and_session_settings_applied_once():
+    pool, created = make_pool(
+        maxconn=2, session_settings={"query_group": "nlq_agent"})
+    for _ in range(5):
+        with pool.connection():
+            pass
+    assert len(created) == 1
+    assert created[0].executed == [("SET query_group TO %s", ("nlq_agent",))]
+    assert pool.stats()["checkouts"] == 5
+
+
+def test_checkout_times_out_when_exhausted():
+    pool, _ = make_pool(maxconn=1, checkout_timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn()
+    pool.putconn(conn)
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_waiter_gets_connection_when_one_is_returned():
+    pool, created = make_pool(maxconn=1)
+    conn = pool.getconn()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.getconn(1.0)))
+    waiter.start()
+    time.sleep(0.05)
+    pool.putconn(conn)
+    waiter.join()
+    assert got == [conn]
+    assert pool.stats()["wait_time_max"] > 0
+    assert pool.stats()["utilisation"] == 1.0
+
+
+def test_expired_and_unhealthy_connections_are_replaced():
+    pool, created = make_pool(max_lifetime=0.01, health_check_interval=0)
+    with pool.connection():
+        pass
+    time.sleep(0.02)
+    with pool.connection() as conn:
+        assert conn is created[1]
+    assert created[0].closed
+
+    pool.max_lifetime = None
+    created[1].broken = True
+    with pool.connection() as conn:
+        assert conn is created[2]
+    stats = pool.stats()
+    assert stats["recycled"] == 1
+    assert stats["discarded"] == 2
+    assert stats["size"] == 1
+
+
+def test_open_transactions_are_rolled_back_on_return():
+    pool, created = make_pool()
+    with pool.connection() as conn:
+        conn.status = extensions.TRANSACTION_STATUS_INTRANS
+    assert created[0].status == extensions.TRANSACTION_STATUS_IDLE
+
+
+def test_cancelled_queries_keep_their_connection_pooled():
+    pool, created = make_pool()
+    with pytest.raises(errors.QueryCanceled):
+        with pool.connection() as conn:
+            conn.status = extensions.TRANSACTION_STATUS_INERROR
+            raise errors.QueryCanceled("canceling statement due to user request")
+    with pytest.raises(psycopg2.OperationalError):
+        with pool.connection() as conn:
+            assert conn is created[0]
+            raise psycopg2.OperationalError("server closed the connection")
+
+    assert created[0].closed
+    assert pool.stats()["discarded"] == 1
@@ -0,0 +1,30 @@
+import pytest
+
+from lang_graph_poc.llm.openai import calculate_cost
+from lang_graph_poc.llm.pricing import PRICING, price_for, usage_cost
+
+
+def test_cached_and_output_tokens_use_their_own_rates():
+    usage = {"prompt_tokens": 1_000_000, "cached_prompt_tokens": 400_000,
+             "completion_tokens": 100_000}
+    price = PRICING["gpt-4o"]
+
+    expected = 0.6 * price.input + 0.4 * price.cached_input + 0.1 * price.output
+    assert usage_cost(usage, "gpt-4o") == pytest.approx(expected)
+    assert usage_cost(usage, "gpt-4o-mini") < usage_cost(usage, "gpt-4o")
+
+
+def test_dated_snapshots_use_the_base_model_price():
+    assert price_for("gpt-4o-mini-2024-07-18") == PRICING["gpt-4o-mini"]
+    assert price_for("gpt-4o-2024-08-06") == PRICING["gpt-4o"]
+
+
+def test_calculate_cost_reads_openai_token_usage():
+    token_usage = {"prompt_tokens": 2000, "completion_tokens": 500,
+                   "total_tokens": 2500,
+                   "prompt_tokens_details": {"cached_tokens": 1000}}
+
+    assert calculate_cost(token_usage, model="gpt-4o") == pytest.approx(
+        usage_cost({"prompt_tokens": 2000, "cached_prompt_tokens": 1000,
+                    "completion_tokens": 500}, "gpt-4o"))
+    assert calculate_cost(None) == 0.0
@@ -0,0 +1,68 @@
+from lang_graph_poc.llm.prompt_budget import PromptBuilder, TokenCounter
+
+
+def numbered(prefix):
+    return lambda kept: " ".join(f"{prefix}{i}" for i in kept)
+
+
+def make_prompt(max_tokens):
+    counter = TokenCounter("gpt-4o")
+    prompt = PromptBuilder(counter, max_tokens)
+    prompt.add("instructions", "Answer the question. " * 10, static=True)
+    prompt.add_items("rows", range(20), numbered("row"), trim_as="rows")
+    prompt.add_items("schema", range(20), numbered("column"), trim_as="columns",
+                     min_items=3)
+    prompt.add_items("examples", range(20), numbered("example"),
+                     trim_as="examples")
+    return prompt, counter
+
+
+def test_within_budget_nothing_is_trimmed():
+    build = make_prompt(10_000)[0].build()
+
+    assert build.trimmed == {}
+    assert set(build.segments) == {"instructions", "rows", "schema", "examples"}
+    assert build.total_tokens == sum(build.segments.values())
+
+
+def test_examples_go_first_then_columns_then_rows():
+    full = make_prompt(10_000)[0].build()
+    over = full.total_tokens - full.segments["examples"] // 2
+    build = make_prompt(over)[0].build()
+    assert set(build.trimmed) == {"examples"}
+    assert build.total_tokens <= over
+
+    without_examples = full.total_tokens - full.segments["examples"]
+    build = make_prompt(without_examples - 5)[0].build()
+    assert build.trimmed["examples"] == 20
+    assert set(build.trimmed) == {"examples", "schema"}
+    assert build.total_tokens <= without_examples - 5
+
+
+def test_columns_keep_their_minimum_and_rows_give_way():
+    build = make_prompt(1)[0].build()
+
+    assert build.trimmed["schema"] == 17  # min_items=3 kept
+    assert build.trimmed["rows"] == 20
+    assert build.total_tokens > 1  # instructions are never cut
+    assert "column2" in build.text and "column3" not in build.text
+
+
+def test_static_segments_are_counted_once():
+    prompt, counter = make_prompt(10_000)
+    prompt.build()
+    again = PromptBuilder(counter, 10_000)
+    again.add("instructions", "Answer the question. " * 10, static=True)
+    again.build()
+
+    assert counter.count_static.cache_info().hits >= 1
+
+
+def test_truncate_caps_long_error_text():
+    counter = TokenCounter("gpt-4o")
+    prompt = PromptBuilder(counter, 10_000)
+    prompt.add("error", "syntax error near SELECT " * 500, max_tokens=50)
+    build = prompt.build()
+
+    assert build.segments["error"] <= 50
+    assert build.text.endswith("[truncated]")
@@ -0,0 +1,261 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+
+import pytest
+
+from lang_graph_poc.tools import redshift
+from lang_graph_poc.tools.cache import QueryResultCache, normalize_sql
+
+
+@pytest.fixture(autouse=True)
+def no_shared_cache(monkeypatch):
+    monkeypatch.setitem(redshift.Config.QUERY_CACHE, "enabled", False)
+
+
+class FakeCursor:
+    def __init__(self, rows, columns, name=None):
+        self._rows = list(rows)
+        self._columns = columns
+        self.name = name
+        self.description = None
+        self.fetch_sizes = []
+
+    def execute(self, query):
+        self.query = query
+        if not self.name:
+            self.description = [(c,) for c in self._columns]
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        self.description = [(c,) for c in self._columns]
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeConnection:
+    def __init__(self, rows, columns=("booking_id", "gross_total_sgd"),
+                 cursor_class=FakeCursor):
+        self.rows = rows
+        self.columns = columns
+        self.cursor_class = cursor_class
+        self.cursors = []
+        self.info = type("ConnectionInfo", (), {"backend_pid": 4242})()
+
+    def get_backend_pid(self):
+        return self.info.backend_pid
+
+    def cursor(self, name=None):
+        cur = self.cursor_class(self.rows, self.columns, name=name)
+        self.cursors.append(cur)
+        return cur
+
+
+def use_connection(monkeypatch, conn):
+    @contextmanager
+    def fake_connection():
+        yield conn
+    monkeypatch.setattr(redshift, "redshift_connection", fake_connection)
+
+
+def test_streaming_uses_named_cursor_and_stops_at_row_cap(monkeypatch):
+    rows = [(f"PG{i}", float(i)) for i in range(10)]
+    conn = FakeConnection(rows)
+    use_connection(monkeypatch, conn)
+
+    result = redshift.execute_redshift_query(
+        "SELECT booking_id, gross_total_sgd FROM core.t1_bookings_all",
+        stream=True, max_rows=4)
+
+    assert conn.cursors[0].name
+    assert result["truncated"] is True
+    assert list(result["data"].column("booking_id")) == ["PG0", "PG1", "PG2", "PG3"]
+
+
+class FakeAsyncCursor(FakeCursor):
+    async def execute(self, query):
+        FakeCursor.execute(self, query)
+
+    async def fetchmany(self, size):
+        return FakeCursor.fetchmany(self, size)
+
+    async def fetchall(self):
+        return FakeCursor.fetchall(self)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncPool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    @asynccontextmanager
+    async def connection(self):
+        yield self.conn
+
+
+def test_async_streaming_uses_named_cursor_and_stops_at_row_cap(monkeypatch):
+    rows = [(f"PG{i}", float(i)) for i in range(10)]
+    conn = FakeConnection(rows, cursor_class=FakeAsyncCursor)
+
+    async def fake_pool():
+        return FakeAsyncPool(conn)
+    monkeypatch.setattr(redshift, "get_async_connection_pool", fake_pool)
+
+    result = asyncio.run(redshift.aexecute_redshift_query(
+        "SELECT booking_id, gross_total_sgd FROM core.t1_bookings_all",
+        stream=True, max_rows=4))
+
+    assert conn.cursors[0].name
+    assert result["truncated"] is True
+    assert list(result["data"].column("booking_id")) == ["PG0", "PG1", "PG2", "PG3"]
+
+
+def test_async_pool_is_closed_with_its_event_loop(monkeypatch):
+    psycopg_pool = pytest.importorskip("psycopg_pool")
+    pools = []
+
+    class RecordingPool:
+        check_connection = None
+
+        def __init__(self, *args, **kwargs):
+            self.closed = False
+            pools.append(self)
+
+        async def open(self):
+            pass
+
+        async def close(self):
+            self.closed = True
+
+    monkeypatch.setattr(psycopg_pool, "AsyncConnectionPool", RecordingPool)
+
+    async def get_twice():
+        pool = await redshift.get_async_connection_pool()
+        assert await redshift.get_async_connection_pool() is pool
+
+    asyncio.run(get_twice())
+    asyncio.run(get_twice())
+
+    assert len(pools) == 2
+    assert all(pool.closed for pool in pools)
+    assert redshift._async_pools == {}
+
+
+def test_streaming_reports_complete_result_at_exact_cap(monkeypatch):
+    conn = FakeConnection([("PG1", 1.0), ("PG2", 2.0)])
+    use_connection(monkeypatch, conn)
+
+    result = redshift.execute_redshift_query(
+        "select * from core.t1_bookings_all", stream=True, max_rows=2)
+
+    assert result["truncated"] is False
+    assert len(result["data"]) == 2
+
+
+def test_streaming_stops_at_byte_cap(monkeypatch):
+    rows = [("x" * 1000, float(i)) for i in range(50)]
+    conn = FakeConnection(rows)
+    use_connection(monkeypatch, conn)
+    monkeypatch.setitem(redshift.Config.REDSHIFT_FETCH, "batch_size", 5)
+
+    result = redshift.execute_redshift_query(
+        "SELECT * FROM core.t1_bookings_all", stream=True,
+        max_rows=1000, max_bytes=4000)
+
+    assert result["truncated"] is True
+    assert len(result["data"]) == 5
+
+
+def test_non_select_statements_do_not_use_named_cursor(monkeypatch):
+    conn = FakeConnection([("PG1", 1.0)])
+    use_connection(monkeypatch, conn)
+
+    redshift.execute_redshift_query("EXPLAIN SELECT 1", stream=True)
+
+    assert conn.cursors[0].name is None
+
+
+def test_local_cache_without_duckdb_falls_back_to_redshift(monkeypatch):
+    from lang_graph_poc.tools import local_cache
+
+    def no_duckdb(source):
+        raise ImportError("The local cache needs the duckdb package")
+    conn = FakeConnection([("PG1", 1.0)])
+    use_connection(monkeypatch, conn)
+    monkeypatch.setitem(redshift.Config.LOCAL_CACHE, "enabled", True)
+    monkeypatch.setattr(local_cache, "make_local_cache", no_duckdb)
+    monkeypatch.setattr(redshift, "_local_cache", None)
+    monkeypatch.setattr(redshift, "_local_cache_unavailable", False)
+
+    assert redshift.get_local_cache() is None
+    result = redshift.execute_redshift_query("SELECT * FROM core.t1_bookings_all")
+
+    assert "local_cache" not in result
+    assert list(result["data"].column("booking_id")) == ["PG1"]
+
+
+def test_select_results_are_served_from_cache(monkeypatch):
+    conn = FakeConnection([("PG1", 1.0)])
+    use_connection(monkeypatch, conn)
+    monkeypatch.setattr(redshift, "_query_cache", QueryResultCache())
+
+    first = redshift.execute_redshift_query(
+        "SELECT * FROM core.t1_bookings_all", use_cache=True)
+    second = redshift.execute_redshift_query(
+        "select *\n  from core.t1_bookings_all;", use_cache=True)
+
+    queries = [c.query for c in conn.cursors if not c.query.startswith("SET")]
+    assert len(queries) == 1
+    assert second["cached"] is True
+    assert second["data"] is first["data"]
+    assert redshift.query_cache_stats()["hits"] == 1
+
+
+def test_normalize_sql_keeps_string_literals():
+    assert normalize_sql("SELECT  *\nFROM t -- note\nWHERE id = 'PG1';") == \
+        "select * from t where id = 'PG1'"
+    assert normalize_sql("SELECT 1 WHERE id = 'PG1'") != \
+        normalize_sql("SELECT 1 WHERE id = 'pg1'")
+
+
+def test_cache_lru_ttl_and_watermark_invalidation():
+    now = [0.0]
+    watermark = ["2025-06-01"]
+    cache = QueryResultCache(
+        max_entries=2, ttl=10, watermark_fn=lambda: watermark[0],
+        watermark_check_interval=5, clock=lambda: now[0])
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+
+    now[0] = 11
+    assert cache.get("a") is None  # expired
+
+    cache.put("c", 3)
+    watermark[0] = "2025-06-02"
+    now[0] = 13
+    assert cache.get("c") == 3  # watermark not re-checked yet
+    now[0] = 17
+    assert cache.get("c") is None
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["expirations"] == 1
+    assert stats["invalidations"] == 1
+    assert stats["hits"] == 2
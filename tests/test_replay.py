@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+
+from lang_graph_poc.replay import (
+    Cassette, CassetteMiss, RecordingChatModel, RecordingQueryBackend,
+    ReplayChatModel, ReplayQueryBackend, use_cassette
+)
+from lang_graph_poc.tools import redshift
+from lang_graph_poc.tools.result import ColumnarResult
+
+from tests.test_sql_agent import SQL, FakeModel, FakeTool, make_agent
+
+
+class FakeBackend:
+    name = "fake"
+
+    def __init__(self):
+        self.queries = []
+
+    def run(self, query, stream, max_rows, max_bytes, timeout_ms=None):
+        self.queries.append(query)
+        time.sleep(0.02)
+        return {"data": ColumnarResult.from_cursor_rows(
+                    [("total_gmv", 701), ("day", 1082)],
+                    [(1234.5, "2024-05-01")]),
+                "truncated": False}
+
+    async def arun(self, query, stream, max_rows, max_bytes, timeout_ms=None):
+        return self.run(query, stream, max_rows, max_bytes)
+
+    def etl_watermark(self):
+        return None
+
+
+@pytest.fixture(autouse=True)
+def restore_backend(monkeypatch):
+    monkeypatch.setitem(redshift.Config.QUERY_CACHE, "enabled", False)
+    yield
+    redshift.set_query_backend(None)
+
+
+class BackendTool(FakeTool):
+    """The agent's tool, routed through execute_redshift_query."""
+
+    def invoke(self, args):
+        self.queries.append(args["query"])
+        return redshift.execute_redshift_query(args["query"])
+
+
+def test_replay_serves_recorded_calls_without_the_real_services(tmp_path):
+    path = str(tmp_path / "run.jsonl")
+    real_model, real_backend = FakeModel(), FakeBackend()
+    redshift.set_query_backend(RecordingQueryBackend(real_backend, Cassette(path)))
+    recorded = make_agent(RecordingChatModel(real_model, Cassette(path)),
+                          BackendTool(), sql_cache=False).ask("GMV last 30 days")
+
+    model, backend = use_cassette(None, "replay", path, latency=0)
+    replayed = make_agent(model, BackendTool(), sql_cache=False).ask(
+        "GMV last 30 days")
+
+    assert len(real_model.prompts) == 4 and real_backend.queries == [SQL]
+    assert replayed["summary"] == recorded["summary"]
+    assert replayed["sql_query"] == SQL
+    data = replayed["data"].to_dataframe()
+    assert data["total_gmv"].tolist() == [1234.5]
+    assert str(data["day"].dtype).startswith("datetime64")
+    assert replayed["usage"] == recorded["usage"]
+
+
+def test_replay_latency_is_recorded_time_scaled(tmp_path):
+    cassette = Cassette(str(tmp_path / "q.jsonl"))
+    RecordingQueryBackend(FakeBackend(), cassette).run(SQL, True, 10, 1000)
+    replay = ReplayQueryBackend(Cassette.load(cassette.path), latency_scale=0.0)
+
+    started = time.perf_counter()
+    replay.run(SQL, True, 10, 1000)
+    assert time.perf_counter() - started < 0.015
+
+    slow = ReplayQueryBackend(Cassette.load(cassette.path), latency=0.05)
+    started = time.perf_counter()
+    asyncio.run(slow.arun(SQL, True, 10, 1000))
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_unrecorded_prompt_is_a_cassette_miss(tmp_path):
+    path = tmp_path / "empty.jsonl"
+    path.write_text("")
+    model = ReplayChatModel(Cassette.load(str(path)))
+
+    with pytest.raises(CassetteMiss):
+        model.invoke([])
+
+
+def test_replayed_stream_yields_chunks_with_usage(tmp_path):
+    path = str(tmp_path / "stream.jsonl")
+    model = RecordingChatModel(FakeModel(), Cassette(path))
+    events = list(make_agent(model, FakeTool(), sql_cache=False).stream(
+        "GMV last 30 days"))
+    recorded = events[-1]["result"]
+
+    replay = ReplayChatModel(Cassette.load(path), latency=0)
+    events = list(make_agent(replay, FakeTool(), sql_cache=False).stream(
+        "GMV last 30 days"))
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+
+    assert "".join(tokens) == recorded["summary"]
+    assert events[-1]["result"]["summary"] == recorded["summary"]
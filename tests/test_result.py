@@ -0,0 +1,63 @@
+import datetime
+import json
+from decimal import Decimal
+
+from lang_graph_poc.tools.result import ColumnarResult, ColumnarResultBuilder
+
+DESCRIPTION = [
+    ("booking_id", 1043),
+    ("item_quantity", 20),
+    ("gross_total_sgd", 701),
+    ("is_guest_booking", 16),
+    ("booking_date", 1114),
+]
+
+
+def test_columns_are_typed_from_cursor_description():
+    rows = [
+        ("PG1", 2, 10.5, True, datetime.datetime(2025, 6, 1, 10, 30)),
+        ("PG2", None, None, None, None),
+    ]
+    result = ColumnarResult.from_cursor_rows(DESCRIPTION, rows)
+
+    assert len(result) == 2
+    assert result.dtypes["item_quantity"] == "Int64"
+    assert result.dtypes["gross_total_sgd"] == "float64"
+    assert result.dtypes["is_guest_booking"] == "boolean"
+    assert result.dtypes["booking_date"].startswith("datetime64")
+    assert result.dtypes["booking_id"] == "object"
+
+
+def test_views_are_derived_lazily_and_frame_is_cached():
+    builder = ColumnarResultBuilder(DESCRIPTION)
+    builder.add_rows([("PG1", 1, 1.0, False, datetime.datetime(2025, 1, 1))])
+    builder.add_rows([("PG2", 3, 2.5, True, datetime.datetime(2025, 1, 2))])
+    result = builder.build(truncated=True)
+
+    assert result._frame is None
+    frame = result.to_dataframe()
+    assert result.to_dataframe() is frame
+    assert list(frame["booking_id"]) == ["PG1", "PG2"]
+    records = json.loads(result.to_json(limit=1))
+    assert records == [{
+        "booking_id": "PG1", "item_quantity": 1, "gross_total_sgd": 1.0,
+        "is_guest_booking": False, "booking_date": "2025-01-01T00:00:00.000",
+    }]
+    assert result.truncated
+
+
+def test_unconvertible_values_fall_back_to_object_columns():
+    result = ColumnarResult.from_cursor_rows(
+        [("mixed", 20)], [("not a number",), (1,)])
+    assert result.dtypes["mixed"] == "object"
+    assert ColumnarResult.empty_result().empty
+
+
+def test_numeric_columns_stay_exact():
+    rows = [(Decimal("1234.10"),), (None,), (Decimal("0.10"),)]
+    result = ColumnarResult.from_cursor_rows([("gross_total_sgd", 1700)], rows)
+
+    assert result.dtypes["gross_total_sgd"] == "object"
+    assert list(result.column("gross_total_sgd")) == [r[0] for r in rows]
+    restored = ColumnarResult.from_dict(json.loads(json.dumps(result.to_dict())))
+    assert list(restored.column("gross_total_sgd")) == [r[0] for r in rows]
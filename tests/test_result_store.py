@@ -0,0 +1,104 @@
+import datetime
+import gc
+import os
+from decimal import Decimal
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from lang_graph_poc.tools.result import ColumnarResult
+from lang_graph_poc.tools.result_store import (
+    SpilledResult, SpillingResultBuilder, cleanup_spill_dir, export_result
+)
+from tests.test_result import DESCRIPTION
+
+
+def rows(start, stop):
+    return [(f"PG{i}", i % 3 or None, i / 2, i % 2 == 0,
+             datetime.datetime(2025, 1, 1) + datetime.timedelta(hours=i))
+            for i in range(start, stop)]
+
+
+def build(tmp_path, n, spill_bytes=2000):
+    builder = SpillingResultBuilder(DESCRIPTION, spill_bytes, str(tmp_path))
+    for start in range(0, n, 50):
+        builder.add_rows(rows(start, min(start + 50, n)))
+    return builder.build()
+
+
+def test_large_results_spill_and_page_from_disk(tmp_path):
+    result = build(tmp_path, 500)
+
+    assert isinstance(result, SpilledResult)
+    assert os.path.dirname(result.path) == str(tmp_path)
+    assert len(result) == 500
+    assert result.dtypes["item_quantity"] == "Int64"
+    assert result.dtypes["is_guest_booking"] == "boolean"
+    page = result.page(offset=120, limit=30, columns=["booking_id", "item_quantity"])
+    assert list(page.columns) == ["booking_id", "item_quantity"]
+    assert list(page.index) == list(range(120, 150))
+    assert page["booking_id"].iloc[0] == "PG120"
+    assert pd.isna(page["item_quantity"].iloc[0])
+    assert sum(len(chunk) for chunk in result.iter_chunks(64)) == 500
+    assert result.to_records(limit=1)[0]["booking_id"] == "PG0"
+
+
+def test_small_results_stay_in_memory(tmp_path):
+    result = build(tmp_path, 10, spill_bytes=10**9)
+
+    assert isinstance(result, ColumnarResult)
+    assert os.listdir(tmp_path) == []
+
+
+def test_spill_file_is_deleted_with_the_result(tmp_path):
+    result = build(tmp_path, 200)
+    path = result.path
+    result.close()
+    assert not os.path.exists(path)
+
+    result = build(tmp_path, 200)
+    path = result.path
+    del result
+    gc.collect()
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_export_streams_spilled_results(tmp_path, fmt):
+    result = build(tmp_path, 300)
+    path = export_result(result, fmt, directory=str(tmp_path / "exports"))
+
+    frame = pd.read_csv(path) if fmt == "csv" else pd.read_parquet(path)
+    assert len(frame) == 300
+    assert list(frame["booking_id"][:2]) == ["PG0", "PG1"]
+    with pytest.raises(ValueError):
+        export_result(result, "xlsx")
+
+
+def test_cleanup_removes_only_old_result_files(tmp_path):
+    old, other = tmp_path / "result_old.arrow", tmp_path / "notes.txt"
+    old.write_bytes(b"")
+    other.write_bytes(b"")
+    os.utime(old, (0, 0))
+    os.utime(other, (0, 0))
+    fresh = build(tmp_path, 200)
+
+    assert cleanup_spill_dir(str(tmp_path), max_age=3600) == 1
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        ["notes.txt", os.path.basename(fresh.path)])
+
+
+def test_numeric_columns_spill_as_exact_decimals(tmp_path):
+    description = [("gross_total_sgd", 1700, None, None, 18, 2, True),
+                   ("unscaled", 1700)]
+    builder = SpillingResultBuilder(description, 500, str(tmp_path))
+    builder.add_rows([(Decimal(f"{i}.10"), Decimal(f"0.{i}")) for i in range(100)])
+    result = builder.build()
+
+    assert isinstance(result, SpilledResult)
+    assert result.page(99, 1)["gross_total_sgd"].iloc[0] == Decimal("99.10")
+    assert result.page(99, 1)["unscaled"].iloc[0] == "0.99"  # kept as text
+    frame = pd.read_parquet(export_result(result, "parquet", str(tmp_path)))
+    assert frame["gross_total_sgd"].iloc[1] == Decimal("1.10")
@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+
+from lang_graph_poc.tools import redshift, schema_catalog
+from lang_graph_poc.tools.schema_catalog import (
+    SchemaCatalog, catalog_from_ddl, get_schema_catalog, parse_ddl,
+    refresh_schema_catalog, start_schema_refresh, stop_schema_refresh
+)
+
+TABLES = ["core.t1_bookings_all", "core.t1_bi_bookings"]
+
+
+@pytest.fixture(autouse=True)
+def fresh_catalog(monkeypatch, tmp_path):
+    monkeypatch.setattr(schema_catalog, "_catalog", None)
+    monkeypatch.setitem(schema_catalog.Config.SCHEMA_CATALOG, "path",
+                        str(tmp_path / "catalog.json"))
+    yield
+    stop_schema_refresh()
+
+
+def test_bookings_ddl_is_parsed_with_types():
+    catalog = catalog_from_ddl()
+    columns = catalog.types()["core.t1_bookings_all"]
+
+    assert len(columns) == 95
+    assert columns["booking_date"] == "timestamp"
+    assert columns["booking_gross_total"] == "double precision"
+    assert columns["iso_of_booking_isd"] == "char(2)"
+
+
+def test_first_load_bootstraps_from_ddl_without_redshift(monkeypatch):
+    def no_redshift(*args):
+        raise AssertionError("startup must not query Redshift")
+    monkeypatch.setattr(redshift, "fetch_table_columns", no_redshift)
+
+    catalog = get_schema_catalog(TABLES)
+
+    assert catalog.source == "ddl"
+    assert "gross_total_sgd" in catalog.columns()["core.t1_bookings_all"]
+
+
+def test_catalog_round_trips_and_rejects_a_tampered_file(tmp_path):
+    path = str(tmp_path / "saved.json")
+    catalog = SchemaCatalog.from_columns(
+        parse_ddl("CREATE TABLE core.t (id INT, name VARCHAR(10));"))
+    catalog.save(path)
+    assert SchemaCatalog.load(path).fingerprint == catalog.fingerprint
+
+    with open(path) as f:
+        text = f.read()
+    with open(path, "w") as f:
+        f.write(text.replace('"name"', '"renamed"', 1))
+    with pytest.raises(ValueError):
+        SchemaCatalog.load(path)
+
+
+def test_refresh_persists_only_when_the_fingerprint_changes(tmp_path):
+    calls = []
+
+    def fetch(tables):
+        calls.append(tables)
+        return SchemaCatalog.from_columns(
+            {"core.t1_bi_bookings": [("booking_id", "character varying")]},
+            source="redshift")
+
+    assert refresh_schema_catalog(TABLES, fetch=fetch)
+    assert not refresh_schema_catalog(TABLES, fetch=fetch)
+    catalog = get_schema_catalog()
+    # Fetched table added, DDL-only table kept
+    assert set(catalog.tables) == set(TABLES)
+    assert SchemaCatalog.load(str(tmp_path / "catalog.json")).fingerprint == \
+        catalog.fingerprint
+
+
+def test_background_refresh_swaps_the_catalog():
+    fetched = threading.Event()
+
+    def fetch(tables):
+        fetched.set()
+        return SchemaCatalog.from_columns(
+            {"core.t1_bookings_all": [("booking_id", "character varying")]},
+            source="redshift")
+
+    before = get_schema_catalog(TABLES)
+    start_schema_refresh(TABLES, interval=0, fetch=fetch).join(timeout=5)
+
+    assert fetched.is_set()
+    after = get_schema_catalog()
+    assert after.source == "redshift"
+    assert after.columns() == {"core.t1_bookings_all": ["booking_id"]}
+    assert after.fingerprint != before.fingerprint
+
+
+def test_fetch_table_columns_uses_one_query():
+    class Cursor:
+        def __init__(self):
+            self.queries = []
+
+        def execute(self, query, params):
+            self.queries.append((query, params))
+
+        def fetchall(self):
+            return [("core", "t1_bookings_all", "booking_id", "character varying"),
+                    ("core", "t1_bookings_all", "booking_date", "timestamp"),
+                    ("core", "t1_bi_bookings", "booking_id", "character varying")]
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    cursor = Cursor()
+    conn = type("Conn", (), {"cursor": lambda self: cursor})()
+    columns = redshift.fetch_table_columns(conn, TABLES)
+
+    assert len(cursor.queries) == 1
+    assert cursor.queries[0][1] == (tuple(TABLES),)
+    assert columns["core.t1_bookings_all"] == [
+        ("booking_id", "character varying"), ("booking_date", "timestamp")]
+    assert redshift.fetch_columns_for_allowed_tables(conn, TABLES) == {
+        "core.t1_bookings_all": ["booking_id", "booking_date"],
+        "core.t1_bi_bookings": ["booking_id"]}
@@ -0,0 +1,53 @@
+from lang_graph_poc.agents.schema_pruning import (
+    load_default_column_mappings, parse_column_mappings, select_relevant_schema
+)
+
+SCHEMA = {
+    "core.t1_bookings_all": [
+        "booking_id", "booking_date", "booking_state", "country_id",
+        "destination_id", "gross_total_sgd", "net_total_sgd", "product_name",
+        "refund_amount_sgd", "cancellation_date", "utm_source", "locale",
+    ],
+}
+
+
+def test_mappings_are_read_from_both_prompt_formats():
+    markdown = """* **Critical Column Mappings:**
+    * **Sales/Revenue:** `gross_total_sgd`, `net_total_sgd`
+    * **Geographic analysis:** `country_id`, `destination_id`
+
+* **Common Values Reference:**
+    * `booking_state`: 'CONFIRMED'
+"""
+    arrows = """**Critical Column Mappings:**
+        - Sales/Revenue queries → gross_total_sgd, net_total_sgd
+
+        **Common Values Reference:**
+"""
+    synonyms = parse_column_mappings(markdown)
+    assert synonyms["revenue"] == {"gross_total_sgd", "net_total_sgd"}
+    assert synonyms["geographic"] == {"country_id", "destination_id"}
+    assert "common" not in synonyms
+    assert parse_column_mappings(arrows)["sale"] == \
+        {"gross_total_sgd", "net_total_sgd"}
+
+
+def test_relevant_columns_plus_mandatory_keys_are_kept():
+    pruned = select_relevant_schema(
+        "revenue by geographic region for cancelled bookings",
+        SCHEMA, load_default_column_mappings())
+
+    assert pruned["core.t1_bookings_all"] == [
+        "booking_id", "booking_date", "booking_state", "country_id",
+        "destination_id", "gross_total_sgd", "net_total_sgd",
+        "cancellation_date",
+    ]
+
+
+def test_example_sql_columns_are_included():
+    examples = [{"question": "q", "sql": "SELECT utm_source FROM t",
+                 "intent": None, "source": ""}]
+    pruned = select_relevant_schema("conversion by channel", SCHEMA,
+                                    examples=examples)
+    assert "utm_source" in pruned["core.t1_bookings_all"]
+    assert "locale" not in pruned["core.t1_bookings_all"]
@@ -0,0 +1,460 @@
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from lang_graph_poc.agents.budget import CostBudget
+from lang_graph_poc.agents.instrumentation import NullMetricsSink
+from lang_graph_poc.agents.sql_agent import SQLAgent
+from lang_graph_poc.agents.sql_cache import SQLGenerationCache
+from lang_graph_poc.config import Config
+from lang_graph_poc.tools.result import ColumnarResult
+
+SCHEMA = {
+    "core.t1_bookings_all": ["booking_id", "booking_date", "gross_total_sgd",
+                             "booking_state", "country_id"],
+}
+SQL = ("SELECT SUM(gross_total_sgd) AS total_gmv FROM core.t1_bookings_all "
+       "WHERE booking_date >= CURRENT_DATE - INTERVAL '30 days'")
+
+RESPONSES = {
+    "Your task is to:": {"expanded_query": "GMV for the last 30 days",
+                         "requires_clarification": False},
+    "generate a SQL query": {"sql_query": SQL, "reasoning": "Sum of GMV.",
+                             "missing_tables": [], "missing_columns": []},
+    "Your task is to verify": {"is_valid": True, "reasoning": "Looks right."},
+}
+
+
+class FakeModel:
+    """Answers each node's prompt with canned JSON, keyed by prompt text."""
+
+    def __init__(self, responses=RESPONSES, latency=0.0, model_name="gpt-4o"):
+        self.responses = responses
+        self.latency = latency
+        self.model_name = model_name
+        self.prompts = []
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def invoke(self, messages, **kwargs):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        for marker, payload in self.responses.items():
+            if marker in prompt:
+                if isinstance(payload, list):  # one response per call
+                    payload = payload.pop(0) if len(payload) > 1 else payload[0]
+                return self._reply(prompt, json.dumps(payload))
+        return self._reply(prompt, "GMV over the last 30 days was 1,234 SGD.")
+
+    @staticmethod
+    def _reply(prompt, content):
+        usage = {"input_tokens": len(prompt) // 4,
+                 "output_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=content, usage_metadata=usage)
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self.invoke(messages, **kwargs)
+
+    def stream(self, messages, **kwargs):
+        content = self.invoke(messages, **kwargs).content
+        for word in content.split(" "):
+            yield AIMessageChunk(content=word + " ")
+
+    async def astream(self, messages, **kwargs):
+        for chunk in self.stream(messages, **kwargs):
+            yield chunk
+
+
+class FakeTool:
+    name = "redshift_query"
+
+    def __init__(self):
+        self.queries = []
+
+    def invoke(self, args):
+        self.queries.append(args["query"])
+        result = ColumnarResult.from_cursor_rows(
+            [("total_gmv", 701)], [(1234.0,)])
+        return {"data": result, "truncated": False}
+
+    async def ainvoke(self, args):
+        return self.invoke(args)
+
+
+@pytest.fixture
+def agent_parts():
+    return FakeModel(), FakeTool()
+
+
+def make_agent(model, tool, **kwargs):
+    kwargs.setdefault("metrics_sink", NullMetricsSink())
+    kwargs.setdefault("cost_gate", False)
+    return SQLAgent(model=model, tools=[tool], system_prompt="prompt",
+                    schema=SCHEMA, **kwargs)
+
+
+def test_ask_runs_full_pipeline(agent_parts):
+    model, tool = agent_parts
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    assert result["success"]
+    assert result["sql_query"] == SQL
+    assert tool.queries == [SQL]
+    assert len(result["data"]) == 1
+    assert len(model.prompts) == 4  # understand, generate, verify, summarize
+
+
+def test_repeated_question_skips_generation_llm_calls(agent_parts):
+    model, tool = agent_parts
+    agent = make_agent(model, tool, sql_cache=SQLGenerationCache())
+
+    agent.ask("GMV last 30 days")
+    model.prompts.clear()
+    result = agent.ask("  gmv LAST 30 days? ")
+
+    assert result["metadata"]["sql_cache_hit"]
+    assert result["sql_query"] == SQL
+    assert len(model.prompts) == 1  # only the summary
+    assert tool.queries == [SQL, SQL]
+
+
+def test_schema_or_prompt_change_invalidates_cached_sql(agent_parts):
+    model, tool = agent_parts
+    cache = SQLGenerationCache()
+    make_agent(model, tool, sql_cache=cache).ask("GMV last 30 days")
+
+    other = SQLAgent(model=model, tools=[tool], system_prompt="new prompt",
+                     schema=SCHEMA, sql_cache=cache)
+    model.prompts.clear()
+    result = other.ask("GMV last 30 days")
+
+    assert not result["metadata"].get("sql_cache_hit")
+    assert len(model.prompts) == 4
+
+
+def test_prompts_carry_only_relevant_columns(agent_parts):
+    model, tool = agent_parts
+    make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    generate_prompt = next(p for p in model.prompts if "generate a SQL query" in p)
+    assert "gross_total_sgd" in generate_prompt
+    assert "country_id" not in generate_prompt
+
+
+class CountingIndex:
+    def __init__(self):
+        self.lookups = []
+
+    def top_examples(self, question, k):
+        self.lookups.append(question)
+        return []
+
+
+def test_examples_are_looked_up_once_per_prompt(agent_parts):
+    model, tool = agent_parts
+    index = CountingIndex()
+    make_agent(model, tool, sql_cache=False, example_index=index,
+               num_examples=3).ask("GMV last 30 days")
+    # understand (schema only), generate (schema and examples share one)
+    assert len(index.lookups) == 2
+
+    index.lookups.clear()
+    make_agent(model, tool, sql_cache=False, example_index=index,
+               num_examples=0).ask("GMV last 30 days")
+    assert index.lookups == []
+
+
+def test_unknown_column_with_pruned_schema_falls_back_to_full_schema(agent_parts):
+    _, tool = agent_parts
+    guessed = SQL.replace("SUM(gross_total_sgd)", "SUM(gmv_sgd)")
+    model = FakeModel({
+        **RESPONSES,
+        "generate a SQL query": [
+            {**RESPONSES["generate a SQL query"], "sql_query": guessed},
+            RESPONSES["generate a SQL query"],
+        ],
+    })
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    generate_prompts = [p for p in model.prompts if "generate a SQL query" in p]
+    assert len(generate_prompts) == 2
+    assert "country_id" not in generate_prompts[0]
+    assert "country_id" in generate_prompts[1]
+    assert result["metadata"]["schema_scope"] == "full"
+    assert tool.queries == [SQL]
+    assert result["success"]
+
+
+def test_verify_policy_skip_avoids_the_llm_verify_call(agent_parts):
+    model, tool = agent_parts
+    result = make_agent(model, tool, sql_cache=False,
+                        verify_policy="skip").ask("GMV last 30 days")
+
+    assert result["success"]
+    assert not any("Your task is to verify" in p for p in model.prompts)
+    assert len(model.prompts) == 3  # understand, generate, summarize
+
+
+def test_disallowed_table_is_rejected_without_llm_verify(agent_parts):
+    _, tool = agent_parts
+    model = FakeModel({
+        **RESPONSES,
+        "generate a SQL query": {**RESPONSES["generate a SQL query"],
+                                 "sql_query": "SELECT * FROM core.users"},
+    })
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    assert not result["success"]
+    assert "core.users" in result["error"]
+    assert tool.queries == []
+    assert not any("Your task is to verify" in p for p in model.prompts)
+
+
+FAST_RESPONSE = {
+    "expanded_query": "GMV for the last 30 days",
+    "requires_clarification": False,
+    "sql_query": SQL,
+    "reasoning": "Sum of GMV.",
+    "missing_tables": [],
+    "missing_columns": [],
+    "self_check": {"uses_only_schema_columns": True, "matches_intent": True,
+                   "is_read_only": True},
+}
+
+
+def test_fast_path_answers_with_a_single_generation_call(agent_parts):
+    _, tool = agent_parts
+    model = FakeModel({"In a single step": FAST_RESPONSE, **RESPONSES})
+    result = make_agent(model, tool, sql_cache=False, fast_path=True).ask(
+        "GMV last 30 days")
+
+    assert result["metadata"]["fast_path"]
+    assert tool.queries == [SQL]
+    assert len(model.prompts) == 2  # fused call + summary
+
+
+def test_fast_path_falls_back_when_local_validation_fails(agent_parts):
+    _, tool = agent_parts
+    bad = {**FAST_RESPONSE, "sql_query": "DELETE FROM core.t1_bookings_all"}
+    model = FakeModel({"In a single step": bad, **RESPONSES})
+    result = make_agent(model, tool, sql_cache=False, fast_path=True).ask(
+        "GMV last 30 days")
+
+    assert "fast_path" not in result["metadata"]
+    assert result["sql_query"] == SQL
+    assert len(model.prompts) == 5  # fused call, then the full pipeline
+
+
+def test_aask_matches_ask(agent_parts):
+    model, tool = agent_parts
+    result = asyncio.run(make_agent(model, tool, sql_cache=False).aask(
+        "GMV last 30 days"))
+
+    assert result["success"]
+    assert result["sql_query"] == SQL
+    assert tool.queries == [SQL]
+    assert len(model.prompts) == 4
+
+
+def test_concurrent_aask_calls_share_one_event_loop():
+    model, tool = FakeModel(latency=0.05), FakeTool()
+    agent = make_agent(model, tool, sql_cache=False)
+
+    async def ask_many():
+        return await asyncio.gather(
+            *(agent.aask(f"GMV last {n} days") for n in range(10)))
+
+    started = time.perf_counter()
+    results = asyncio.run(ask_many())
+    elapsed = time.perf_counter() - started
+
+    assert all(r["success"] for r in results)
+    # 10 questions x 4 model calls x 50 ms each would take 2 s back to back
+    assert elapsed < 1.0
+
+
+def test_stream_yields_progress_then_summary_tokens(agent_parts):
+    model, tool = agent_parts
+    events = list(make_agent(model, tool, sql_cache=False).stream(
+        "GMV last 30 days"))
+
+    steps = [e["step"] for e in events if e["type"] == "progress"]
+    assert steps == ["understood", "sql_generated", "verified", "executing",
+                     "rows_fetched", "summarizing"]
+    tokens = [e["content"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert events[-1]["type"] == "result"
+    result = events[-1]["result"]
+    assert result["success"]
+    assert "".join(tokens).strip() == result["summary"].strip()
+
+
+def test_astream_yields_the_same_events(agent_parts):
+    model, tool = agent_parts
+    agent = make_agent(model, tool, sql_cache=False)
+
+    async def collect():
+        return [event async for event in agent.astream("GMV last 30 days")]
+
+    events = asyncio.run(collect())
+    assert [e["type"] for e in events][-1] == "result"
+    assert any(e["type"] == "token" for e in events)
+    assert events[-1]["result"]["sql_query"] == SQL
+
+
+def test_summary_prompt_gets_a_bounded_digest_not_raw_rows(agent_parts):
+    model, tool = agent_parts
+    rows = [(float(i),) for i in range(5000)]
+    tool.invoke = lambda args: {
+        "data": ColumnarResult.from_cursor_rows([("gross_total_sgd", 701)], rows),
+        "truncated": False}
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    summary_prompt = model.prompts[-1]
+    assert '"row_count":5000' in summary_prompt
+    assert len(summary_prompt) < 4000
+    assert result["digest"]["column_stats"]["gross_total_sgd"]["max"] == 4999
+
+
+class ListSink:
+    def __init__(self):
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_metrics_accumulate_usage_over_every_node(agent_parts):
+    model, tool = agent_parts
+    sink = ListSink()
+    result = make_agent(model, tool, sql_cache=False,
+                        metrics_sink=sink).ask("GMV last 30 days")
+
+    nodes = result["metrics"]["nodes"]
+    llm_nodes = {name for name, node in nodes.items() if node["llm_calls"]}
+    assert llm_nodes == {"understand_and_expand_user_query", "generate_sql",
+                         "verify_sql", "summarize"}
+    assert nodes["execute_sql"]["db_calls"] == 1
+    assert nodes["summarize"]["total_tokens"] > 0
+    assert result["usage"]["total_tokens"] == sum(
+        node["total_tokens"] for node in nodes.values())
+    assert result["metrics"]["totals"]["llm_calls"] == 4
+    assert sink.records[0]["request_id"] == result["metrics"]["request_id"]
+    assert sink.records[0]["success"] is True
+
+
+def test_metrics_count_node_retries(agent_parts):
+    _, tool = agent_parts
+    guessed = SQL.replace("SUM(gross_total_sgd)", "SUM(gmv_sgd)")
+    model = FakeModel({
+        **RESPONSES,
+        "generate a SQL query": [
+            {**RESPONSES["generate a SQL query"], "sql_query": guessed},
+            RESPONSES["generate a SQL query"],
+        ],
+    })
+    result = make_agent(model, tool, sql_cache=False).ask("GMV last 30 days")
+
+    assert result["metrics"]["nodes"]["generate_sql"]["calls"] == 2
+    assert result["metrics"]["nodes"]["generate_sql"]["retries"] == 1
+
+
+def test_cost_is_accumulated_over_every_model_call(agent_parts):
+    model, tool = agent_parts
+    agent = make_agent(model, tool, sql_cache=False, budget=CostBudget(0, 0))
+    result = agent.ask("GMV last 30 days")
+
+    calls = result["metrics"]["model_calls"]
+    assert len(calls) == 4
+    assert result["cost"] == pytest.approx(sum(c["cost_usd"] for c in calls),
+                                           abs=1e-5)
+    assert result["cost"] > 0
+    assert result["session_cost"] == pytest.approx(result["cost"])
+
+
+def test_question_budget_stops_before_the_first_model_call(agent_parts):
+    model, tool = agent_parts
+    agent = make_agent(model, tool, sql_cache=False,
+                       budget=CostBudget(question_usd=0.0001, session_usd=0))
+    result = agent.ask("GMV last 30 days")
+
+    assert not result["success"]
+    assert result["action"] == "budget_exceeded"
+    assert result["metadata"]["budget_scope"] == "question"
+    assert model.prompts == []
+    assert tool.queries == []
+
+
+def test_budget_downgrades_to_the_fallback_model(agent_parts):
+    model, tool = agent_parts
+    fallback = FakeModel(model_name="gpt-4o-mini")
+    agent = make_agent(model, tool, sql_cache=False, fallback_model=fallback,
+                       budget=CostBudget(question_usd=0.005, session_usd=0))
+    result = agent.ask("GMV last 30 days")
+
+    assert result["success"]
+    assert model.prompts == []
+    assert len(fallback.prompts) == 4
+    assert {c["model"] for c in result["metrics"]["model_calls"]} == {"gpt-4o-mini"}
+
+
+def test_session_budget_spans_questions(agent_parts):
+    model, tool = agent_parts
+    agent = make_agent(model, tool, sql_cache=False,
+                       budget=CostBudget(question_usd=0, session_usd=1.0))
+    first = agent.ask("GMV last 30 days")
+    agent.budget.add(1.0 - first["session_cost"] - 0.001)
+
+    events = list(agent.stream("GMV last 7 days"))
+    result = events[-1]["result"]
+    assert result["action"] == "budget_exceeded"
+    assert result["metadata"]["budget_scope"] == "session"
+
+
+@pytest.mark.parametrize("mode", ["ask", "aask"])
+def test_budget_stop_at_summarize_keeps_the_sql_and_rows(agent_parts, monkeypatch,
+                                                         mode):
+    model, tool = agent_parts
+    monkeypatch.setattr(
+        "lang_graph_poc.agents.sql_agent.estimate_call_cost",
+        lambda messages, *args: 1.0 if "Result Digest" in messages[-1].content
+        else 0.0)
+    agent = make_agent(model, tool, sql_cache=False,
+                       budget=CostBudget(question_usd=0.5, session_usd=0))
+    if mode == "ask":
+        result = agent.ask("GMV last 30 days")
+    else:
+        result = asyncio.run(agent.aask("GMV last 30 days"))
+
+    assert result["action"] == "budget_exceeded"
+    assert tool.queries == [SQL]
+    assert result["sql_query"] == SQL
+    assert len(result["data"]) == 1
+
+
+def test_over_budget_prompt_drops_least_relevant_columns(agent_parts, monkeypatch):
+    model, tool = agent_parts
+    full = make_agent(model, tool, sql_cache=False,
+                      prune_schema=False).ask("GMV last 30 days")
+    full_tokens = next(p["total_tokens"] for p in full["metrics"]["prompts"]
+                       if p["node"] == "generate_sql")
+    model.prompts.clear()
+
+    monkeypatch.setitem(Config.PROMPT_BUDGET, "nodes",
+                        {"generate_sql": full_tokens - 2})
+    result = make_agent(model, tool, sql_cache=False,
+                        prune_schema=False).ask("GMV last 30 days")
+
+    generate_prompt = next(p for p in model.prompts if "generate a SQL query" in p)
+    assert "gross_total_sgd" in generate_prompt
+    assert "country_id" not in generate_prompt
+    report = next(p for p in result["metrics"]["prompts"]
+                  if p["node"] == "generate_sql")
+    assert report["trimmed"]["schema"] >= 1
+    assert report["segments"]["instructions"] > report["segments"]["question"]
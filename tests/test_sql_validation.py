@@ -0,0 +1,72 @@
+from lang_graph_poc.agents.sql_validation import validate_sql
+
+SCHEMA = {
+    "core.t1_bookings_all": ["booking_id", "booking_date", "gross_total_sgd",
+                             "booking_state", "country_id"],
+    "core.t1_bi_bookings": ["booking_id", "continent_name"],
+}
+ALLOWED = ["core.t1_bookings_all", "core.t1_bi_bookings"]
+
+
+def check(sql, schema=SCHEMA, allowed=ALLOWED):
+    return validate_sql(sql, schema, allowed)
+
+
+def test_valid_query_with_aliases_ctes_and_select_aliases():
+    result = check("""
+        WITH recent AS (
+            SELECT booking_id, gross_total_sgd AS gmv
+            FROM core.t1_bookings_all
+            WHERE booking_date >= CURRENT_DATE - INTERVAL '30 days'
+        )
+        SELECT b.continent_name, SUM(r.gmv) AS total_gmv
+        FROM recent r JOIN core.t1_bi_bookings b ON b.booking_id = r.booking_id
+        GROUP BY b.continent_name
+        ORDER BY total_gmv DESC
+        LIMIT 10
+    """)
+
+    assert result["is_valid"], result["issues"]
+
+
+def test_correlated_subquery_resolves_outer_alias():
+    result = check("""
+        SELECT t.booking_id FROM core.t1_bookings_all t
+        WHERE EXISTS (SELECT 1 FROM core.t1_bi_bookings b
+                      WHERE b.booking_id = t.booking_id)
+    """)
+
+    assert result["is_valid"], result["issues"]
+
+
+def test_unknown_columns_and_aliases_are_reported():
+    result = check("SELECT t.revenue, gmv FROM core.t1_bookings_all t "
+                   "JOIN core.t1_bi_bookings b ON b.booking_id = x.booking_id")
+
+    assert not result["is_valid"]
+    assert result["missing_columns"] == ["t.revenue", "gmv", "x.booking_id"]
+
+
+def test_disallowed_and_unknown_tables():
+    result = check("SELECT * FROM core.users u JOIN core.t1_bookings_all t "
+                   "ON u.id = t.booking_id",
+                   allowed=ALLOWED + ["core.users"])
+    assert result["missing_tables"] == ["core.users"]
+
+    result = check("SELECT * FROM pg_catalog.pg_user")
+    assert result["disallowed_tables"] == ["pg_catalog.pg_user"]
+    assert not result["missing_tables"]
+
+
+def test_syntax_errors_and_non_select_statements():
+    assert check("SELEC booking_id FROM core.t1_bookings_all")["syntax_errors"]
+    assert not check("")["is_valid"]
+    for sql in ("DELETE FROM core.t1_bookings_all",
+                "SELECT 1; SELECT 2",
+                "SELECT booking_id INTO tmp FROM core.t1_bookings_all"):
+        assert not check(sql)["is_valid"], sql
+
+
+def test_without_schema_only_syntax_and_allow_list_are_checked():
+    assert check("SELECT anything FROM core.t1_bookings_all", schema=None)["is_valid"]
+    assert not check("SELECT 1 FROM core.other", schema=None)["is_valid"]